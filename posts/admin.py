@@ -1,6 +1,6 @@
 from django.contrib import admin
 
-from .models import Post, Group, Comment, Follow
+from .models import Post, Group, Comment, Follow, PurgeJob
 
 
 class PostAdmin(admin.ModelAdmin):
@@ -29,7 +29,15 @@ class FollowAdmin(admin.ModelAdmin):
     empty_value_display = "-пусто-"
 
 
+class PurgeJobAdmin(admin.ModelAdmin):
+    list_display = ("pk", "kind", "object_id", "stage", "purged",
+                    "attempts", "created", "updated", "finished")
+    list_filter = ("kind", "finished")
+    empty_value_display = "-пусто-"
+
+
 admin.site.register(Post, PostAdmin)
 admin.site.register(Group, GroupAdmin)
 admin.site.register(Comment, CommentAdmin)
 admin.site.register(Follow, FollowAdmin)
+admin.site.register(PurgeJob, PurgeJobAdmin)
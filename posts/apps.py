@@ -1,5 +1,15 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_migrate
+
+
+def create_search_index(sender, using="default", **kwargs):
+    from .search import create_index
+    create_index(using)
 
 
 class PostsConfig(AppConfig):
     name = "posts"
+
+    def ready(self):
+        from . import invalidation, signals  # noqa: F401
+        post_migrate.connect(create_search_index, sender=self)
@@ -0,0 +1,85 @@
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from django.templatetags.static import static
+from sorl.thumbnail import get_thumbnail
+
+from .images import load_variants
+from .models import Profile, User
+from .thumbnails import AVATAR_THUMBNAILS
+
+DEFAULT_AVATAR = "img/default.jpg"
+# Ширина варианта, достаточная для карточки автора на экранах с двойной
+# плотностью точек.
+AVATAR_WIDTH = 480
+
+
+def _cache_key(user_id, image_name):
+    version = hashlib.md5(image_name.encode()).hexdigest()
+    return f"avatar:{user_id}:{version}"
+
+
+def _profile_images(users):
+    images = {}
+    not_loaded = []
+    for user in users:
+        if not User.profile.is_cached(user):
+            not_loaded.append(user.pk)
+            continue
+        try:
+            profile = user.profile
+        except Profile.DoesNotExist:
+            continue
+        images[user.pk] = (profile.image.name, profile.image_variants)
+    if not_loaded:
+        images.update(
+            (user_id, (image, variants))
+            for user_id, image, variants in Profile.objects.filter(
+                user_id__in=not_loaded).values_list(
+                    "user_id", "image", "image_variants"))
+    return {user_id: image for user_id, image in images.items() if image[0]}
+
+
+def _variant_url(variants):
+    variants = load_variants(variants)
+    for name, width, _ in variants:
+        if width >= AVATAR_WIDTH:
+            break
+    return default_storage.url(name)
+
+
+def attach_avatars(users):
+    """Проставляет пользователям атрибут avatar_url.
+
+    Картинки берутся из профилей, загруженных select_related("profile"),
+    для остальных пользователей профили читаются одним запросом.
+    У обработанных при загрузке картинок берётся готовый вариант,
+    адреса миниатюр остальных читаются из кэша одним get_many, версия
+    картинки входит в ключ.
+    """
+    users = list(users)
+    images = _profile_images(users)
+    keys = {user_id: _cache_key(user_id, image)
+            for user_id, (image, variants) in images.items() if not variants}
+    cached = cache.get_many(keys.values())
+    geometry, options = AVATAR_THUMBNAILS[0]
+    default_url = static(DEFAULT_AVATAR)
+    resolved = {}
+    for user in users:
+        image, variants = images.get(user.pk, (None, None))
+        if image is None:
+            user.avatar_url = default_url
+            continue
+        if variants:
+            user.avatar_url = _variant_url(variants)
+            continue
+        key = keys[user.pk]
+        if key not in cached:
+            cached[key] = resolved[key] = get_thumbnail(
+                image, geometry, **options).url
+        user.avatar_url = cached[key]
+    if resolved:
+        cache.set_many(resolved, settings.AVATAR_CACHE_TIMEOUT)
+    return users
@@ -0,0 +1,139 @@
+import json
+import math
+import time
+from contextlib import ExitStack
+
+from django.core.cache import cache
+from django.db import connections
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from .models import Post, Profile
+
+SEARCH_QUERY = "город"
+# Адрес вне INTERNAL_IPS, чтобы debug_toolbar не искажал замеры.
+CLIENT_ADDR = "192.0.2.1"
+
+
+class BenchmarkError(Exception):
+    pass
+
+
+def percentile(values, fraction):
+    """Процентиль методом ближайшего ранга."""
+    ordered = sorted(values)
+    rank = max(math.ceil(fraction * len(ordered)), 1)
+    return ordered[rank - 1]
+
+
+class Scenario:
+    """Адреса публичных страниц, выбранные по засеянным данным.
+
+    Берутся самый популярный автор, пользователь с наибольшим числом
+    подписок, последняя публикация автора и последняя группа с
+    публикациями.
+    """
+
+    def __init__(self):
+        author = (Profile.objects.select_related("user")
+                  .order_by("-followers_count").first())
+        reader = (Profile.objects.select_related("user")
+                  .order_by("-followings_count").first())
+        post = Post.objects.filter(author_id=author.user_id).first()
+        group_post = (Post.objects.filter(group__isnull=False)
+                      .select_related("group").first())
+        if post is None or group_post is None:
+            raise BenchmarkError("Нет данных, запустите seed_benchmark")
+        self.author = author.user
+        self.reader = reader.user
+        self.post = post
+        self.group = group_post.group
+
+    def urls(self):
+        username = self.author.username
+        return [
+            ("posts:index", reverse("posts:index")),
+            ("posts:group", reverse("posts:group", args=[self.group.slug])),
+            ("posts:profile", reverse("posts:profile", args=[username])),
+            ("posts:post", reverse("posts:post",
+                                   args=[username, self.post.pk])),
+            ("posts:follow_index", reverse("posts:follow_index")),
+            ("posts:search_results",
+             f"{reverse('posts:search_results')}?q={SEARCH_QUERY}"),
+            ("posts:all_authors", reverse("posts:all_authors")),
+            ("posts:followers", reverse("posts:followers", args=[username])),
+        ]
+
+    def client(self):
+        client = Client(REMOTE_ADDR=CLIENT_ADDR)
+        client.force_login(self.reader)
+        return client
+
+
+def measure(client, url, repeat, cold=False):
+    timings = []
+    queries = 0
+    for _ in range(repeat):
+        if cold:
+            cache.clear()
+        # Запросы считаются по всем базам: часть страниц читает с реплик.
+        with ExitStack() as stack:
+            captured = [stack.enter_context(
+                CaptureQueriesContext(connections[alias]))
+                for alias in connections]
+            start = time.perf_counter()
+            response = client.get(url)
+            timings.append((time.perf_counter() - start) * 1000)
+        if response.status_code != 200:
+            raise BenchmarkError(f"{url}: статус {response.status_code}")
+        queries = max(queries, sum(len(context) for context in captured))
+    return {
+        "p50_ms": round(percentile(timings, 0.5), 2),
+        "p95_ms": round(percentile(timings, 0.95), 2),
+        "queries": queries,
+    }
+
+
+def run(scenario, repeat, cold=False):
+    client = scenario.client()
+    results = {}
+    for name, url in scenario.urls():
+        # Первый запрос прогревает кэши и не учитывается.
+        client.get(url)
+        results[name] = measure(client, url, repeat, cold)
+    return results
+
+
+def compare(results, baseline, threshold):
+    """Список регрессий относительно сохранённых замеров.
+
+    Число запросов не должно расти совсем, p95 — не больше чем
+    в 1 + threshold раз.
+    """
+    regressions = []
+    for name, result in results.items():
+        expected = baseline.get(name)
+        if expected is None:
+            regressions.append(f"{name}: нет сохранённого замера")
+            continue
+        if result["queries"] > expected["queries"]:
+            regressions.append(
+                f"{name}: запросов {result['queries']}, "
+                f"было {expected['queries']}")
+        limit = expected["p95_ms"] * (1 + threshold)
+        if result["p95_ms"] > limit:
+            regressions.append(
+                f"{name}: p95 {result['p95_ms']} мс, "
+                f"было {expected['p95_ms']} мс")
+    return regressions
+
+
+def load_baseline(path):
+    with open(path, encoding="utf-8") as baseline_file:
+        return json.load(baseline_file)
+
+
+def save_baseline(path, results):
+    with open(path, "w", encoding="utf-8") as baseline_file:
+        json.dump(results, baseline_file, indent=2, sort_keys=True)
@@ -0,0 +1,437 @@
+import os
+import pickle
+import sqlite3
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from contextlib import contextmanager
+
+from django.core.cache import caches
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+from django.utils.module_loading import import_string
+
+from .metrics import CacheMetricsMixin
+
+CLEAR_ALL = "*"
+_MISSING = object()
+
+
+class SQLiteInvalidationChannel:
+    """Журнал изменённых ключей в файле SQLite, общий для процессов.
+
+    Процесс пишет в журнал ключи, которые изменил, и читает ключи,
+    изменённые другими процессами после последнего чтения. Журнал
+    хранит последние KEEP записей; отставший читатель получает
+    CLEAR_ALL.
+    """
+    KEEP = 10000
+
+    def __init__(self, location):
+        self.location = location
+        self._lock = threading.Lock()
+        self._pid = None
+
+    def _connect(self):
+        # После fork соединение и отметка чтения не наследуются.
+        if self._pid == os.getpid():
+            return self._connection
+        directory = os.path.dirname(self.location)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        connection = sqlite3.connect(self.location, timeout=5,
+                                     isolation_level=None,
+                                     check_same_thread=False)
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute(
+            "CREATE TABLE IF NOT EXISTS invalidations ("
+            "id INTEGER PRIMARY KEY AUTOINCREMENT, "
+            "origin TEXT NOT NULL, key TEXT NOT NULL)")
+        self._connection = connection
+        self._pid = os.getpid()
+        self.origin = uuid.uuid4().hex
+        self.last_seen = self._max_id()
+        return connection
+
+    def _max_id(self):
+        row = self._connection.execute(
+            "SELECT MAX(id) FROM invalidations").fetchone()
+        return row[0] or 0
+
+    def publish(self, keys):
+        keys = list(keys)
+        if not keys:
+            return
+        with self._lock:
+            connection = self._connect()
+            cursor = connection.executemany(
+                "INSERT INTO invalidations (origin, key) VALUES (?, ?)",
+                [(self.origin, key) for key in keys])
+            last_id = cursor.lastrowid or self._max_id()
+            if last_id % 1000 < len(keys):
+                connection.execute("DELETE FROM invalidations WHERE id <= ?",
+                                   [last_id - self.KEEP])
+
+    def poll(self):
+        """Ключи, изменённые другими процессами с прошлого вызова."""
+        with self._lock:
+            connection = self._connect()
+            rows = connection.execute(
+                "SELECT id, origin, key FROM invalidations WHERE id > ? "
+                "ORDER BY id", [self.last_seen]).fetchall()
+            if not rows:
+                return []
+            missed = rows[0][0] > self.last_seen + 1 and self.last_seen
+            self.last_seen = rows[-1][0]
+        if missed:
+            return [CLEAR_ALL]
+        return [key for _, origin, key in rows if origin != self.origin]
+
+
+class SQLiteCache(BaseCache):
+    """Кэш в таблице файла SQLite, общий для процессов одной машины.
+
+    В отличие от FileBasedCache запись не перечисляет каталог: лишние
+    записи убираются раз в CULL_EVERY записей процесса, сначала
+    просроченные, затем самые старые.
+    """
+    CULL_EVERY = 100
+    BATCH_SIZE = 500
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        self.location = location
+        self._lock = threading.Lock()
+        self._pid = None
+        self._writes = 0
+
+    def _connect(self):
+        # После fork соединение не наследуется.
+        if self._pid == os.getpid():
+            return self._connection
+        directory = os.path.dirname(self.location)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        connection = sqlite3.connect(self.location, timeout=5,
+                                     isolation_level=None,
+                                     check_same_thread=False)
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute(
+            "CREATE TABLE IF NOT EXISTS cache ("
+            "key TEXT PRIMARY KEY, value BLOB NOT NULL, expires REAL)")
+        self._connection = connection
+        self._pid = os.getpid()
+        return connection
+
+    @contextmanager
+    def _transaction(self):
+        with self._lock:
+            connection = self._connect()
+            connection.execute("BEGIN IMMEDIATE")
+            try:
+                yield connection
+            except BaseException:
+                connection.execute("ROLLBACK")
+                raise
+            connection.execute("COMMIT")
+
+    def _key(self, key, version):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        return key
+
+    def _load(self, connection, key):
+        row = connection.execute(
+            "SELECT value FROM cache WHERE key = ? "
+            "AND (expires IS NULL OR expires > ?)",
+            [key, time.time()]).fetchone()
+        return _MISSING if row is None else pickle.loads(row[0])
+
+    def _store(self, connection, key, value, timeout):
+        connection.execute(
+            "INSERT OR REPLACE INTO cache (key, value, expires) "
+            "VALUES (?, ?, ?)",
+            [key, pickle.dumps(value, pickle.HIGHEST_PROTOCOL),
+             self.get_backend_timeout(timeout)])
+
+    def _written(self, count=1):
+        self._writes += count
+        if self._writes < self.CULL_EVERY:
+            return
+        self._writes = 0
+        with self._transaction() as connection:
+            connection.execute("DELETE FROM cache WHERE expires <= ?",
+                               [time.time()])
+            total = connection.execute(
+                "SELECT COUNT(*) FROM cache").fetchone()[0]
+            if total < self._max_entries:
+                return
+            if not self._cull_frequency:
+                connection.execute("DELETE FROM cache")
+                return
+            # Rowid растёт с каждой записью, меньшие записаны раньше.
+            connection.execute(
+                "DELETE FROM cache WHERE rowid IN (SELECT rowid FROM cache "
+                "ORDER BY rowid LIMIT ?)", [total // self._cull_frequency])
+
+    def get(self, key, default=None, version=None):
+        key = self._key(key, version)
+        with self._lock:
+            value = self._load(self._connect(), key)
+        return default if value is _MISSING else value
+
+    def get_many(self, keys, version=None):
+        keys_by_cache_key = {self._key(key, version): key for key in keys}
+        cache_keys = list(keys_by_cache_key)
+        found = {}
+        with self._lock:
+            connection = self._connect()
+            for start in range(0, len(cache_keys), self.BATCH_SIZE):
+                batch = cache_keys[start:start + self.BATCH_SIZE]
+                rows = connection.execute(
+                    "SELECT key, value FROM cache WHERE key IN (%s) "
+                    "AND (expires IS NULL OR expires > ?)"
+                    % ", ".join("?" * len(batch)), [*batch, time.time()])
+                for cache_key, value in rows:
+                    found[keys_by_cache_key[cache_key]] = pickle.loads(value)
+        return found
+
+    def has_key(self, key, version=None):
+        key = self._key(key, version)
+        with self._lock:
+            return self._load(self._connect(), key) is not _MISSING
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self._key(key, version)
+        with self._transaction() as connection:
+            if self._load(connection, key) is not _MISSING:
+                return False
+            self._store(connection, key, value, timeout)
+        self._written()
+        return True
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self._key(key, version)
+        with self._transaction() as connection:
+            self._store(connection, key, value, timeout)
+        self._written()
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        with self._transaction() as connection:
+            for key, value in data.items():
+                self._store(connection, self._key(key, version), value,
+                            timeout)
+        self._written(len(data))
+        return []
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self._key(key, version)
+        with self._transaction() as connection:
+            return connection.execute(
+                "UPDATE cache SET expires = ? WHERE key = ? "
+                "AND (expires IS NULL OR expires > ?)",
+                [self.get_backend_timeout(timeout), key, time.time()]
+            ).rowcount > 0
+
+    def delete(self, key, version=None):
+        key = self._key(key, version)
+        with self._transaction() as connection:
+            connection.execute("DELETE FROM cache WHERE key = ?", [key])
+
+    def delete_many(self, keys, version=None):
+        cache_keys = [self._key(key, version) for key in keys]
+        with self._transaction() as connection:
+            connection.executemany("DELETE FROM cache WHERE key = ?",
+                                   [(key,) for key in cache_keys])
+
+    def incr(self, key, delta=1, version=None):
+        cache_key = self._key(key, version)
+        # Чтение и запись в одной транзакции: другой процесс
+        # не потеряет своё приращение.
+        with self._transaction() as connection:
+            value = self._load(connection, cache_key)
+            if value is _MISSING:
+                raise ValueError("Key '%s' not found" % key)
+            value += delta
+            connection.execute("UPDATE cache SET value = ? WHERE key = ?",
+                               [pickle.dumps(value, pickle.HIGHEST_PROTOCOL),
+                                cache_key])
+        return value
+
+    def clear(self):
+        with self._transaction() as connection:
+            connection.execute("DELETE FROM cache")
+
+
+class LocalTier:
+    """LRU в памяти процесса, общий для потоков."""
+
+    def __init__(self, channel):
+        self.channel = channel
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.synced_at = 0.0
+
+
+# Django создаёт экземпляр кэша на поток, L1 должен быть один на процесс.
+_tiers = {}
+_tiers_lock = threading.Lock()
+
+
+class TwoTierCache(BaseCache):
+    """Ограниченный LRU в памяти процесса перед общим кэшем.
+
+    Общий кэш задаётся алиасом SHARED из CACHES. Записи в L1 живут
+    не дольше L1_TIMEOUT секунд, их не больше L1_MAX_ENTRIES.
+    Изменённые ключи публикуются в канал CHANNEL, и другие процессы
+    не реже раза в SYNC_INTERVAL секунд убирают их из своего L1.
+    """
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get("OPTIONS", {})
+        self.shared_alias = options.get("SHARED", "shared")
+        self.l1_max_entries = int(options.get("L1_MAX_ENTRIES", 1000))
+        self.l1_timeout = float(options.get("L1_TIMEOUT", 30))
+        self.sync_interval = float(options.get("SYNC_INTERVAL", 0.5))
+        channel_class = import_string(options.get(
+            "CHANNEL", "posts.cache.SQLiteInvalidationChannel"))
+        with _tiers_lock:
+            if location not in _tiers:
+                _tiers[location] = LocalTier(channel_class(location))
+            self.tier = _tiers[location]
+
+    @property
+    def shared(self):
+        return caches[self.shared_alias]
+
+    def _sync(self):
+        tier = self.tier
+        now = time.monotonic()
+        if now - tier.synced_at < self.sync_interval:
+            return
+        tier.synced_at = now
+        keys = tier.channel.poll()
+        with tier.lock:
+            if CLEAR_ALL in keys:
+                tier.entries.clear()
+                return
+            for key in keys:
+                tier.entries.pop(key, None)
+
+    def _l1_get(self, key):
+        tier = self.tier
+        with tier.lock:
+            entry = tier.entries.get(key)
+            if entry is None:
+                return _MISSING
+            expires, pickled = entry
+            if expires <= time.time():
+                del tier.entries[key]
+                return _MISSING
+            tier.entries.move_to_end(key)
+        return pickle.loads(pickled)
+
+    def _l1_set(self, key, value, timeout=DEFAULT_TIMEOUT):
+        expires = time.time() + self.l1_timeout
+        backend_expires = self.get_backend_timeout(timeout)
+        if backend_expires is not None:
+            expires = min(expires, backend_expires)
+        pickled = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        tier = self.tier
+        with tier.lock:
+            tier.entries[key] = (expires, pickled)
+            tier.entries.move_to_end(key)
+            while len(tier.entries) > self.l1_max_entries:
+                tier.entries.popitem(last=False)
+
+    def _l1_delete(self, keys):
+        with self.tier.lock:
+            for key in keys:
+                self.tier.entries.pop(key, None)
+
+    def _key(self, key, version):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        return key
+
+    def get(self, key, default=None, version=None):
+        self._sync()
+        l1_key = self._key(key, version)
+        value = self._l1_get(l1_key)
+        if value is not _MISSING:
+            return value
+        value = self.shared.get(key, _MISSING, version=version)
+        if value is _MISSING:
+            return default
+        self._l1_set(l1_key, value)
+        return value
+
+    def get_many(self, keys, version=None):
+        self._sync()
+        found = {}
+        missing = []
+        for key in keys:
+            value = self._l1_get(self._key(key, version))
+            if value is _MISSING:
+                missing.append(key)
+            else:
+                found[key] = value
+        if missing:
+            loaded = self.shared.get_many(missing, version=version)
+            for key, value in loaded.items():
+                self._l1_set(self._key(key, version), value)
+            found.update(loaded)
+        return found
+
+    def _changed(self, keys, version, values=None, timeout=DEFAULT_TIMEOUT):
+        l1_keys = [self._key(key, version) for key in keys]
+        if values is None:
+            self._l1_delete(l1_keys)
+        else:
+            for l1_key, value in zip(l1_keys, values):
+                self._l1_set(l1_key, value, timeout)
+        self.tier.channel.publish(l1_keys)
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        added = self.shared.add(key, value, timeout, version=version)
+        if added:
+            self._changed([key], version, [value], timeout)
+        return added
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self.shared.set(key, value, timeout, version=version)
+        self._changed([key], version, [value], timeout)
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        failed = self.shared.set_many(data, timeout, version=version)
+        self._changed(list(data), version, list(data.values()), timeout)
+        return failed
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        self._changed([key], version)
+        return self.shared.touch(key, timeout, version=version)
+
+    def delete(self, key, version=None):
+        self.shared.delete(key, version=version)
+        self._changed([key], version)
+
+    def delete_many(self, keys, version=None):
+        keys = list(keys)
+        self.shared.delete_many(keys, version=version)
+        self._changed(keys, version)
+
+    def incr(self, key, delta=1, version=None):
+        value = self.shared.incr(key, delta, version=version)
+        self._changed([key], version)
+        return value
+
+    def clear(self):
+        self.shared.clear()
+        with self.tier.lock:
+            self.tier.entries.clear()
+        self.tier.channel.publish([CLEAR_ALL])
+
+
+class InstrumentedTwoTierCache(CacheMetricsMixin, TwoTierCache):
+    pass
@@ -0,0 +1,65 @@
+from urllib.parse import quote
+
+from django.urls import get_script_prefix, reverse
+from django.utils.http import RFC3986_SUBDELIMS
+
+# Значения-заглушки, которые подставляются в reverse() и затем
+# заменяются данными публикации.
+USERNAME = "username0placeholder"
+POST_ID = 987654321987
+SLUG = "slug0placeholder"
+
+CARD_URLS = {
+    "profile": ("posts:profile", [USERNAME]),
+    "post": ("posts:post", [USERNAME, POST_ID]),
+    "edit": ("posts:post_edit", [USERNAME, POST_ID]),
+    "delete": ("posts:post_delete", [USERNAME, POST_ID]),
+    "like": ("posts:likes", [USERNAME, POST_ID]),
+    "group": ("posts:group", [SLUG]),
+}
+
+_templates = {}
+
+
+def _url_templates():
+    prefix = get_script_prefix()
+    if prefix not in _templates:
+        _templates[prefix] = {
+            name: (reverse(view, args=args)
+                   .replace(USERNAME, "{username}")
+                   .replace(str(POST_ID), "{post_id}")
+                   .replace(SLUG, "{slug}"))
+            for name, (view, args) in CARD_URLS.items()}
+    return _templates[prefix]
+
+
+def _quote(value):
+    # Так же, как reverse() экранирует аргументы.
+    return quote(str(value), safe=RFC3986_SUBDELIMS + "/~:@")
+
+
+def visible_group(post):
+    """Группа публикации, если группа не отмечена как удалённая."""
+    group = post.group
+    if group is None or group.deleted_at is not None:
+        return None
+    return group
+
+
+def attach_card_urls(posts):
+    """Проставляет публикациям словарь urls со ссылками карточки.
+
+    reverse() вызывается один раз на имя URL, ссылки публикаций
+    получаются подстановкой в готовые шаблоны.
+    """
+    templates = _url_templates()
+    for post in posts:
+        group = visible_group(post)
+        values = {"username": _quote(post.author.username),
+                  "post_id": post.pk,
+                  "slug": _quote(group.slug) if group else ""}
+        post.urls = {name: template.format(**values)
+                     for name, template in templates.items()}
+        if group is None:
+            del post.urls["group"]
+    return posts
@@ -0,0 +1,71 @@
+import hashlib
+import json
+from functools import wraps
+
+from django.utils.cache import (get_conditional_response,
+                                patch_cache_control, patch_vary_headers)
+from django.utils.http import http_date, quote_etag
+
+from . import generations
+
+
+def listing_validators(request, scopes, posts):
+    """ETag и Last-Modified списка публикаций без выборки страницы.
+
+    В валидатор входят последняя публикация списка, время изменения
+    областей списка и зрителя, сам зритель и адрес страницы с курсором.
+    """
+    newest = posts.order_by("-pub_date", "-pk").values_list(
+        "pk", "pub_date").first() or (None, None)
+    scopes = list(scopes)
+    viewer_id = request.user.pk if request.user.is_authenticated else None
+    if viewer_id is not None:
+        scopes.append(f"user:{viewer_id}")
+    changed = generations.get_many(scopes)
+    timestamps = list(changed.values())
+    last_id, last_pub_date = newest
+    if last_pub_date is not None:
+        timestamps.append(last_pub_date.timestamp())
+    state = [last_id, sorted(changed.items()), viewer_id,
+             request.get_full_path()]
+    etag = hashlib.md5(json.dumps(state).encode()).hexdigest()
+    return quote_etag(etag), int(max(timestamps))
+
+
+def conditional_listing(get_listing):
+    """Отвечает 304 Not Modified, если список публикаций не изменился.
+
+    get_listing получает запрос и аргументы представления и возвращает пару
+    (области generations, queryset публикаций) или None, если проверку
+    нужно пропустить. Проверка выполняется до постраничного вывода
+    и рендеринга шаблона.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            listing = None
+            if request.method in ("GET", "HEAD"):
+                listing = get_listing(request, *args, **kwargs)
+            if listing is None:
+                return view(request, *args, **kwargs)
+            etag, last_modified = listing_validators(request, *listing)
+            # Время изменения одинаково для всех зрителей, поэтому
+            # персональные страницы проверяются только по ETag.
+            if request.user.is_authenticated:
+                last_modified = None
+            response = get_conditional_response(
+                request, etag=etag, last_modified=last_modified)
+            if response is None:
+                response = view(request, *args, **kwargs)
+            if response.status_code in (200, 304):
+                response["ETag"] = etag
+                if last_modified is not None:
+                    response["Last-Modified"] = http_date(last_modified)
+            patch_vary_headers(response, ("Cookie",))
+            if request.user.is_authenticated:
+                patch_cache_control(response, private=True, no_cache=True)
+            else:
+                patch_cache_control(response, no_cache=True)
+            return response
+        return wrapper
+    return decorator
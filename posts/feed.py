@@ -0,0 +1,188 @@
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import connections, transaction
+from django.db.models import F, OuterRef, Q, Subquery
+
+from . import generations, updates
+from .models import FeedEntry, Follow, Post, Profile
+
+BATCH_SIZE = 500
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+
+
+def feeds_changed(user_ids):
+    """Поднимает поколения лент подписок пользователей."""
+    generations.bump(*[f"feed:{user_id}" for user_id in user_ids])
+
+
+def is_pull_author(author_id):
+    followers_count = (Profile.objects.filter(user_id=author_id)
+                       .values_list("followers_count", flat=True).first())
+    return (followers_count or 0) > settings.FEED_FANOUT_THRESHOLD
+
+
+def trim(user_ids):
+    """Оставляет в лентах пользователей только FEED_MAX_LENGTH записей."""
+    limit = settings.FEED_MAX_LENGTH
+    cutoff = (FeedEntry.objects.filter(user=OuterRef("user"))
+              .order_by("-pub_date", "-post_id").values("pub_date")
+              [limit - 1:limit])
+    FeedEntry.objects.filter(user__in=user_ids,
+                             pub_date__lt=Subquery(cutoff)).delete()
+
+
+def fan_out(post):
+    if is_pull_author(post.author_id):
+        return
+    follower_ids = list(Follow.objects.filter(author_id=post.author_id)
+                        .values_list("user_id", flat=True))
+    for start in range(0, len(follower_ids), BATCH_SIZE):
+        batch = follower_ids[start:start + BATCH_SIZE]
+        FeedEntry.objects.bulk_create(
+            [FeedEntry(user_id=user_id, post=post, pub_date=post.pub_date)
+             for user_id in batch], ignore_conflicts=True)
+        trim(batch)
+        updates.record_feed_entries(batch, post.pk)
+        feeds_changed(batch)
+
+
+def followers_changed(author_id):
+    """Публикация автора изменилась: ленты его подписчиков устарели.
+
+    Ленты подписчиков популярного автора не трогаются, они проверяются
+    по его профилю.
+    """
+    if is_pull_author(author_id):
+        return
+    follower_ids = list(Follow.objects.filter(author_id=author_id)
+                        .values_list("user_id", flat=True))
+    for start in range(0, len(follower_ids), BATCH_SIZE):
+        feeds_changed(follower_ids[start:start + BATCH_SIZE])
+
+
+def backfill(user_id, author_id):
+    if is_pull_author(author_id):
+        return
+    posts = (Post.objects.filter(author_id=author_id)
+             .values_list("pk", "pub_date")[:settings.FEED_MAX_LENGTH])
+    FeedEntry.objects.bulk_create(
+        [FeedEntry(user_id=user_id, post_id=post_id, pub_date=pub_date)
+         for post_id, pub_date in posts],
+        batch_size=BATCH_SIZE, ignore_conflicts=True)
+    trim([user_id])
+    feeds_changed([user_id])
+
+
+def get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=1,
+                                       thread_name_prefix="feeds")
+    return _executor
+
+
+def backfill_followers(author_id):
+    """Добавляет публикации автора в ленты всех его подписчиков.
+
+    Нужна, когда автор перестаёт быть популярным: его публикации,
+    написанные без рассылки, больше не подмешиваются при чтении.
+    """
+    posts = list(Post.objects.filter(author_id=author_id)
+                 .values_list("pk", "pub_date")[:settings.FEED_MAX_LENGTH])
+    if not posts:
+        return
+    last_pk = 0
+    while True:
+        follower_ids = list(Follow.objects.filter(author_id=author_id,
+                                                  pk__gt=last_pk)
+                            .order_by("pk").values_list("pk", "user_id")
+                            [:BATCH_SIZE])
+        if not follower_ids:
+            return
+        last_pk = follower_ids[-1][0]
+        user_ids = [user_id for _, user_id in follower_ids]
+        with transaction.atomic():
+            for user_id in user_ids:
+                FeedEntry.objects.bulk_create(
+                    [FeedEntry(user_id=user_id, post_id=post_id,
+                               pub_date=pub_date)
+                     for post_id, pub_date in posts],
+                    batch_size=BATCH_SIZE, ignore_conflicts=True)
+            trim(user_ids)
+        feeds_changed(user_ids)
+
+
+def _backfill_in_worker(author_id):
+    try:
+        backfill_followers(author_id)
+    except Exception:
+        logger.exception("Не удалось заполнить ленты подписчиков %s",
+                         author_id)
+    finally:
+        connections.close_all()
+
+
+def follower_removed(author_id):
+    """Заполняет ленты в фоне, если автор только что перестал быть
+    популярным."""
+    followers_count = (Profile.objects.filter(user_id=author_id)
+                       .values_list("followers_count", flat=True).first())
+    if followers_count != settings.FEED_FANOUT_THRESHOLD:
+        return
+    transaction.on_commit(
+        lambda: get_executor().submit(_backfill_in_worker, author_id))
+
+
+def prune(user_id, author_id):
+    FeedEntry.objects.filter(user_id=user_id,
+                             post__author_id=author_id).delete()
+    feeds_changed([user_id])
+
+
+FEED_ORDERING = ("-feed_pub_date", "-feed_post_id")
+
+
+def pull_authors(user):
+    """Популярные авторы из подписок: их публикации не рассылаются."""
+    return list(
+        Follow.objects.filter(
+            user=user,
+            author__profile__followers_count__gt=(
+                settings.FEED_FANOUT_THRESHOLD))
+        .values_list("author_id", flat=True))
+
+
+def watch(user):
+    """Новые публикации ленты: отметка ленты и популярные авторы."""
+    pull_author_ids = pull_authors(user)
+    posts = Post.objects.filter(Q(feed_entries__user=user)
+                                | Q(author_id__in=pull_author_ids))
+    return updates.Watch(
+        [f"feed:{user.pk}", *[f"author:{pk}" for pk in pull_author_ids]],
+        posts.distinct())
+
+
+def feed_posts(user):
+    """Публикации авторов, на которых подписан пользователь.
+
+    Обычные авторы читаются из материализованной ленты одним проходом
+    по индексу, публикации популярных авторов подмешиваются запросом.
+    Результат отсортирован по FEED_ORDERING.
+    """
+    pull_author_ids = pull_authors(user)
+    posts = Post.objects.select_related("author", "group")
+    if not pull_author_ids:
+        posts = posts.filter(feed_entries__user=user).annotate(
+            feed_pub_date=F("feed_entries__pub_date"),
+            feed_post_id=F("feed_entries__post"))
+    else:
+        entries = FeedEntry.objects.filter(user=user).values("post")
+        posts = posts.filter(
+            Q(pk__in=entries) | Q(author_id__in=pull_author_ids)).annotate(
+            feed_pub_date=F("pub_date"), feed_post_id=F("pk"))
+    return posts.order_by(*FEED_ORDERING)
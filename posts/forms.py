@@ -9,6 +9,11 @@ class PostForm(forms.ModelForm):
         model = Post
         fields = ("group", "text", "image")
 
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fields["group"].queryset = Group.objects.filter(
+            deleted_at__isnull=True)
+
 
 class CommentForm(forms.ModelForm):
     class Meta:
@@ -0,0 +1,38 @@
+import time
+
+from django.core.cache import cache
+
+KEY_PREFIX = "generation"
+
+
+def _key(scope):
+    return f"{KEY_PREFIX}:{scope}"
+
+
+def post_scopes(post_id, author_id, group_id):
+    """Страницы, на которых видна публикация."""
+    scopes = ["index", f"profile:{author_id}", f"post:{post_id}"]
+    if group_id is not None:
+        scopes.append(f"group:{group_id}")
+    return scopes
+
+
+def bump(*scopes):
+    """Отмечает, что содержимое областей изменилось сейчас."""
+    now = time.time()
+    cache.set_many({_key(scope): now for scope in scopes}, None)
+
+
+def get_many(scopes):
+    """Время последнего изменения каждой области.
+
+    Область, которой нет в кэше, считается изменённой сейчас, чтобы
+    после вытеснения ключа не совпасть со старым значением.
+    """
+    keys = {scope: _key(scope) for scope in scopes}
+    cached = cache.get_many(keys.values())
+    missing = {key: time.time() for key in keys.values() if key not in cached}
+    if missing:
+        cache.set_many(missing, None)
+        cached.update(missing)
+    return {scope: cached[key] for scope, key in keys.items()}
@@ -0,0 +1,171 @@
+"""Сброс кэшей при изменении данных.
+
+Страницы и фрагменты, собранные из нескольких моделей, не удаляются
+из кэша по отдельности: в их ключи и валидаторы входят поколения
+областей из generations, а обработчики сигналов ниже поднимают
+поколения всех затронутых областей. Запись стоит столько обращений
+к кэшу, сколько областей она затрагивает.
+
+Области:
+
+* index — главная страница;
+* group:<id> — страница группы;
+* profile:<id> — профиль автора, его публикации и карточка автора;
+  от неё же зависят ленты подписчиков, поэтому публикация не трогает
+  ленту каждого подписчика;
+* author:<id> — карточка автора: аватар и число подписок;
+* post:<id> — страница публикации с комментариями;
+* user:<id> — то, что видит пользователь: его подписки и ленту;
+* feed:<id> — материализованная лента подписок пользователя, её
+  поднимают рассылка, дозаполнение и чистка ленты, а также правка
+  и удаление публикаций авторов, на которых он подписан.
+"""
+from django.db.models.signals import (post_delete, post_save, pre_delete,
+                                      pre_save)
+from django.dispatch import receiver
+
+from . import feed, generations
+from .models import Comment, Follow, Group, Likes, Post, Profile, User
+from .paginator import invalidate_count
+
+
+def post_changed(post_id):
+    post = (Post.objects.filter(pk=post_id)
+            .values_list("pk", "author_id", "group_id").first())
+    if post is not None:
+        generations.bump(*generations.post_scopes(*post))
+
+
+def _group_scopes(group_id, posts):
+    scopes = {"index", f"group:{group_id}"}
+    for post_id, author_id in posts:
+        scopes.update((f"post:{post_id}", f"profile:{author_id}"))
+    return scopes
+
+
+def group_posts_changed(group_id, post_ids):
+    posts = (Post.all_objects.filter(pk__in=post_ids)
+             .values_list("pk", "author_id"))
+    generations.bump(*_group_scopes(group_id, posts))
+
+
+def group_hidden(group):
+    generations.bump("index", f"group:{group.pk}")
+    invalidate_count("groups", f"author_groups:{group.creator_id}")
+
+
+def user_hidden(user_id):
+    group_ids = (Post.all_objects.filter(author_id=user_id)
+                 .exclude(group_id=None).order_by()
+                 .values_list("group_id", flat=True).distinct())
+    generations.bump("index", f"profile:{user_id}", f"author:{user_id}",
+                     *[f"group:{group_id}" for group_id in group_ids])
+    invalidate_count("authors")
+
+
+@receiver(post_save, sender=Likes)
+def like_saved(sender, instance, created, **kwargs):
+    if created:
+        post_changed(instance.post_id)
+
+
+@receiver(post_delete, sender=Likes)
+def like_deleted(sender, instance, **kwargs):
+    post_changed(instance.post_id)
+
+
+@receiver(post_save, sender=Comment)
+def comment_saved(sender, instance, **kwargs):
+    post_changed(instance.post_id)
+
+
+@receiver(post_delete, sender=Comment)
+def comment_deleted(sender, instance, **kwargs):
+    post_changed(instance.post_id)
+
+
+def _follow_changed(follow):
+    invalidate_count(f"followers:{follow.author_id}",
+                     f"following:{follow.user_id}")
+    generations.bump(f"profile:{follow.author_id}",
+                     f"profile:{follow.user_id}",
+                     f"author:{follow.author_id}",
+                     f"author:{follow.user_id}",
+                     f"user:{follow.user_id}")
+
+
+@receiver(post_save, sender=Follow)
+def follow_saved(sender, instance, created, **kwargs):
+    if created:
+        _follow_changed(instance)
+
+
+@receiver(post_delete, sender=Follow)
+def follow_deleted(sender, instance, **kwargs):
+    _follow_changed(instance)
+
+
+@receiver(pre_save, sender=Post)
+def post_saving(sender, instance, **kwargs):
+    if instance.pk is not None:
+        instance.previous_group_id = (
+            Post.objects.filter(pk=instance.pk)
+            .values_list("group_id", flat=True).first())
+
+
+@receiver(post_save, sender=Post)
+def post_saved(sender, instance, created, **kwargs):
+    scopes = generations.post_scopes(instance.pk, instance.author_id,
+                                     instance.group_id)
+    previous_group_id = getattr(instance, "previous_group_id", None)
+    if previous_group_id not in (None, instance.group_id):
+        scopes.append(f"group:{previous_group_id}")
+    generations.bump(*scopes)
+    if not created:
+        # Новые публикации поднимают ленты при рассылке.
+        feed.followers_changed(instance.author_id)
+
+
+@receiver(post_delete, sender=Post)
+def post_deleted(sender, instance, **kwargs):
+    generations.bump(*generations.post_scopes(
+        instance.pk, instance.author_id, instance.group_id))
+
+
+@receiver(post_save, sender=Group)
+def group_saved(sender, instance, created, **kwargs):
+    if created:
+        invalidate_count("groups", f"author_groups:{instance.creator_id}")
+        return
+    posts = instance.posts.values_list("pk", "author_id")
+    generations.bump(*_group_scopes(instance.pk, posts))
+
+
+@receiver(pre_delete, sender=Group)
+def group_deleting(sender, instance, **kwargs):
+    instance.invalidation_posts = list(
+        instance.posts.values_list("pk", "author_id"))
+
+
+@receiver(post_delete, sender=Group)
+def group_deleted(sender, instance, **kwargs):
+    posts = getattr(instance, "invalidation_posts", [])
+    generations.bump(*_group_scopes(instance.pk, posts))
+    invalidate_count("groups", f"author_groups:{instance.creator_id}")
+
+
+@receiver(post_save, sender=User)
+def user_saved(sender, instance, created, **kwargs):
+    if created:
+        invalidate_count("authors")
+
+
+@receiver(post_delete, sender=User)
+def user_deleted(sender, instance, **kwargs):
+    invalidate_count("authors")
+
+
+@receiver(post_save, sender=Profile)
+def profile_saved(sender, instance, **kwargs):
+    generations.bump(f"profile:{instance.user_id}",
+                     f"author:{instance.user_id}")
@@ -0,0 +1,34 @@
+from django.db import IntegrityError, transaction
+
+from .models import Likes, Post
+
+
+def toggle_like(user, post_id):
+    """Ставит или снимает лайк, возвращает (лайк стоит, число лайков).
+
+    Уникальное ограничение на (user, post) не даёт одновременным
+    кликам создать дубликат.
+    """
+    with transaction.atomic():
+        deleted, _ = Likes.objects.filter(user=user, post_id=post_id).delete()
+        liked = not deleted
+        if liked:
+            try:
+                with transaction.atomic():
+                    Likes.objects.create(user=user, post_id=post_id)
+            except IntegrityError:
+                pass
+    likes_count = (Post.objects.filter(pk=post_id)
+                   .values_list("likes_count", flat=True).first())
+    return liked, likes_count or 0
+
+
+def liked_post_ids(user, posts):
+    """Множество id публикаций из posts, которые лайкнул user."""
+    if not user.is_authenticated:
+        return set()
+    post_ids = [post.pk for post in posts]
+    if not post_ids:
+        return set()
+    return set(Likes.objects.filter(user=user, post_id__in=post_ids)
+               .values_list("post_id", flat=True))
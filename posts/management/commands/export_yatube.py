@@ -0,0 +1,30 @@
+import sys
+
+from django.core.management.base import BaseCommand
+
+from posts import transfer
+
+
+class Command(BaseCommand):
+    help = ("Выгружает пользователей, профили, группы, публикации, "
+            "комментарии, подписки и лайки в NDJSON")
+
+    def add_arguments(self, parser):
+        parser.add_argument("output", help="Файл или - для stdout")
+        parser.add_argument("--chunk-size", type=int, default=2000)
+
+    def handle(self, *args, **options):
+        if options["output"] == "-":
+            self.export(sys.stdout, options["chunk_size"])
+            return
+        with open(options["output"], "w", encoding="utf-8") as output:
+            exported = self.export(output, options["chunk_size"])
+        self.stdout.write(f"Выгружено объектов: {exported}")
+
+    def export(self, output, chunk_size):
+        exported = 0
+        for line in transfer.export_lines(chunk_size):
+            output.write(line)
+            output.write("\n")
+            exported += 1
+        return exported
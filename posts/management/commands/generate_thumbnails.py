@@ -0,0 +1,44 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from posts import thumbnails
+from posts.models import Post, Profile
+
+
+def _generate(name):
+    try:
+        return thumbnails.generate(name)
+    finally:
+        connections.close_all()
+
+
+class Command(BaseCommand):
+    help = ("Создаёт миниатюры для картинок, загруженных до появления "
+            "вариантов")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--processes", type=int, default=os.cpu_count())
+
+    def find_images(self):
+        # Картинкам с вариантами миниатюры не нужны, а сами варианты
+        # лежат в тех же каталогах и не должны обрабатываться.
+        for model in (Post, Profile):
+            names = (model._base_manager.filter(image_variants="")
+                     .exclude(image="").exclude(image__isnull=True)
+                     .values_list("image", flat=True).distinct())
+            yield from names.iterator()
+
+    def handle(self, *args, **options):
+        names = list(self.find_images())
+        connections.close_all()
+        done = failed = 0
+        with ProcessPoolExecutor(max_workers=options["processes"]) as pool:
+            for ok in pool.map(_generate, names, chunksize=16):
+                if ok:
+                    done += 1
+                else:
+                    failed += 1
+        self.stdout.write(f"Обработано картинок: {done}, ошибок: {failed}")
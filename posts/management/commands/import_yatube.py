@@ -0,0 +1,57 @@
+import json
+import os
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+
+from posts import transfer
+
+
+class Command(BaseCommand):
+    help = ("Загружает NDJSON, выгруженный export_yatube. Прерванную "
+            "загрузку можно продолжить повторным запуском")
+
+    def add_arguments(self, parser):
+        parser.add_argument("input")
+        parser.add_argument("--chunk-size", type=int, default=2000)
+        parser.add_argument(
+            "--state", help="Файл прогресса, по умолчанию <input>.progress")
+        parser.add_argument("--skip-rebuild", action="store_true",
+                            help="Не перестраивать ленты и поисковый индекс")
+
+    def handle(self, *args, **options):
+        state_path = options["state"] or f"{options['input']}.progress"
+        state = self.load_state(state_path)
+        importer = transfer.Importer(state["offsets"], options["chunk_size"])
+        if state["line"]:
+            self.stdout.write(f"Продолжение со строки {state['line'] + 1}")
+        with open(options["input"], encoding="utf-8") as lines:
+            for model, batch, line in importer.chunks(lines, state["line"]):
+                try:
+                    importer.save(model, batch)
+                except transfer.ImportConflict as exc:
+                    raise CommandError(exc)
+                state["line"] = line
+                self.save_state(state_path, state)
+                self.stdout.write(f"{model.__name__}: строка {line}")
+        transfer.reset_sequences()
+        # Картинки загружены в обход хранилища, ссылок на них ещё нет.
+        call_command("recount_stored_files", stdout=self.stdout)
+        if not options["skip_rebuild"]:
+            call_command("rebuild_feeds", stdout=self.stdout)
+            call_command("rebuild_search_index", stdout=self.stdout)
+        os.remove(state_path)
+
+    def load_state(self, path):
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as state_file:
+                return json.load(state_file)
+        state = {"offsets": transfer.current_offsets(), "line": 0}
+        self.save_state(path, state)
+        return state
+
+    def save_state(self, path, state):
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as state_file:
+            json.dump(state, state_file)
+        os.replace(tmp_path, path)
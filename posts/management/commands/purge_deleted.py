@@ -0,0 +1,23 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from posts import purge
+
+
+class Command(BaseCommand):
+    help = ("Удаляет данные удалённых пользователей, публикаций и групп "
+            "из очереди заданий")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int,
+                            default=settings.PURGE_BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        done = 0
+        for job in purge.pending():
+            if purge.attempt(job, options["batch_size"]):
+                self.stdout.write(f"{job}: удалено строк {job.purged}")
+                done += 1
+            else:
+                self.stderr.write(f"{job}: ошибка, попытка {job.attempts}")
+        self.stdout.write(f"Выполнено заданий: {done}")
@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from posts import feed
+from posts.models import FeedEntry, Follow
+
+
+class Command(BaseCommand):
+    help = "Заново заполняет материализованные ленты подписок"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--chunk-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        chunk_size = options["chunk_size"]
+        FeedEntry.objects.all().delete()
+        rebuilt = 0
+        last_pk = 0
+        while True:
+            chunk = list(Follow.objects.filter(pk__gt=last_pk).order_by("pk")
+                         .values_list("pk", "user_id", "author_id")
+                         [:chunk_size])
+            if not chunk:
+                break
+            with transaction.atomic():
+                for last_pk, user_id, author_id in chunk:
+                    feed.backfill(user_id, author_id)
+            rebuilt += len(chunk)
+            self.stdout.write(f"Обработано подписок: {rebuilt}")
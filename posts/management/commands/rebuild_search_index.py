@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from posts import search
+from posts.models import Post
+
+
+class Command(BaseCommand):
+    help = "Перестраивает полнотекстовый индекс публикаций"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--chunk-size", type=int, default=2000)
+
+    def handle(self, *args, **options):
+        if not search.is_available():
+            self.stderr.write("Полнотекстовый индекс поддерживается "
+                              "только для SQLite")
+            return
+        chunk_size = options["chunk_size"]
+        indexed = 0
+        with transaction.atomic():
+            search.create_index()
+            search.clear_index()
+            posts = (Post.objects.select_related("author", "group")
+                     .order_by("pk").iterator(chunk_size=chunk_size))
+            chunk = []
+            for post in posts:
+                chunk.append(post)
+                if len(chunk) == chunk_size:
+                    search.index_posts(chunk)
+                    indexed += len(chunk)
+                    chunk = []
+            search.index_posts(chunk)
+            indexed += len(chunk)
+        self.stdout.write(f"Проиндексировано публикаций: {indexed}")
@@ -0,0 +1,73 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from posts.models import Comment, Follow, Likes, Post, Profile, User
+
+
+def _count_subquery(queryset, field, outer="pk"):
+    counts = (queryset.filter(**{field: OuterRef(outer)})
+              .order_by().values(field)
+              .annotate(total=Count("pk")).values("total"))
+    return Coalesce(Subquery(counts, output_field=IntegerField()), 0)
+
+
+class Command(BaseCommand):
+    help = ("Пересчитывает счётчики лайков и комментариев у публикаций "
+            "и счётчики подписок у профилей")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--chunk-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        chunk_size = options["chunk_size"]
+        self.create_missing_profiles(chunk_size)
+        fixed = self.recount(Post.objects.all(), chunk_size, {
+            "likes_count": _count_subquery(Likes.objects.all(), "post"),
+            "comments_count": _count_subquery(Comment.objects.all(), "post"),
+        })
+        self.stdout.write(f"Исправлено публикаций: {fixed}")
+        fixed = self.recount(Profile.objects.all(), chunk_size, {
+            "followers_count": _count_subquery(
+                Follow.objects.all(), "author", "user"),
+            "followings_count": _count_subquery(
+                Follow.objects.all(), "user", "user"),
+        })
+        self.stdout.write(f"Исправлено профилей: {fixed}")
+
+    def create_missing_profiles(self, chunk_size):
+        while True:
+            user_ids = list(User.objects.filter(profile__isnull=True)
+                            .values_list("pk", flat=True)[:chunk_size])
+            if not user_ids:
+                break
+            Profile.objects.bulk_create(
+                [Profile(user_id=user_id) for user_id in user_ids])
+
+    def recount(self, queryset, chunk_size, counters):
+        annotations = {f"actual_{field}": expression
+                       for field, expression in counters.items()}
+        fixed = 0
+        last_pk = 0
+        while True:
+            with transaction.atomic():
+                chunk = list(queryset.filter(pk__gt=last_pk).order_by("pk")
+                             .annotate(**annotations)
+                             .only("pk", *counters)[:chunk_size])
+                if not chunk:
+                    break
+                drifted = []
+                for obj in chunk:
+                    changed = False
+                    for field in counters:
+                        actual = getattr(obj, f"actual_{field}")
+                        if getattr(obj, field) != actual:
+                            setattr(obj, field, actual)
+                            changed = True
+                    if changed:
+                        drifted.append(obj)
+                queryset.model.objects.bulk_update(drifted, list(counters))
+            fixed += len(drifted)
+            last_pk = chunk[-1].pk
+        return fixed
@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+
+from posts.storage import recount_references
+
+
+class Command(BaseCommand):
+    help = ("Пересчитывает ссылки на файлы картинок по публикациям "
+            "и профилям")
+
+    def handle(self, *args, **options):
+        fixed = recount_references()
+        self.stdout.write(f"Исправлено файлов: {fixed}")
@@ -0,0 +1,48 @@
+import os
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from posts import benchmark
+
+
+class Command(BaseCommand):
+    help = ("Замеряет p50/p95 и число запросов публичных страниц "
+            "и сравнивает их с сохранёнными замерами")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--repeat", type=int, default=20)
+        parser.add_argument("--cold", action="store_true",
+                            help="Очищать кэш перед каждым запросом")
+        parser.add_argument(
+            "--baseline",
+            default=os.path.join(settings.BASE_DIR, "benchmark_baseline.json"))
+        parser.add_argument("--save-baseline", action="store_true")
+        parser.add_argument("--threshold", type=float, default=0.2,
+                            help="Допустимый рост p95, доля от базового")
+
+    def handle(self, *args, **options):
+        try:
+            results = benchmark.run(benchmark.Scenario(), options["repeat"],
+                                    options["cold"])
+        except benchmark.BenchmarkError as exc:
+            raise CommandError(exc)
+        for name, result in results.items():
+            self.stdout.write(
+                f"{name:<24} p50 {result['p50_ms']:>8} мс  "
+                f"p95 {result['p95_ms']:>8} мс  "
+                f"запросов {result['queries']}")
+        path = options["baseline"]
+        if options["save_baseline"]:
+            benchmark.save_baseline(path, results)
+            self.stdout.write(f"Замеры сохранены в {path}")
+            return
+        if not os.path.exists(path):
+            raise CommandError(f"Нет сохранённых замеров {path}, "
+                               "запустите с --save-baseline")
+        regressions = benchmark.compare(
+            results, benchmark.load_baseline(path), options["threshold"])
+        if regressions:
+            raise CommandError("Регрессии производительности:\n"
+                               + "\n".join(regressions))
+        self.stdout.write("Регрессий нет")
@@ -0,0 +1,165 @@
+import datetime
+import itertools
+import random
+
+from django.contrib.auth.hashers import make_password
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from posts.models import Comment, Follow, Group, Likes, Post, User
+from posts.transfer import explicit_dates
+
+USERNAME_PREFIX = "bench"
+WORDS = ("яблоко", "город", "музыка", "вечер", "дорога", "книга", "море",
+         "работа", "кошка", "лето", "поезд", "друг", "кино", "снег",
+         "python", "django", "погода", "праздник", "фото", "новости")
+
+
+def power_law_weights(count, exponent):
+    """Накопленные веса Ципфа: i-й по популярности весит 1 / i^exponent."""
+    return list(itertools.accumulate(
+        1 / rank ** exponent for rank in range(1, count + 1)))
+
+
+class Command(BaseCommand):
+    help = ("Заполняет базу данными для замеров производительности: "
+            "подписки со степенным распределением, публикации, лайки, "
+            "комментарии и группы")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=1000)
+        parser.add_argument("--posts", type=int, default=100000)
+        parser.add_argument("--groups", type=int, default=50)
+        parser.add_argument("--follows", type=int, default=30,
+                            help="Среднее число подписок пользователя")
+        parser.add_argument("--likes", type=int, default=300000)
+        parser.add_argument("--comments", type=int, default=100000)
+        parser.add_argument("--exponent", type=float, default=1.1,
+                            help="Показатель степенного распределения")
+        parser.add_argument("--days", type=int, default=365)
+        parser.add_argument("--batch-size", type=int, default=5000)
+        parser.add_argument("--seed", type=int, default=1)
+
+    def handle(self, *args, **options):
+        if User.objects.filter(
+                username__startswith=f"{USERNAME_PREFIX}_").exists():
+            raise CommandError("Данные для замеров уже созданы")
+        self.random = random.Random(options["seed"])
+        self.batch_size = options["batch_size"]
+        self.now = timezone.now()
+        self.period = datetime.timedelta(days=options["days"])
+
+        user_ids = self.create_users(options["users"])
+        # Первые пользователи самые популярные авторы.
+        self.author_weights = power_law_weights(len(user_ids),
+                                                options["exponent"])
+        group_ids = self.create_groups(options["groups"], user_ids)
+        self.create_follows(user_ids, options["follows"])
+        post_ids = self.create_posts(options["posts"], user_ids, group_ids)
+        self.create_likes(options["likes"], user_ids, post_ids)
+        self.create_comments(options["comments"], user_ids, post_ids)
+
+        call_command("recount_counters", stdout=self.stdout)
+        call_command("rebuild_feeds", stdout=self.stdout)
+        call_command("rebuild_search_index", stdout=self.stdout)
+
+    def batches(self, objects):
+        batch = []
+        for obj in objects:
+            batch.append(obj)
+            if len(batch) == self.batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    def bulk_create(self, model, objects, total, **kwargs):
+        created = 0
+        for batch in self.batches(objects):
+            with transaction.atomic():
+                model.objects.bulk_create(batch, **kwargs)
+            created += len(batch)
+            self.stdout.write(
+                f"{model.__name__}: {created} из {total}")
+
+    def random_date(self):
+        return self.now - self.period * self.random.random()
+
+    def random_text(self, words):
+        return " ".join(self.random.choices(WORDS, k=words))
+
+    def pick_authors(self, user_ids, count):
+        return self.random.choices(user_ids, cum_weights=self.author_weights,
+                                   k=count)
+
+    def create_users(self, count):
+        password = make_password(None)
+        self.bulk_create(User, (
+            User(username=f"{USERNAME_PREFIX}_{index}", password=password)
+            for index in range(count)), count)
+        return list(User.objects.filter(
+            username__startswith=f"{USERNAME_PREFIX}_")
+            .order_by("pk").values_list("pk", flat=True))
+
+    def create_groups(self, count, user_ids):
+        self.bulk_create(Group, (
+            Group(title=f"Группа {index}",
+                  slug=f"{USERNAME_PREFIX}-group-{index}",
+                  description=self.random_text(10),
+                  creator_id=self.random.choice(user_ids))
+            for index in range(count)), count)
+        return list(Group.objects.filter(
+            slug__startswith=f"{USERNAME_PREFIX}-group-")
+            .values_list("pk", flat=True))
+
+    def create_follows(self, user_ids, average):
+        def follows():
+            for user_id in user_ids:
+                count = min(int(self.random.expovariate(1 / average)),
+                            len(user_ids) - 1)
+                authors = set(self.pick_authors(user_ids, count))
+                authors.discard(user_id)
+                for author_id in authors:
+                    yield Follow(user_id=user_id, author_id=author_id)
+
+        self.bulk_create(Follow, follows(), "?", ignore_conflicts=True)
+
+    def create_posts(self, count, user_ids, group_ids):
+        dates = sorted(self.random_date() for _ in range(count))
+        authors = self.pick_authors(user_ids, count)
+
+        def posts():
+            for author_id, pub_date in zip(authors, dates):
+                group_id = None
+                if group_ids and self.random.random() < 0.7:
+                    group_id = self.random.choice(group_ids)
+                yield Post(author_id=author_id, group_id=group_id,
+                           pub_date=pub_date,
+                           text=self.random_text(self.random.randint(5, 60)))
+
+        with explicit_dates(Post):
+            self.bulk_create(Post, posts(), count)
+        return list(Post.objects.filter(
+            author__username__startswith=f"{USERNAME_PREFIX}_")
+            .values_list("pk", flat=True))
+
+    def create_likes(self, count, user_ids, post_ids):
+        if not post_ids:
+            return
+        self.bulk_create(Likes, (
+            Likes(user_id=self.random.choice(user_ids),
+                  post_id=self.random.choice(post_ids))
+            for _ in range(count)), count, ignore_conflicts=True)
+
+    def create_comments(self, count, user_ids, post_ids):
+        if not post_ids:
+            return
+        with explicit_dates(Comment):
+            self.bulk_create(Comment, (
+                Comment(author_id=self.random.choice(user_ids),
+                        post_id=self.random.choice(post_ids),
+                        created=self.random_date(),
+                        text=self.random_text(self.random.randint(3, 20)))
+                for _ in range(count)), count)
@@ -0,0 +1,248 @@
+import threading
+import time
+from collections import defaultdict
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+from django.http import Http404, HttpResponse
+from django.template import TemplateDoesNotExist
+from django.template.backends import django as django_backend
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5,
+                   5.0, 10.0)
+UNRESOLVED_VIEW = "<unresolved>"
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+_local = threading.local()
+
+
+class RequestStats:
+    __slots__ = ("sql_queries", "sql_seconds", "template_seconds",
+                 "cache_hits", "cache_misses")
+
+    def __init__(self):
+        self.sql_queries = 0
+        self.sql_seconds = 0.0
+        self.template_seconds = 0.0
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+    def sql_wrapper(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.sql_queries += 1
+            self.sql_seconds += time.perf_counter() - start
+
+
+def current_stats():
+    return getattr(_local, "stats", None)
+
+
+class ViewMetrics:
+    __slots__ = ("requests", "buckets", "latency_sum", "sql_queries",
+                 "sql_seconds", "template_seconds", "cache_hits",
+                 "cache_misses")
+
+    def __init__(self):
+        self.requests = 0
+        self.buckets = [0] * len(LATENCY_BUCKETS)
+        self.latency_sum = 0.0
+        self.sql_queries = 0
+        self.sql_seconds = 0.0
+        self.template_seconds = 0.0
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+
+class Registry:
+    """Метрики запросов, накопленные в процессе, по именам URL."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._views = defaultdict(ViewMetrics)
+
+    def observe(self, view_name, latency, stats):
+        with self._lock:
+            metrics = self._views[view_name]
+            metrics.requests += 1
+            metrics.latency_sum += latency
+            for index, bound in enumerate(LATENCY_BUCKETS):
+                if latency <= bound:
+                    metrics.buckets[index] += 1
+                    break
+            metrics.sql_queries += stats.sql_queries
+            metrics.sql_seconds += stats.sql_seconds
+            metrics.template_seconds += stats.template_seconds
+            metrics.cache_hits += stats.cache_hits
+            metrics.cache_misses += stats.cache_misses
+
+    def reset(self):
+        with self._lock:
+            self._views.clear()
+
+    def snapshot(self):
+        with self._lock:
+            return {name: _copy(metrics)
+                    for name, metrics in sorted(self._views.items())}
+
+    def render(self):
+        """Текстовый формат экспорта Prometheus 0.0.4."""
+        views = self.snapshot()
+        lines = [
+            "# HELP yatube_request_duration_seconds "
+            "Время обработки запроса.",
+            "# TYPE yatube_request_duration_seconds histogram",
+        ]
+        for name, metrics in views.items():
+            view = _label(name)
+            cumulative = 0
+            for bound, count in zip(LATENCY_BUCKETS, metrics.buckets):
+                cumulative += count
+                lines.append(f"yatube_request_duration_seconds_bucket"
+                             f'{{view="{view}",le="{bound}"}} {cumulative}')
+            lines.extend([
+                f"yatube_request_duration_seconds_bucket"
+                f'{{view="{view}",le="+Inf"}} {metrics.requests}',
+                f'yatube_request_duration_seconds_sum{{view="{view}"}} '
+                f"{metrics.latency_sum}",
+                f'yatube_request_duration_seconds_count{{view="{view}"}} '
+                f"{metrics.requests}",
+            ])
+        for metric, kind, help_text, attr in COUNTERS:
+            lines.append(f"# HELP {metric} {help_text}")
+            lines.append(f"# TYPE {metric} {kind}")
+            for name, metrics in views.items():
+                lines.append(f'{metric}{{view="{_label(name)}"}} '
+                             f"{getattr(metrics, attr)}")
+        lines.append("# HELP yatube_cache_requests_total "
+                     "Обращения к кэшу по результату.")
+        lines.append("# TYPE yatube_cache_requests_total counter")
+        for name, metrics in views.items():
+            view = _label(name)
+            lines.append(f'yatube_cache_requests_total{{view="{view}",'
+                         f'result="hit"}} {metrics.cache_hits}')
+            lines.append(f'yatube_cache_requests_total{{view="{view}",'
+                         f'result="miss"}} {metrics.cache_misses}')
+        return "\n".join(lines) + "\n"
+
+
+COUNTERS = (
+    ("yatube_sql_queries_total", "counter", "Число SQL-запросов.",
+     "sql_queries"),
+    ("yatube_sql_duration_seconds_total", "counter",
+     "Время выполнения SQL-запросов.", "sql_seconds"),
+    ("yatube_template_render_seconds_total", "counter",
+     "Время рендеринга шаблонов.", "template_seconds"),
+)
+
+
+def _copy(metrics):
+    copy = ViewMetrics()
+    for attr in ViewMetrics.__slots__:
+        value = getattr(metrics, attr)
+        setattr(copy, attr, list(value) if attr == "buckets" else value)
+    return copy
+
+
+def _label(value):
+    return (value.replace("\\", "\\\\").replace('"', '\\"')
+            .replace("\n", "\\n"))
+
+
+registry = Registry()
+
+
+class MetricsMiddleware:
+    """Собирает задержку, SQL, время шаблонов и попадания в кэш.
+
+    Метрики группируются по имени URL (posts:index, posts:profile, …)
+    и отдаются представлением metrics.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        stats = RequestStats()
+        _local.stats = stats
+        start = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(
+                        connection.execute_wrapper(stats.sql_wrapper))
+                response = self.get_response(request)
+        finally:
+            _local.stats = None
+        latency = time.perf_counter() - start
+        match = getattr(request, "resolver_match", None)
+        view_name = match.view_name if match else UNRESOLVED_VIEW
+        registry.observe(view_name, latency, stats)
+        return response
+
+
+def metrics(request):
+    if request.META.get("REMOTE_ADDR") not in settings.INTERNAL_IPS:
+        raise Http404
+    return HttpResponse(registry.render(), content_type=CONTENT_TYPE)
+
+
+class TimedTemplate(django_backend.Template):
+    def render(self, context=None, request=None):
+        stats = current_stats()
+        if stats is None:
+            return super().render(context, request)
+        start = time.perf_counter()
+        try:
+            return super().render(context, request)
+        finally:
+            stats.template_seconds += time.perf_counter() - start
+
+
+class DjangoTemplates(django_backend.DjangoTemplates):
+    """Шаблонизатор Django, замеряющий время рендеринга шаблонов."""
+
+    def from_string(self, template_code):
+        return TimedTemplate(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        try:
+            return TimedTemplate(self.engine.get_template(template_name),
+                                 self)
+        except TemplateDoesNotExist as exc:
+            django_backend.reraise(exc, self)
+
+
+_MISSING = object()
+
+
+class CacheMetricsMixin:
+    """Считает попадания и промахи кэша для текущего запроса."""
+
+    def get(self, key, default=None, version=None):
+        value = super().get(key, _MISSING, version)
+        stats = current_stats()
+        if value is _MISSING:
+            if stats is not None:
+                stats.cache_misses += 1
+            return default
+        if stats is not None:
+            stats.cache_hits += 1
+        return value
+
+    def get_many(self, keys, version=None):
+        keys = list(keys)
+        stats = current_stats()
+        # BaseCache.get_many вызывает get(), на это время счёт отключается.
+        _local.stats = None
+        try:
+            found = super().get_many(keys, version)
+        finally:
+            _local.stats = stats
+        if stats is not None:
+            stats.cache_hits += len(found)
+            stats.cache_misses += len(keys) - len(found)
+        return found
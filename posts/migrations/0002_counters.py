@@ -0,0 +1,59 @@
+from django.db import migrations, models
+from django.db.models import Count, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def _count(model, field, outer="pk"):
+    counts = (model.objects.filter(**{field: OuterRef(outer)})
+              .order_by().values(field)
+              .annotate(total=Count("pk")).values("total"))
+    return Coalesce(Subquery(counts, output_field=IntegerField()), 0)
+
+
+def fill_counters(apps, schema_editor):
+    Post = apps.get_model("posts", "Post")
+    Profile = apps.get_model("posts", "Profile")
+    Likes = apps.get_model("posts", "Likes")
+    Comment = apps.get_model("posts", "Comment")
+    Follow = apps.get_model("posts", "Follow")
+    Post.objects.update(likes_count=_count(Likes, "post"),
+                        comments_count=_count(Comment, "post"))
+    Profile.objects.update(
+        followers_count=_count(Follow, "author", "user"),
+        followings_count=_count(Follow, "user", "user"))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='likes_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Количество лайков'),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='comments_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Количество комментариев'),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='version',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Версия'),
+        ),
+        migrations.AddField(
+            model_name='profile',
+            name='followers_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Количество подписчиков'),
+        ),
+        migrations.AddField(
+            model_name='profile',
+            name='followings_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Количество подписок'),
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,55 @@
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+BATCH_SIZE = 500
+
+
+def fill_feeds(apps, schema_editor):
+    """Ленты существующих подписок, как после rebuild_feeds."""
+    Follow = apps.get_model("posts", "Follow")
+    Post = apps.get_model("posts", "Post")
+    FeedEntry = apps.get_model("posts", "FeedEntry")
+    follows = (Follow.objects.order_by("pk")
+               .values_list("user_id", "author_id").iterator())
+    for user_id, author_id in follows:
+        posts = (Post.objects.filter(author_id=author_id)
+                 .order_by("-pub_date", "-pk")
+                 .values_list("pk", "pub_date")[:settings.FEED_MAX_LENGTH])
+        FeedEntry.objects.bulk_create(
+            [FeedEntry(user_id=user_id, post_id=post_id, pub_date=pub_date)
+             for post_id, pub_date in posts],
+            batch_size=BATCH_SIZE, ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('posts', '0002_counters'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FeedEntry',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('pub_date', models.DateTimeField(verbose_name='Дата публикации')),
+                ('post', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='feed_entries', to='posts.Post', verbose_name='Публикация')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='feed_entries', to=settings.AUTH_USER_MODEL, verbose_name='Подписчик')),
+            ],
+            options={
+                'verbose_name_plural': 'Ленты подписок',
+                'ordering': ['-pub_date'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='feedentry',
+            index=models.Index(fields=['user', '-pub_date', '-post'], name='feed_user_pub_date_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='feedentry',
+            constraint=models.UniqueConstraint(fields=('user', 'post'), name='unique feed entry'),
+        ),
+        migrations.RunPython(fill_feeds, migrations.RunPython.noop),
+    ]
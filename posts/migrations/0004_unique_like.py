@@ -0,0 +1,36 @@
+from django.db import migrations, models
+from django.db.models import Count, Min
+
+
+def remove_duplicate_likes(apps, schema_editor):
+    """Оставляет по одному лайку на пару (пользователь, публикация)."""
+    Likes = apps.get_model("posts", "Likes")
+    Post = apps.get_model("posts", "Post")
+    duplicates = (Likes.objects.order_by().values("user_id", "post_id")
+                  .annotate(first_id=Min("pk"), total=Count("pk"))
+                  .filter(total__gt=1))
+    post_ids = set()
+    for row in list(duplicates):
+        Likes.objects.filter(user_id=row["user_id"],
+                             post_id=row["post_id"]).exclude(
+            pk=row["first_id"]).delete()
+        post_ids.add(row["post_id"])
+    for post_id in post_ids:
+        Post.objects.filter(pk=post_id).update(
+            likes_count=Likes.objects.filter(post_id=post_id).count())
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0003_feedentry'),
+    ]
+
+    operations = [
+        migrations.RunPython(remove_duplicate_likes,
+                             migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='likes',
+            constraint=models.UniqueConstraint(fields=('user', 'post'), name='unique like'),
+        ),
+    ]
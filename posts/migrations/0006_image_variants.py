@@ -0,0 +1,34 @@
+# Generated by Django 2.2.6 on 2026-10-18 18:12
+
+from django.db import migrations, models
+import posts.images
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0005_composite_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='image_variants',
+            field=models.TextField(blank=True, default='', editable=False, verbose_name='Варианты картинки'),
+        ),
+        migrations.AddField(
+            model_name='profile',
+            name='image_variants',
+            field=models.TextField(blank=True, default='', editable=False, verbose_name='Варианты аватара'),
+        ),
+        migrations.AlterField(
+            model_name='post',
+            name='image',
+            field=models.ImageField(blank=True, help_text='Загрузите картинку', null=True, upload_to='posts/', validators=[posts.images.validate_image_dimensions], verbose_name='Картинка'),
+        ),
+        migrations.AlterField(
+            model_name='profile',
+            name='image',
+            field=models.ImageField(blank=True, null=True, upload_to='users/', validators=[posts.images.validate_image_dimensions], verbose_name='Аватар'),
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 2.2.6 on 2026-10-18 18:14
+
+from django.db import migrations, models
+import posts.images
+import posts.storage
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0006_image_variants'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StoredFile',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=255, unique=True, verbose_name='Имя файла')),
+                ('references', models.PositiveIntegerField(default=0, verbose_name='Число ссылок')),
+            ],
+            options={
+                'verbose_name_plural': 'Загруженные файлы',
+            },
+        ),
+        migrations.AlterField(
+            model_name='post',
+            name='image',
+            field=models.ImageField(blank=True, help_text='Загрузите картинку', null=True, storage=posts.storage.ContentAddressedStorage(), upload_to='posts/', validators=[posts.images.validate_image_dimensions], verbose_name='Картинка'),
+        ),
+        migrations.AlterField(
+            model_name='profile',
+            name='image',
+            field=models.ImageField(blank=True, null=True, storage=posts.storage.ContentAddressedStorage(), upload_to='users/', validators=[posts.images.validate_image_dimensions], verbose_name='Аватар'),
+        ),
+    ]
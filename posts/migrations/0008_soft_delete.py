@@ -0,0 +1,43 @@
+# Generated by Django 2.2.6 on 2026-10-18 18:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0007_content_addressed_storage'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PurgeJob',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('user', 'Пользователь'), ('post', 'Публикация'), ('group', 'Группа')], max_length=10, verbose_name='Тип объекта')),
+                ('object_id', models.PositiveIntegerField(verbose_name='id объекта')),
+                ('created', models.DateTimeField(auto_now_add=True, verbose_name='Поставлено в очередь')),
+                ('updated', models.DateTimeField(auto_now=True, verbose_name='Обновлено')),
+                ('finished', models.DateTimeField(blank=True, null=True, verbose_name='Завершено')),
+                ('stage', models.CharField(blank=True, max_length=50, verbose_name='Этап')),
+                ('purged', models.PositiveIntegerField(default=0, verbose_name='Удалено строк')),
+            ],
+            options={
+                'verbose_name_plural': 'Задания на удаление',
+            },
+        ),
+        migrations.AddField(
+            model_name='group',
+            name='deleted_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True, verbose_name='Удалена'),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='deleted_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True, verbose_name='Удалена'),
+        ),
+        migrations.AddConstraint(
+            model_name='purgejob',
+            constraint=models.UniqueConstraint(fields=('kind', 'object_id'), name='unique purge job'),
+        ),
+    ]
@@ -0,0 +1,37 @@
+from collections import Counter
+import json
+
+from django.db import migrations
+
+
+def fill_references(apps, schema_editor):
+    """Ссылки на файлы, сохранённые до появления StoredFile."""
+    StoredFile = apps.get_model("posts", "StoredFile")
+    counts = Counter()
+    for model_name in ("Post", "Profile"):
+        model = apps.get_model("posts", model_name)
+        rows = (model._base_manager.exclude(image="")
+                .exclude(image__isnull=True)
+                .values_list("image", "image_variants").iterator())
+        for image, variants in rows:
+            counts[image] += 1
+            counts.update(name for name, _, _ in json.loads(variants or "[]"))
+    stored = dict(StoredFile.objects.values_list("name", "references"))
+    StoredFile.objects.bulk_create(
+        [StoredFile(name=name, references=references)
+         for name, references in counts.items() if name not in stored],
+        batch_size=500)
+    for name, references in counts.items():
+        if name in stored and stored[name] != references:
+            StoredFile.objects.filter(name=name).update(references=references)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0008_soft_delete'),
+    ]
+
+    operations = [
+        migrations.RunPython(fill_references, migrations.RunPython.noop),
+    ]
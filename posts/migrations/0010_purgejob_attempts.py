@@ -0,0 +1,18 @@
+# Generated by Django 2.2.6 on 2026-10-18 18:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0009_stored_file_references'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='purgejob',
+            name='attempts',
+            field=models.PositiveIntegerField(default=0, verbose_name='Попыток'),
+        ),
+    ]
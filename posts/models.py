@@ -1,30 +1,66 @@
 from django.db import models
 from django.contrib.auth import get_user_model
 
+from .images import validate_image_dimensions
+from .storage import content_addressed_storage
+
 
 
 
 User = get_user_model()
 
 
+class PostManager(models.Manager):
+    """Публикации без отметки об удалении у них и у их авторов."""
+
+    def get_queryset(self):
+        return super().get_queryset().filter(deleted_at__isnull=True,
+                                             author__is_active=True)
+
+
 class Post(models.Model):
     text = models.TextField("Текст", help_text="Введите текст публикации")
     pub_date = models.DateTimeField("Дата публикации", auto_now_add=True)
     author = models.ForeignKey(User, on_delete=models.CASCADE,
-                               related_name="posts", verbose_name="Автор")
+                               related_name="posts", verbose_name="Автор",
+                               db_index=False)
     group = models.ForeignKey("Group", on_delete=models.SET_NULL, null=True,
-                              blank=True, related_name="posts",
+                              blank=True, related_name="posts", db_index=False,
                               verbose_name="Группа",
                               help_text="Выберите группу")
     image = models.ImageField(upload_to="posts/", blank=True, null=True,
                               verbose_name="Картинка",
-                              help_text="Загрузите картинку")
+                              help_text="Загрузите картинку",
+                              storage=content_addressed_storage,
+                              validators=[validate_image_dimensions])
+    image_variants = models.TextField("Варианты картинки", blank=True,
+                                      default="", editable=False)
+    likes_count = models.PositiveIntegerField("Количество лайков", default=0,
+                                              editable=False)
+    comments_count = models.PositiveIntegerField("Количество комментариев",
+                                                 default=0, editable=False)
+    version = models.PositiveIntegerField("Версия", default=0,
+                                          editable=False)
+    deleted_at = models.DateTimeField("Удалена", null=True, blank=True,
+                                      editable=False)
+
+    objects = PostManager()
+    all_objects = models.Manager()
 
     def __str__(self):
         return self.text[:15]
 
     class Meta:
         ordering = ["-pub_date"]
+        # Индексы по возрастанию: SQLite читает их в обратном порядке
+        # для сортировки по -pub_date, -id без временного B-дерева.
+        indexes = [
+            models.Index(fields=["author", "pub_date", "id"],
+                         name="post_author_pub_date_idx"),
+            models.Index(fields=["group", "pub_date", "id"],
+                         name="post_group_pub_date_idx"),
+            models.Index(fields=["pub_date", "id"], name="post_pub_date_idx"),
+        ]
         verbose_name_plural = "Публикации"
 
 
@@ -40,6 +76,8 @@ class Group(models.Model):
     creator = models.ForeignKey(User, verbose_name='Создатель группы',
                                 on_delete=models.SET_NULL, blank=True,
                                 null=True)
+    deleted_at = models.DateTimeField("Удалена", null=True, blank=True,
+                                      editable=False)
 
     def __str__(self):
         return self.title
@@ -51,7 +89,7 @@ class Group(models.Model):
 class Comment(models.Model):
     post = models.ForeignKey(Post, on_delete=models.CASCADE,
                              related_name="comments", null=True, blank=True,
-                             verbose_name="Ссылка на пост")
+                             verbose_name="Ссылка на пост", db_index=False)
     author = models.ForeignKey(User, on_delete=models.CASCADE,
                                related_name="comments", verbose_name="Автор")
     text = models.TextField("Комментарий",
@@ -63,6 +101,8 @@ class Comment(models.Model):
 
     class Meta:
         ordering = ["created"]
+        indexes = [models.Index(fields=["post", "created", "id"],
+                                name="comment_post_created_idx")]
         verbose_name = "комментарий"
         verbose_name_plural = "Комментарии"
 
@@ -72,10 +112,12 @@ class Follow(models.Model):
                              related_name="follower", verbose_name="Подписчик")
     author = models.ForeignKey(User, on_delete=models.CASCADE,
                                related_name="following",
-                               verbose_name="Подписка")
+                               verbose_name="Подписка", db_index=False)
 
     class Meta:
         db_table = "Follow"
+        indexes = [models.Index(fields=["author", "id"],
+                                name="follow_author_idx")]
         constraints = [models.UniqueConstraint(fields=["user", "author"],
                                                name="unique follow")]
         verbose_name_plural = "Подписки"
@@ -86,7 +128,15 @@ class Profile(models.Model):
     bio = models.TextField(max_length=500, blank=True,
                            verbose_name="Описание профиля")
     image = models.ImageField(upload_to="users/", blank=True,
-                              null=True, verbose_name="Аватар",)
+                              null=True, verbose_name="Аватар",
+                              storage=content_addressed_storage,
+                              validators=[validate_image_dimensions])
+    image_variants = models.TextField("Варианты аватара", blank=True,
+                                      default="", editable=False)
+    followers_count = models.PositiveIntegerField("Количество подписчиков",
+                                                  default=0, editable=False)
+    followings_count = models.PositiveIntegerField("Количество подписок",
+                                                   default=0, editable=False)
 
 
 class Likes(models.Model):
@@ -94,4 +144,62 @@ class Likes(models.Model):
                              related_name="user_likes")
     post = models.ForeignKey(Post, blank=False, null=False,
                              on_delete=models.CASCADE,
-                             related_name="likes")
+                             related_name="likes", db_index=False)
+
+    class Meta:
+        indexes = [models.Index(fields=["post", "user"],
+                                name="likes_post_user_idx")]
+        constraints = [models.UniqueConstraint(fields=["user", "post"],
+                                               name="unique like")]
+
+
+class FeedEntry(models.Model):
+    user = models.ForeignKey(User, on_delete=models.CASCADE,
+                             related_name="feed_entries",
+                             verbose_name="Подписчик")
+    post = models.ForeignKey(Post, on_delete=models.CASCADE,
+                             related_name="feed_entries",
+                             verbose_name="Публикация")
+    pub_date = models.DateTimeField("Дата публикации")
+
+    class Meta:
+        ordering = ["-pub_date"]
+        indexes = [models.Index(fields=["user", "-pub_date", "-post"],
+                                name="feed_user_pub_date_idx")]
+        constraints = [models.UniqueConstraint(fields=["user", "post"],
+                                               name="unique feed entry")]
+        verbose_name_plural = "Ленты подписок"
+
+
+class StoredFile(models.Model):
+    name = models.CharField("Имя файла", max_length=255, unique=True)
+    references = models.PositiveIntegerField("Число ссылок", default=0)
+
+    class Meta:
+        verbose_name_plural = "Загруженные файлы"
+
+
+class PurgeJob(models.Model):
+    USER = "user"
+    POST = "post"
+    GROUP = "group"
+    KIND_CHOICES = [(USER, "Пользователь"), (POST, "Публикация"),
+                    (GROUP, "Группа")]
+
+    kind = models.CharField("Тип объекта", max_length=10,
+                            choices=KIND_CHOICES)
+    object_id = models.PositiveIntegerField("id объекта")
+    created = models.DateTimeField("Поставлено в очередь", auto_now_add=True)
+    updated = models.DateTimeField("Обновлено", auto_now=True)
+    finished = models.DateTimeField("Завершено", null=True, blank=True)
+    stage = models.CharField("Этап", max_length=50, blank=True)
+    purged = models.PositiveIntegerField("Удалено строк", default=0)
+    attempts = models.PositiveIntegerField("Попыток", default=0)
+
+    def __str__(self):
+        return f"{self.kind}:{self.object_id}"
+
+    class Meta:
+        constraints = [models.UniqueConstraint(fields=["kind", "object_id"],
+                                               name="unique purge job")]
+        verbose_name_plural = "Задания на удаление"
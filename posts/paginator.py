@@ -0,0 +1,233 @@
+import base64
+import binascii
+import datetime
+import json
+from collections.abc import Sequence
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.core.paginator import Page, Paginator
+from django.db.models import Q
+from django.shortcuts import redirect
+from django.utils.functional import cached_property
+
+COUNT_CACHE_PREFIX = "paginator_count"
+
+
+class InvalidCursor(Exception):
+    pass
+
+
+class CursorPage(Sequence):
+    def __init__(self, object_list, paginator, has_next, has_previous,
+                 cursor=None):
+        self.object_list = object_list
+        self.paginator = paginator
+        self._has_next = has_next
+        self._has_previous = has_previous
+        self.cursor = cursor
+
+    def __repr__(self):
+        return f"<CursorPage {self.cursor or 'first'}>"
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def has_next(self):
+        return self._has_next
+
+    def has_previous(self):
+        return self._has_previous
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+    @property
+    def next_cursor(self):
+        if self.has_next():
+            return self.paginator.encode_cursor(self.object_list[-1])
+        return None
+
+    @property
+    def previous_cursor(self):
+        if self.has_previous():
+            return self.paginator.encode_cursor(self.object_list[0])
+        return None
+
+
+class CursorPaginator:
+    """Постраничный вывод по ключу сортировки вместо OFFSET и COUNT(*).
+
+    Сортировка должна быть убывающей и однозначной. Если ordering не
+    передан, берётся сортировка queryset с первичным ключом в конце.
+    Курсор — это значения ключа у крайнего объекта страницы,
+    закодированные в base64.
+    """
+
+    def __init__(self, object_list, per_page, ordering=None):
+        self.object_list = object_list
+        self.per_page = int(per_page)
+        if ordering is None:
+            ordering = list(object_list.query.order_by
+                            or object_list.model._meta.ordering)
+            if "-pk" not in ordering and "-id" not in ordering:
+                ordering.append("-pk")
+        if any(not field.startswith("-") for field in ordering):
+            raise ValueError("CursorPaginator поддерживает только "
+                             "убывающую сортировку")
+        self.keys = [field[1:] for field in ordering]
+
+    def _key_field(self, key):
+        model = self.object_list.model
+        if key == "pk":
+            return model._meta.pk
+        annotation = self.object_list.query.annotations.get(key)
+        if annotation is not None:
+            return annotation.output_field
+        return model._meta.get_field(key)
+
+    def encode_cursor(self, obj):
+        values = []
+        for key in self.keys:
+            value = getattr(obj, key)
+            if isinstance(value, datetime.datetime):
+                value = value.isoformat()
+            values.append(value)
+        data = json.dumps(values).encode()
+        return base64.urlsafe_b64encode(data).decode().rstrip("=")
+
+    def decode_cursor(self, cursor):
+        try:
+            padded = cursor + "=" * (-len(cursor) % 4)
+            values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+            if len(values) != len(self.keys):
+                raise InvalidCursor(cursor)
+            return [self._key_field(key).to_python(value)
+                    for key, value in zip(self.keys, values)]
+        except (ValueError, TypeError, binascii.Error, FieldDoesNotExist,
+                ValidationError):
+            raise InvalidCursor(cursor)
+
+    def _seek(self, values, lookup):
+        condition = Q()
+        for index, key in enumerate(self.keys):
+            equal = {k: v for k, v in zip(self.keys[:index], values[:index])}
+            condition |= Q(**equal, **{f"{key}__{lookup}": values[index]})
+        return condition
+
+    def page(self, after=None, before=None):
+        if before:
+            values = self.decode_cursor(before)
+            ordering = self.keys
+            queryset = self.object_list.filter(self._seek(values, "gt"))
+        else:
+            ordering = [f"-{key}" for key in self.keys]
+            queryset = self.object_list
+            if after:
+                values = self.decode_cursor(after)
+                queryset = queryset.filter(self._seek(values, "lt"))
+        objects = list(queryset.order_by(*ordering)[:self.per_page + 1])
+        has_more = len(objects) > self.per_page
+        objects = objects[:self.per_page]
+        if before:
+            objects.reverse()
+            return CursorPage(objects, self, True, has_more,
+                              cursor=f"before:{before}")
+        return CursorPage(objects, self, has_more, bool(after),
+                          cursor=after and f"after:{after}")
+
+    def get_page(self, after=None, before=None):
+        """Как page(), но некорректный курсор даёт первую страницу."""
+        try:
+            return self.page(after, before)
+        except InvalidCursor:
+            return self.page()
+
+    def cursor_for_page_number(self, number):
+        """Курсор, с которого начинается страница number при OFFSET."""
+        offset = (number - 1) * self.per_page
+        if offset <= 0:
+            return None
+        ordering = [f"-{key}" for key in self.keys]
+        last = list(self.object_list.order_by(*ordering)[offset - 1:offset])
+        return self.encode_cursor(last[0]) if last else None
+
+
+def page_number_redirect(request, paginator):
+    """Переадресует старую ссылку ?page=N на страницу с курсором."""
+    query = request.GET.copy()
+    try:
+        cursor = paginator.cursor_for_page_number(int(query.pop("page")[-1]))
+    except ValueError:
+        cursor = None
+    if cursor:
+        query["after"] = cursor
+    url = request.path
+    if query:
+        url = f"{url}?{query.urlencode()}"
+    return redirect(url)
+
+
+class WindowedPage(Page):
+    @property
+    def elided_page_range(self):
+        return self.paginator.get_elided_page_range(self.number)
+
+
+class CachedPaginator(Paginator):
+    """Paginator с кэшируемым числом объектов и окном номеров страниц.
+
+    Число объектов хранится в кэше под ключом count_key не дольше
+    PAGINATOR_COUNT_TIMEOUT секунд и сбрасывается invalidate_count()
+    при изменении списка. Без count_key число не кэшируется.
+    """
+    ELLIPSIS = "…"
+
+    def __init__(self, object_list, per_page, count_key=None, on_each_side=2,
+                 on_ends=1, **kwargs):
+        super().__init__(object_list, per_page, **kwargs)
+        self.count_key = count_key
+        self.on_each_side = on_each_side
+        self.on_ends = on_ends
+
+    @cached_property
+    def count(self):
+        if self.count_key is None:
+            return super().count
+        key = f"{COUNT_CACHE_PREFIX}:{self.count_key}"
+        count = cache.get(key)
+        if count is None:
+            count = super().count
+            cache.set(key, count, settings.PAGINATOR_COUNT_TIMEOUT)
+        return count
+
+    def get_elided_page_range(self, number):
+        """Номера страниц вокруг текущей и по краям, пропуски — ELLIPSIS."""
+        if self.num_pages <= (self.on_each_side + self.on_ends) * 2 + 1:
+            return list(self.page_range)
+        pages = []
+        if number > 1 + self.on_each_side + self.on_ends + 1:
+            pages.extend(range(1, self.on_ends + 1))
+            pages.append(self.ELLIPSIS)
+            pages.extend(range(number - self.on_each_side, number + 1))
+        else:
+            pages.extend(range(1, number + 1))
+        if number < self.num_pages - self.on_each_side - self.on_ends - 1:
+            pages.extend(range(number + 1, number + self.on_each_side + 1))
+            pages.append(self.ELLIPSIS)
+            pages.extend(range(self.num_pages - self.on_ends + 1,
+                               self.num_pages + 1))
+        else:
+            pages.extend(range(number + 1, self.num_pages + 1))
+        return pages
+
+    def _get_page(self, *args, **kwargs):
+        return WindowedPage(*args, **kwargs)
+
+
+def invalidate_count(*count_keys):
+    cache.delete_many([f"{COUNT_CACHE_PREFIX}:{key}" for key in count_keys])
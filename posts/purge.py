@@ -0,0 +1,204 @@
+"""Удаление пользователей, публикаций и групп в фоне.
+
+Удаляемый объект сразу получает отметку (is_active=False у
+пользователя, deleted_at у публикации и группы) и пропадает со всех
+страниц, а в очередь PurgeJob ставится задание. Задание удаляет
+зависимые строки этапами, порциями по PURGE_BATCH_SIZE, каждая порция
+в своей транзакции, поэтому запрос пользователя не ждёт каскадного
+удаления и база не блокируется надолго. Этап и число удалённых строк
+сохраняются после каждой порции: прерванное задание продолжается
+с того же этапа.
+"""
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import connections, transaction
+from django.utils import timezone
+
+from . import feed, generations, invalidation, search
+from .models import (Comment, FeedEntry, Follow, Group, Likes, Post,
+                     PurgeJob, User)
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+
+
+def get_executor():
+    global _executor
+    if _executor is None:
+        # Один поток: SQLite всё равно пишет по одной транзакции.
+        _executor = ThreadPoolExecutor(max_workers=1,
+                                       thread_name_prefix="purge")
+    return _executor
+
+
+def _drain_in_worker():
+    try:
+        drain()
+    finally:
+        connections.close_all()
+
+
+def schedule():
+    """Запускает очередь в фоновом потоке после коммита транзакции."""
+    transaction.on_commit(lambda: get_executor().submit(_drain_in_worker))
+
+
+def _enqueue(kind, object_id):
+    PurgeJob.objects.get_or_create(kind=kind, object_id=object_id)
+    schedule()
+
+
+def delete_user(user):
+    user.is_active = False
+    user.save(update_fields=["is_active"])
+    invalidation.user_hidden(user.pk)
+    _enqueue(PurgeJob.USER, user.pk)
+
+
+def delete_post(post):
+    Post.all_objects.filter(pk=post.pk).update(deleted_at=timezone.now())
+    search.unindex_posts([post.pk])
+    generations.bump(*generations.post_scopes(post.pk, post.author_id,
+                                              post.group_id))
+    feed.followers_changed(post.author_id)
+    _enqueue(PurgeJob.POST, post.pk)
+
+
+def delete_group(group):
+    group.deleted_at = timezone.now()
+    Group.objects.filter(pk=group.pk).update(deleted_at=group.deleted_at)
+    invalidation.group_hidden(group)
+    _enqueue(PurgeJob.GROUP, group.pk)
+
+
+def _delete(model):
+    def purge(ids):
+        return model._base_manager.filter(pk__in=ids).delete()[0]
+    return purge
+
+
+def _detach_posts(group_id):
+    def purge(ids):
+        updated = Post.all_objects.filter(pk__in=ids).update(group=None)
+        search.index_posts(Post.objects.select_related("author", "group")
+                           .filter(pk__in=ids))
+        invalidation.group_posts_changed(group_id, ids)
+        return updated
+    return purge
+
+
+def _forget_creator(ids):
+    return Group.objects.filter(pk__in=ids).update(creator=None)
+
+
+def _post_stages(posts):
+    """Строки, которые каскадно удалились бы вместе с публикациями."""
+    return [
+        ("post_likes", Likes.objects.filter(post__in=posts), _delete(Likes)),
+        ("post_comments", Comment.objects.filter(post__in=posts),
+         _delete(Comment)),
+        ("post_feed_entries", FeedEntry.objects.filter(post__in=posts),
+         _delete(FeedEntry)),
+        ("posts", posts, _delete(Post)),
+    ]
+
+
+def stages(job):
+    """Этапы задания: (название, queryset строк, функция удаления).
+
+    Функция получает id порции строк и возвращает число удалённых
+    или изменённых строк. Последний этап удаляет сам объект.
+    """
+    pk = job.object_id
+    if job.kind == PurgeJob.USER:
+        return [
+            ("likes", Likes.objects.filter(user_id=pk), _delete(Likes)),
+            ("comments", Comment.objects.filter(author_id=pk),
+             _delete(Comment)),
+            ("feed_entries", FeedEntry.objects.filter(user_id=pk),
+             _delete(FeedEntry)),
+            # Записи в лентах подписчиков удаляются вместе с публикациями,
+            # поэтому отписка подписчиков после них ничего не чистит.
+            *_post_stages(Post.all_objects.filter(author_id=pk)),
+            ("followings", Follow.objects.filter(user_id=pk),
+             _delete(Follow)),
+            ("followers", Follow.objects.filter(author_id=pk),
+             _delete(Follow)),
+            ("groups", Group.objects.filter(creator_id=pk), _forget_creator),
+            ("user", User.objects.filter(pk=pk), _delete(User)),
+        ]
+    if job.kind == PurgeJob.POST:
+        return _post_stages(Post.all_objects.filter(pk=pk))
+    if job.kind == PurgeJob.GROUP:
+        return [
+            ("group_posts", Post.all_objects.filter(group_id=pk),
+             _detach_posts(pk)),
+            ("group", Group.objects.filter(pk=pk), _delete(Group)),
+        ]
+    raise ValueError(f"Неизвестный тип задания: {job.kind}")
+
+
+def run(job, batch_size=None):
+    """Выполняет задание до конца, сохраняя ход после каждой порции."""
+    batch_size = batch_size or settings.PURGE_BATCH_SIZE
+    job.attempts += 1
+    job.save(update_fields=["attempts", "updated"])
+    job_stages = stages(job)
+    names = [name for name, _, _ in job_stages]
+    start = names.index(job.stage) if job.stage in names else 0
+    for name, queryset, purge in job_stages[start:]:
+        job.stage = name
+        while True:
+            ids = list(queryset.order_by().values_list("pk", flat=True)
+                       [:batch_size])
+            if not ids:
+                break
+            with transaction.atomic():
+                job.purged += purge(ids)
+                job.save(update_fields=["stage", "purged", "updated"])
+    job.finished = timezone.now()
+    job.save(update_fields=["stage", "finished", "updated"])
+    return job
+
+
+def attempt(job, batch_size=None):
+    """Выполняет задание; ошибка записывается в журнал, а не поднимается."""
+    try:
+        run(job, batch_size)
+    except Exception:
+        logger.exception("Не удалось выполнить задание %s (попытка %s)",
+                         job, job.attempts)
+        return False
+    return True
+
+
+def pending():
+    """Невыполненные задания по порядку постановки в очередь.
+
+    Следующее задание читается после обработки предыдущего, поэтому
+    задания, поставленные во время обхода, тоже попадают в него.
+    Упавшее задание повторяется при следующем обходе, пока число
+    попыток меньше PURGE_MAX_ATTEMPTS, и не задерживает остальные.
+    """
+    last_pk = 0
+    while True:
+        job = (PurgeJob.objects.filter(
+            finished__isnull=True, pk__gt=last_pk,
+            attempts__lt=settings.PURGE_MAX_ATTEMPTS)
+            .order_by("pk").first())
+        if job is None:
+            return
+        last_pk = job.pk
+        yield job
+
+
+def drain(batch_size=None):
+    """Выполняет задания очереди и возвращает число выполненных."""
+    done = 0
+    for job in pending():
+        if attempt(job, batch_size):
+            done += 1
+    return done
@@ -0,0 +1,89 @@
+import random
+import threading
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connections
+
+STICKY_KEY_PREFIX = "use_primary"
+SAFE_METHODS = ("GET", "HEAD", "OPTIONS")
+WRITE_STATEMENTS = ("INSERT", "UPDATE", "DELETE", "REPLACE")
+
+_local = threading.local()
+
+
+def reads_from_replica(view):
+    """Отмечает представление, которое может читать из реплики."""
+    view.reads_from_replica = True
+    return view
+
+
+def _sticky_key(user_id):
+    return f"{STICKY_KEY_PREFIX}:{user_id}"
+
+
+def _track_writes(execute, sql, params, many, context):
+    if sql.lstrip()[:7].upper().startswith(WRITE_STATEMENTS):
+        _local.wrote = True
+    return execute(sql, params, many, context)
+
+
+class ReplicaRouter:
+    """Направляет чтение отмеченных представлений в реплики.
+
+    Запись и всё, что выполняется вне таких представлений, идёт
+    в основную базу. Реплика выбирается один раз на запрос, чтобы
+    страница читала согласованные данные.
+    """
+
+    def db_for_read(self, model, **hints):
+        replica = getattr(_local, "replica", None)
+        if replica is None or connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        return replica
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+
+class ReplicaMiddleware:
+    """Выбирает базу для чтения и закрепляет пользователя за основной.
+
+    После записи пользователь REPLICA_STICKY_SECONDS секунд читает
+    из основной базы и видит свои изменения, даже если реплика
+    ещё отстаёт. Записью считается выполненный INSERT, UPDATE или
+    DELETE, а не выбор базы для записи: get_or_create, который нашёл
+    строку, пользователя не закрепляет.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        _local.replica = None
+        _local.wrote = False
+        try:
+            with connections[DEFAULT_DB_ALIAS].execute_wrapper(
+                    _track_writes):
+                response = self.get_response(request)
+        finally:
+            _local.replica = None
+        user = getattr(request, "user", None)
+        if _local.wrote and user is not None and user.is_authenticated:
+            cache.set(_sticky_key(user.pk), True,
+                      settings.REPLICA_STICKY_SECONDS)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        replicas = settings.DATABASE_REPLICAS
+        if (not replicas or request.method not in SAFE_METHODS
+                or not getattr(view_func, "reads_from_replica", False)):
+            return None
+        if (request.user.is_authenticated
+                and cache.get(_sticky_key(request.user.pk))):
+            return None
+        _local.replica = random.choice(replicas)
+        return None
@@ -0,0 +1,123 @@
+import re
+
+from django.db import connections
+from django.db.models import Q
+
+from .models import Post, User
+
+INDEX_TABLE = "posts_post_search"
+# Веса колонок text, author, group_title для bm25.
+COLUMN_WEIGHTS = (1.0, 4.0, 2.0)
+TOKEN_RE = re.compile(r"\w+")
+# Удалённые публикации и публикации удалённых авторов остаются в индексе,
+# пока их не удалит очередь, и отсекаются при поиске.
+VISIBLE_MATCHES = (
+    f"FROM {INDEX_TABLE} "
+    f"JOIN {Post._meta.db_table} post ON post.id = {INDEX_TABLE}.rowid "
+    f"JOIN {User._meta.db_table} author ON author.id = post.author_id "
+    f"WHERE {INDEX_TABLE} MATCH %s AND post.deleted_at IS NULL "
+    "AND author.is_active")
+
+
+def is_available(using="default"):
+    return connections[using].vendor == "sqlite"
+
+
+def create_index(using="default"):
+    if not is_available(using):
+        return
+    with connections[using].cursor() as cursor:
+        cursor.execute(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {INDEX_TABLE} USING fts5("
+            "text, author, group_title, tokenize='unicode61')")
+
+
+def clear_index(using="default"):
+    if not is_available(using):
+        return
+    with connections[using].cursor() as cursor:
+        cursor.execute(f"DELETE FROM {INDEX_TABLE}")
+
+
+def _rows(posts):
+    return [(post.pk, post.text, post.author.username,
+             post.group.title if post.group else "") for post in posts]
+
+
+def index_posts(posts, using="default"):
+    rows = _rows(posts)
+    if not rows or not is_available(using):
+        return
+    with connections[using].cursor() as cursor:
+        cursor.executemany(f"DELETE FROM {INDEX_TABLE} WHERE rowid = %s",
+                           [(row[0],) for row in rows])
+        cursor.executemany(
+            f"INSERT INTO {INDEX_TABLE} (rowid, text, author, group_title) "
+            "VALUES (%s, %s, %s, %s)", rows)
+
+
+def unindex_posts(post_ids, using="default"):
+    if not is_available(using):
+        return
+    with connections[using].cursor() as cursor:
+        cursor.executemany(f"DELETE FROM {INDEX_TABLE} WHERE rowid = %s",
+                           [(post_id,) for post_id in post_ids])
+
+
+def build_match(query):
+    """Превращает ввод пользователя в безопасное выражение FTS5.
+
+    Каждое слово ищется по префиксу, все слова должны встретиться
+    в одной публикации.
+    """
+    tokens = TOKEN_RE.findall(query or "")
+    return " ".join(f'"{token}"*' for token in tokens)
+
+
+class SearchResults:
+    """Ранжированная выдача, совместимая с Paginator."""
+
+    def __init__(self, match, using="default"):
+        self.match = match
+        self.using = using
+
+    def _execute(self, sql, params):
+        with connections[self.using].cursor() as cursor:
+            cursor.execute(sql, params)
+            return cursor.fetchall()
+
+    def count(self):
+        if not self.match:
+            return 0
+        return self._execute(f"SELECT COUNT(*) {VISIBLE_MATCHES}",
+                             [self.match])[0][0]
+
+    def __len__(self):
+        return self.count()
+
+    def __getitem__(self, index):
+        if not isinstance(index, slice):
+            return self[index:index + 1][0]
+        start = index.start or 0
+        limit = -1 if index.stop is None else index.stop - start
+        if not self.match or limit == 0:
+            return []
+        weights = ", ".join(str(weight) for weight in COLUMN_WEIGHTS)
+        rows = self._execute(
+            f"SELECT {INDEX_TABLE}.rowid {VISIBLE_MATCHES} "
+            f"ORDER BY bm25({INDEX_TABLE}, {weights}), "
+            f"{INDEX_TABLE}.rowid DESC LIMIT %s OFFSET %s",
+            [self.match, limit, start])
+        ids = [row[0] for row in rows]
+        posts = Post.objects.select_related("author", "group").in_bulk(ids)
+        return [posts[pk] for pk in ids if pk in posts]
+
+
+def search_posts(query, using="default"):
+    if is_available(using):
+        return SearchResults(build_match(query), using)
+    if not query:
+        return Post.objects.none()
+    return Post.objects.select_related("author", "group").filter(
+        Q(text__icontains=query) | Q(author__username__icontains=query)
+        | Q(group__title__icontains=query))
@@ -0,0 +1,164 @@
+from django.db.models import F
+from django.db.models.signals import (post_delete, post_save, pre_delete,
+                                      pre_save)
+from django.dispatch import receiver
+
+from . import feed, images, search, thumbnails, updates
+from .models import Comment, Follow, Group, Likes, Post, Profile
+from .storage import content_addressed_storage
+
+
+def _bump_counter(queryset, field, delta, **updates):
+    if delta < 0:
+        queryset = queryset.filter(**{f"{field}__gt": 0})
+    return queryset.update(**{field: F(field) + delta}, **updates)
+
+
+def _bump_post_counter(post_id, field, delta):
+    if post_id is None:
+        return
+    _bump_counter(Post.objects.filter(pk=post_id), field, delta,
+                  version=F("version") + 1)
+
+
+def bump_post_version(*post_ids):
+    Post.objects.filter(pk__in=post_ids).update(version=F("version") + 1)
+
+
+def _bump_profile_counter(user_id, field, delta):
+    updated = _bump_counter(Profile.objects.filter(user_id=user_id), field,
+                            delta)
+    if not updated and delta > 0:
+        followers = Follow.objects.filter(author_id=user_id)
+        followings = Follow.objects.filter(user_id=user_id)
+        Profile.objects.get_or_create(user_id=user_id, defaults={
+            "followers_count": followers.count(),
+            "followings_count": followings.count(),
+        })
+
+
+@receiver(post_save, sender=Likes)
+def like_created(sender, instance, created, **kwargs):
+    if created:
+        _bump_post_counter(instance.post_id, "likes_count", 1)
+
+
+@receiver(post_delete, sender=Likes)
+def like_deleted(sender, instance, **kwargs):
+    _bump_post_counter(instance.post_id, "likes_count", -1)
+
+
+@receiver(post_save, sender=Comment)
+def comment_created(sender, instance, created, **kwargs):
+    if created:
+        _bump_post_counter(instance.post_id, "comments_count", 1)
+
+
+@receiver(post_delete, sender=Comment)
+def comment_deleted(sender, instance, **kwargs):
+    _bump_post_counter(instance.post_id, "comments_count", -1)
+
+
+@receiver(post_save, sender=Follow)
+def follow_created(sender, instance, created, **kwargs):
+    if created:
+        _bump_profile_counter(instance.author_id, "followers_count", 1)
+        _bump_profile_counter(instance.user_id, "followings_count", 1)
+        feed.backfill(instance.user_id, instance.author_id)
+
+
+@receiver(post_delete, sender=Follow)
+def follow_deleted(sender, instance, **kwargs):
+    _bump_profile_counter(instance.author_id, "followers_count", -1)
+    _bump_profile_counter(instance.user_id, "followings_count", -1)
+    feed.prune(instance.user_id, instance.author_id)
+    feed.follower_removed(instance.author_id)
+
+
+def _process_image(model, instance, spec):
+    """Обрабатывает новую картинку и запоминает файлы прежней."""
+    if instance.image and instance.image._committed:
+        return
+    previous = None
+    if instance.pk is not None:
+        previous = (model.objects.filter(pk=instance.pk)
+                    .values_list("image", "image_variants").first())
+    instance.released_images = images.image_names(*previous or ("", ""))
+    if not instance.image:
+        instance.image_variants = ""
+        return
+
+    def find_variants(name):
+        return (model.objects.filter(image=name).exclude(image_variants="")
+                .values_list("image_variants", flat=True).first())
+
+    instance.image_variants = images.process_upload(
+        instance.image, spec, find_variants)
+
+
+def _release_images(names):
+    for name in names:
+        content_addressed_storage.delete(name)
+
+
+@receiver(pre_save, sender=Post)
+def post_image_uploading(sender, instance, **kwargs):
+    _process_image(sender, instance, images.POST_IMAGES)
+
+
+@receiver(post_save, sender=Post)
+def post_saved(sender, instance, created, **kwargs):
+    search.index_posts([instance])
+    _release_images(getattr(instance, "released_images", []))
+    if not instance.image_variants:
+        thumbnails.schedule(instance.image, thumbnails.POST_THUMBNAILS)
+    if created:
+        feed.fan_out(instance)
+        updates.record_post(instance)
+    else:
+        bump_post_version(instance.pk)
+
+
+@receiver(post_delete, sender=Post)
+def post_deleted(sender, instance, **kwargs):
+    search.unindex_posts([instance.pk])
+    _release_images(images.image_names(instance.image,
+                                       instance.image_variants))
+
+
+@receiver(post_save, sender=Group)
+def group_saved(sender, instance, created, **kwargs):
+    if not created:
+        search.index_posts(instance.posts.select_related("author", "group"))
+
+
+@receiver(pre_delete, sender=Group)
+def group_deleting(sender, instance, **kwargs):
+    instance.search_post_ids = list(
+        instance.posts.values_list("pk", flat=True))
+
+
+@receiver(post_delete, sender=Group)
+def group_deleted(sender, instance, **kwargs):
+    post_ids = getattr(instance, "search_post_ids", [])
+    posts = list(Post.objects.select_related("author", "group")
+                 .filter(pk__in=post_ids))
+    search.index_posts(posts)
+
+
+@receiver(pre_save, sender=Profile)
+def profile_image_uploading(sender, instance, **kwargs):
+    _process_image(sender, instance, images.AVATAR_IMAGES)
+
+
+@receiver(post_save, sender=Profile)
+def profile_saved(sender, instance, **kwargs):
+    _release_images(getattr(instance, "released_images", []))
+    if not instance.image_variants:
+        thumbnails.schedule(instance.image, thumbnails.AVATAR_THUMBNAILS)
+
+
+@receiver(post_delete, sender=Profile)
+def profile_deleted(sender, instance, **kwargs):
+    _release_images(images.image_names(instance.image,
+                                       instance.image_variants))
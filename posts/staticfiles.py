@@ -0,0 +1,147 @@
+import gzip
+import mimetypes
+import os
+import re
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import (ManifestStaticFilesStorage,
+                                                staticfiles_storage)
+from django.http import FileResponse, Http404, HttpResponseNotModified
+from django.utils._os import safe_join
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from django.utils.http import http_date
+from django.views.static import was_modified_since
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESSIBLE_EXTENSIONS = (".css", ".js", ".svg", ".map", ".txt", ".ico",
+                           ".json", ".html")
+# Файлы меньше этого размера не сжимаются: выигрыш меньше заголовков.
+MIN_COMPRESS_SIZE = 256
+IMMUTABLE_MAX_AGE = 60 * 60 * 24 * 365
+# Расширение сжатой копии для каждой кодировки, в порядке предпочтения.
+ENCODINGS = (("br", ".br"), ("gzip", ".gz"))
+
+
+def _gzip(data):
+    # mtime=0 делает архив одинаковым при каждой сборке.
+    return gzip.compress(data, compresslevel=9, mtime=0)
+
+
+def _brotli(data):
+    return brotli.compress(data, quality=11)
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    """Статика с хэшем содержимого в имени и сжатыми копиями.
+
+    collectstatic кладёт рядом с каждым хэшированным текстовым файлом
+    копии .gz и, если установлен brotli, .br. Пока collectstatic
+    не запускался и манифеста нет, адреса выдаются без хэша.
+    """
+
+    def stored_name(self, name):
+        if not self.hashed_files:
+            return name
+        return super().stored_name(name)
+
+    def compressors(self):
+        compressors = [(".gz", _gzip)]
+        if brotli is not None:
+            compressors.insert(0, (".br", _brotli))
+        return compressors
+
+    def compress(self, name):
+        """Записывает сжатые копии файла, если они меньше оригинала."""
+        with self.open(name) as original:
+            data = original.read()
+        if len(data) < MIN_COMPRESS_SIZE:
+            return []
+        written = []
+        for extension, compress in self.compressors():
+            compressed = compress(data)
+            if len(compressed) >= len(data):
+                continue
+            path = self.path(name + extension)
+            with open(path, "wb") as output:
+                output.write(compressed)
+            written.append(name + extension)
+        return written
+
+    def post_process(self, paths, dry_run=False, **options):
+        yield from super().post_process(paths, dry_run, **options)
+        if dry_run:
+            return
+        for name in sorted(set(self.hashed_files.values())):
+            if name.endswith(COMPRESSIBLE_EXTENSIONS):
+                for compressed in self.compress(name):
+                    yield name, compressed, True
+
+
+HASHED_NAME = re.compile(
+    r"^(?P<stem>.+)\.[0-9a-f]{12}(?P<extension>\.[^./]+)?$")
+
+
+def _is_hashed(path):
+    """Выдан ли путь манифестом как хэшированное имя файла."""
+    match = HASHED_NAME.match(path)
+    if match is None:
+        return False
+    original = match.group("stem") + (match.group("extension") or "")
+    hashed_files = getattr(staticfiles_storage, "hashed_files", {})
+    return hashed_files.get(original) == path
+
+
+def _accepted_encodings(request):
+    header = request.META.get("HTTP_ACCEPT_ENCODING", "")
+    accepted = set()
+    for part in header.split(","):
+        coding, _, params = part.strip().partition(";")
+        if re.search(r"q=0(\.0*)?\s*$", params):
+            continue
+        accepted.add(coding.strip().lower())
+    return accepted
+
+
+def serve(request, path):
+    """Отдаёт собранную статику из STATIC_ROOT.
+
+    Хэшированные имена кэшируются браузером на год без перепроверки.
+    Если клиент принимает br или gzip и сжатая копия есть на диске,
+    отдаётся она с Content-Encoding.
+    """
+    try:
+        full_path = safe_join(settings.STATIC_ROOT, path)
+    except ValueError:
+        raise Http404(path)
+    if not os.path.isfile(full_path):
+        raise Http404(path)
+    content_type, _ = mimetypes.guess_type(full_path)
+    accepted = _accepted_encodings(request)
+    encoding = None
+    for name, extension in ENCODINGS:
+        if name in accepted and os.path.isfile(full_path + extension):
+            encoding = name
+            full_path += extension
+            break
+    stat = os.stat(full_path)
+    if not was_modified_since(request.META.get("HTTP_IF_MODIFIED_SINCE"),
+                              stat.st_mtime, stat.st_size):
+        response = HttpResponseNotModified()
+    else:
+        response = FileResponse(
+            open(full_path, "rb"),
+            content_type=content_type or "application/octet-stream")
+        if encoding:
+            response["Content-Encoding"] = encoding
+    response["Last-Modified"] = http_date(stat.st_mtime)
+    patch_vary_headers(response, ("Accept-Encoding",))
+    if _is_hashed(path):
+        patch_cache_control(response, public=True, immutable=True,
+                            max_age=IMMUTABLE_MAX_AGE)
+    else:
+        patch_cache_control(response, public=True, no_cache=True)
+    return response
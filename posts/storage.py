@@ -0,0 +1,119 @@
+import hashlib
+import os
+from collections import Counter
+
+from django.core.files.storage import FileSystemStorage
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils.deconstruct import deconstructible
+
+HASH_CHUNK_SIZE = 64 * 1024
+RECOUNT_BATCH_SIZE = 500
+
+
+def content_hash(content):
+    """sha256 файла, прочитанного по частям."""
+    digest = hashlib.sha256()
+    for chunk in content.chunks(HASH_CHUNK_SIZE):
+        digest.update(chunk)
+    content.seek(0)
+    return digest.hexdigest()
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    """Файлы с именами по sha256 содержимого, каждый хранится один раз.
+
+    Имя файла заменяется на хэш с тем же каталогом и расширением:
+    posts/ab/cd/abcd…ef.jpg. Число ссылок на файл хранится в StoredFile:
+    save() добавляет ссылку, delete() убирает, файл удаляется с диска,
+    когда ссылок не осталось.
+    """
+
+    def hashed_name(self, name, content):
+        directory = os.path.dirname(name)
+        extension = os.path.splitext(name)[1].lower()
+        digest = content_hash(content)
+        return os.path.join(directory, digest[:2], digest[2:4],
+                            digest + extension)
+
+    def _save(self, name, content):
+        name = self.hashed_name(name, content)
+        if not self.exists(name):
+            name = super()._save(name, content)
+        self.retain(name)
+        return name
+
+    def retain(self, name):
+        """Добавляет ссылку на уже сохранённый файл."""
+        from .models import StoredFile
+
+        files = StoredFile.objects.filter(name=name)
+        if files.update(references=F("references") + 1):
+            return
+        try:
+            with transaction.atomic():
+                StoredFile.objects.create(name=name, references=1)
+        except IntegrityError:
+            files.update(references=F("references") + 1)
+
+    def delete(self, name):
+        from .models import StoredFile
+
+        files = StoredFile.objects.filter(name=name)
+        if files.filter(references__gt=1).update(
+                references=F("references") - 1):
+            return
+        files.delete()
+
+        def remove():
+            # Пока транзакция шла, файл могли загрузить заново.
+            if not StoredFile.objects.filter(name=name).exists():
+                super(ContentAddressedStorage, self).delete(name)
+
+        transaction.on_commit(remove)
+
+
+def recount_references():
+    """Пересчитывает ссылки в StoredFile по картинкам в базе.
+
+    Нужен, когда имена файлов попали в базу в обход хранилища: при
+    загрузке выгрузки или для файлов, сохранённых до появления
+    StoredFile. Возвращает число исправленных записей.
+    """
+    from .images import image_names
+    from .models import Post, Profile, StoredFile
+
+    counts = Counter()
+    for model in (Post, Profile):
+        rows = (model._base_manager.exclude(image="")
+                .exclude(image__isnull=True)
+                .values_list("image", "image_variants").iterator())
+        for image, variants in rows:
+            counts.update(image_names(image, variants))
+    with transaction.atomic():
+        stored = {stored_file.name: stored_file
+                  for stored_file in StoredFile.objects.all()}
+        stale = [stored_file.pk for name, stored_file in stored.items()
+                 if name not in counts]
+        for start in range(0, len(stale), RECOUNT_BATCH_SIZE):
+            StoredFile.objects.filter(
+                pk__in=stale[start:start + RECOUNT_BATCH_SIZE]).delete()
+        changed = []
+        for name, references in counts.items():
+            stored_file = stored.get(name)
+            if stored_file is None:
+                changed.append(StoredFile(name=name, references=references))
+            elif stored_file.references != references:
+                stored_file.references = references
+                changed.append(stored_file)
+        StoredFile.objects.bulk_create(
+            [stored_file for stored_file in changed if stored_file.pk is None],
+            batch_size=RECOUNT_BATCH_SIZE)
+        StoredFile.objects.bulk_update(
+            [stored_file for stored_file in changed if stored_file.pk],
+            ["references"], batch_size=RECOUNT_BATCH_SIZE)
+    return len(stale) + len(changed)
+
+
+content_addressed_storage = ContentAddressedStorage()
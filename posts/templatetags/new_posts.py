@@ -0,0 +1,10 @@
+from django import template
+from django.conf import settings
+
+register = template.Library()
+
+
+@register.simple_tag
+def new_posts_poll_interval():
+    """Интервал опроса новых публикаций в секундах."""
+    return settings.NEW_POSTS_CLIENT_POLL_INTERVAL
@@ -0,0 +1,66 @@
+import hashlib
+
+from django import template
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.safestring import mark_safe
+
+from ..card_urls import visible_group
+from ..viewer import ViewerState
+
+register = template.Library()
+
+LIST_TEMPLATE = "includes/post_list.html"
+# Пользовательский текст экранируется, поэтому комментарий HTML
+# не может встретиться внутри карточки.
+CARD_SEPARATOR = "<!-- /post card -->"
+
+
+def card_cache_key(post, viewer_state, post_view):
+    # Имена автора и группы входят в ключ, поэтому их переименование
+    # не требует обновлять версии всех публикаций.
+    group = visible_group(post)
+    names = "\n".join([post.author.username,
+                       group.slug if group else "",
+                       group.title if group else ""])
+    names_hash = hashlib.md5(names.encode()).hexdigest()
+    bits = "".join(str(int(bool(value)))
+                   for value in [*viewer_state.values(), post_view])
+    return f"post_card:{post.pk}:{post.version}:{names_hash}:{bits}"
+
+
+@register.simple_tag(takes_context=True)
+def post_cards(context, posts):
+    """Выводит карточки публикаций, беря готовый HTML из кэша.
+
+    Состояние зрителя берётся из переменной viewer (ViewerState), все
+    карточки страницы читаются из кэша одним get_many, недостающие
+    рендерятся вместе одним проходом шаблона и сохраняются set_many.
+    """
+    viewer = context.get("viewer")
+    if viewer is None:
+        viewer = ViewerState(context.get("user"), posts)
+    post_view = context.get("post_view")
+    cards = []
+    for post in posts:
+        viewer_state = viewer.post_context(post)
+        key = card_cache_key(post, viewer_state, post_view)
+        cards.append((key, post, viewer_state))
+    cached = cache.get_many([key for key, _, _ in cards])
+    missing = [(key, post, viewer_state)
+               for key, post, viewer_state in cards if key not in cached]
+    if missing:
+        rendered = dict(zip([key for key, _, _ in missing],
+                            render_cards(context, missing)))
+        cache.set_many(rendered, settings.POST_CARD_CACHE_TIMEOUT)
+        cached.update(rendered)
+    return mark_safe("".join(cached[key] for key, _, _ in cards))
+
+
+def render_cards(context, cards):
+    """HTML карточек за один рендеринг includes/post_list.html."""
+    list_template = context.template.engine.get_template(LIST_TEMPLATE)
+    with context.push(cards=[dict(viewer_state, post=post)
+                             for _, post, viewer_state in cards]):
+        html = list_template.render(context)
+    return html.split(CARD_SEPARATOR)[:len(cards)]
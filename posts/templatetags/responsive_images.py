@@ -0,0 +1,25 @@
+from django import template
+from django.utils.html import format_html
+
+from ..images import load_variants
+
+register = template.Library()
+
+
+@register.simple_tag
+def responsive_image(image, variants, sizes, css_class=""):
+    """Тег <img> с вариантами картинки в srcset и ленивой загрузкой.
+
+    width и height берутся из самого крупного варианта, чтобы браузер
+    зарезервировал место до загрузки картинки.
+    """
+    variants = load_variants(variants)
+    storage = image.storage
+    srcset = ", ".join(f"{storage.url(name)} {width}w"
+                       for name, width, _ in variants)
+    name, width, height = variants[-1]
+    return format_html(
+        '<img class="{}" src="{}" srcset="{}" sizes="{}" width="{}" '
+        'height="{}" style="height: auto;" loading="lazy" '
+        'decoding="async" alt="">',
+        css_class, storage.url(name), srcset, sizes, width, height)
@@ -0,0 +1,98 @@
+import json
+import os
+import shutil
+import tempfile
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connections
+from django.http import HttpResponse
+from django.test import TestCase
+
+from posts.benchmark import measure, percentile
+from posts.models import FeedEntry, Follow, Post, Profile, User
+
+
+class BenchmarkTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.tmp_dir = tempfile.mkdtemp()
+        cls.baseline = os.path.join(cls.tmp_dir, "baseline.json")
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.tmp_dir, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        call_command("seed_benchmark", users=30, posts=200, groups=3,
+                     follows=5, likes=300, comments=100, batch_size=50,
+                     stdout=StringIO())
+
+    def run_benchmark(self, **options):
+        out = StringIO()
+        call_command("run_benchmark", repeat=2, baseline=self.baseline,
+                     stdout=out, **options)
+        return out.getvalue()
+
+    def test_seed_creates_power_law_followers(self):
+        """Засеянные подписки распределены неравномерно."""
+        self.assertEqual(User.objects.count(), 30)
+        self.assertEqual(Post.objects.count(), 200)
+        self.assertEqual(Profile.objects.count(), 30)
+        counts = list(Profile.objects.order_by("-followers_count")
+                      .values_list("followers_count", flat=True))
+        self.assertEqual(sum(counts), Follow.objects.count())
+        self.assertGreater(counts[0], counts[len(counts) // 2] * 2)
+        self.assertTrue(FeedEntry.objects.exists())
+
+    def test_seed_refuses_to_run_twice(self):
+        """Повторное заполнение отклоняется."""
+        with self.assertRaises(CommandError):
+            call_command("seed_benchmark", users=1, stdout=StringIO())
+
+    def test_regression_is_reported(self):
+        """Рост числа запросов относительно замеров — ошибка."""
+        self.run_benchmark(save_baseline=True)
+        with open(self.baseline) as baseline_file:
+            results = json.load(baseline_file)
+        self.assertIn("posts:follow_index", results)
+        self.assertIn("Регрессий нет", self.run_benchmark(threshold=100))
+        results["posts:index"]["queries"] -= 1
+        with open(self.baseline, "w") as baseline_file:
+            json.dump(results, baseline_file)
+        with self.assertRaisesMessage(CommandError, "posts:index"):
+            self.run_benchmark(threshold=100)
+
+    def test_missing_baseline_is_an_error(self):
+        """Без сохранённых замеров сравнение не пропускается молча."""
+        with self.assertRaisesMessage(CommandError, "--save-baseline"):
+            self.run_benchmark()
+
+    def test_queries_on_all_databases_are_counted(self):
+        """Запросы к другим базам, например к репликам, тоже считаются."""
+        def get(url):
+            with connections["replica"].cursor() as cursor:
+                cursor.execute("SELECT 1")
+            return HttpResponse()
+
+        client = mock.Mock(get=get)
+        databases = dict(connections.databases,
+                         replica=connections.databases["default"])
+        with mock.patch.object(connections, "databases", databases):
+            try:
+                result = measure(client, "/", repeat=1)
+            finally:
+                connections["replica"].close()
+                del connections["replica"]
+        self.assertEqual(result["queries"], 1)
+
+    def test_percentile(self):
+        """Процентиль считается методом ближайшего ранга."""
+        values = list(range(1, 101))
+        self.assertEqual(percentile(values, 0.5), 50)
+        self.assertEqual(percentile(values, 0.95), 95)
+        self.assertEqual(percentile([7], 0.95), 7)
@@ -0,0 +1,119 @@
+import os
+import shutil
+import tempfile
+import time
+
+from django.core.cache import caches
+from django.test import SimpleTestCase
+
+from posts.cache import (LocalTier, SQLiteCache, SQLiteInvalidationChannel,
+                         TwoTierCache)
+
+
+class TwoTierCacheTest(SimpleTestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.location = os.path.join(self.tmp_dir, "channel.sqlite3")
+        caches["shared"].clear()
+        self.first = self.make_cache()
+        self.second = self.make_cache()
+
+    def tearDown(self):
+        caches["shared"].clear()
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+
+    def make_cache(self, **options):
+        """Кэш с собственным L1, как в отдельном процессе."""
+        options.setdefault("SYNC_INTERVAL", 0)
+        cache = TwoTierCache(self.location, {"OPTIONS": options})
+        cache.tier = LocalTier(SQLiteInvalidationChannel(self.location))
+        return cache
+
+    def test_value_is_shared_between_processes(self):
+        """Значение, записанное одним процессом, видно в другом."""
+        self.first.set("key", {"value": 1})
+        self.assertEqual(self.second.get("key"), {"value": 1})
+        self.assertIn(self.second.make_key("key"), self.second.tier.entries)
+
+    def test_write_evicts_other_processes_l1(self):
+        """Запись и удаление в одном процессе сбрасывают L1 другого."""
+        self.first.set("key", 1)
+        self.assertEqual(self.second.get("key"), 1)
+        self.first.set("key", 2)
+        self.assertEqual(self.second.get("key"), 2)
+        self.first.delete("key")
+        self.assertIsNone(self.second.get("key"))
+        self.first.set_many({"a": 1, "b": 2})
+        self.assertEqual(self.second.get_many(["a", "b"]), {"a": 1, "b": 2})
+        self.first.clear()
+        self.assertEqual(self.second.get_many(["a", "b"]), {})
+
+    def test_l1_is_bounded_by_size_and_ttl(self):
+        """L1 хранит не больше L1_MAX_ENTRIES записей не дольше L1_TIMEOUT."""
+        cache = self.make_cache(L1_MAX_ENTRIES=2, L1_TIMEOUT=0.05)
+        cache.set_many({"a": 1, "b": 2, "c": 3})
+        self.assertEqual(len(cache.tier.entries), 2)
+        self.assertNotIn(cache.make_key("a"), cache.tier.entries)
+        self.assertEqual(cache.get("a"), 1)
+        time.sleep(0.06)
+        caches["shared"].set("a", 10)
+        self.assertEqual(cache.get("a"), 10)
+
+    def test_lagging_reader_drops_whole_l1(self):
+        """Читатель, отставший от журнала, очищает L1 целиком."""
+        self.second.set("key", 1)
+        self.second.tier.channel.poll()
+        self.first.tier.channel.KEEP = 5
+        for index in range(1000):
+            self.first.tier.channel.publish([f"other:{index}"])
+        self.second.get("unrelated")
+        self.assertEqual(self.second.tier.entries, {})
+
+
+class SQLiteCacheTest(SimpleTestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp_dir, ignore_errors=True)
+        self.location = os.path.join(self.tmp_dir, "shared.sqlite3")
+        self.first = self.make_cache()
+        self.second = self.make_cache()
+
+    def make_cache(self, **options):
+        """Кэш со своим соединением, как в отдельном процессе."""
+        return SQLiteCache(self.location, {"OPTIONS": options})
+
+    def test_values_are_shared_between_processes(self):
+        """Запись одного процесса видна и изменяема в другом."""
+        self.first.set("key", {"value": 1})
+        self.assertEqual(self.second.get("key"), {"value": 1})
+        self.assertFalse(self.second.add("key", 2))
+        self.first.set_many({"a": 1, "b": 2})
+        self.assertEqual(self.second.get_many(["a", "b", "c"]),
+                         {"a": 1, "b": 2})
+        self.assertEqual(self.second.incr("a", 5), 6)
+        self.assertEqual(self.first.get("a"), 6)
+        self.second.delete_many(["a", "b"])
+        self.assertIsNone(self.first.get("a"))
+        self.first.clear()
+        self.assertFalse(self.second.has_key("key"))
+        with self.assertRaises(ValueError):
+            self.first.incr("missing")
+
+    def test_expired_value_is_missing(self):
+        """Просроченная запись не возвращается и не мешает add."""
+        self.first.set("key", 1, timeout=0.05)
+        self.assertTrue(self.first.touch("key", 0.05))
+        time.sleep(0.1)
+        self.assertIsNone(self.second.get("key"))
+        self.assertFalse(self.second.touch("key"))
+        self.assertTrue(self.second.add("key", 2))
+        self.assertEqual(self.first.get("key"), 2)
+
+    def test_oldest_entries_are_culled(self):
+        """Сверх MAX_ENTRIES удаляются самые старые записи."""
+        cache = self.make_cache(MAX_ENTRIES=100, CULL_FREQUENCY=2)
+        for number in range(SQLiteCache.CULL_EVERY + 50):
+            cache.set(f"key{number}", number)
+        self.assertIsNone(cache.get("key0"))
+        self.assertEqual(cache.get(f"key{SQLiteCache.CULL_EVERY + 49}"),
+                         SQLiteCache.CULL_EVERY + 49)
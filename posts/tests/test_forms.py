@@ -4,12 +4,21 @@ from django.urls import reverse
 from django.core.files.uploadedfile import SimpleUploadedFile
 from django.conf import settings
 
+import io
 import tempfile
 import shutil
 
+from PIL import Image
+
 from yatube.settings import MEDIA_ROOT
+from sorl.thumbnail import get_thumbnail
+
+from posts import images, thumbnails
 from posts.forms import PostForm
-from posts.models import Post, Group, User, Comment
+from posts.management.commands.generate_thumbnails import (
+    Command as GenerateThumbnails)
+from posts.avatars import attach_avatars
+from posts.models import Post, Group, User, Comment, Profile
 
 
 @override_settings(MEDIA_ROOT=MEDIA_ROOT)
@@ -68,7 +77,8 @@ class PostCreateFormTests(TestCase):
         self.assertEqual(Post.objects.count(), posts_count + 1)
         self.assertTrue(Post.objects.filter(group=self.group.id,
                                             text="Тестовый текст",
-                                            image="posts/small.gif").exists())
+                                            image__startswith="posts/",
+                                            image__endswith=".jpg").exists())
 
     def test_edit_post(self):
         """Валидная форма редактирует запись и производит редирект."""
@@ -118,3 +128,75 @@ class PostCreateFormTests(TestCase):
         self.assertEqual(comments_count + 1, comments_count_after)
         self.assertTrue(Comment.objects.filter(
             text="Тестовый комментарий").exists())
+
+    def test_thumbnails_generated_for_uploaded_image(self):
+        """Для загруженной картинки создаются миниатюры всех размеров."""
+        post = Post.objects.create(text="Текст", author=self.user,
+                                   image=self.uploaded)
+        self.assertEqual(thumbnails.sizes_for(post.image.name),
+                         thumbnails.POST_THUMBNAILS)
+        self.assertTrue(thumbnails.generate(post.image.name))
+        for geometry, options in thumbnails.POST_THUMBNAILS:
+            with self.subTest(geometry=geometry):
+                thumbnail = get_thumbnail(post.image.name, geometry,
+                                          **options)
+                self.assertTrue(thumbnail.exists())
+
+    def test_thumbnails_only_for_images_without_variants(self):
+        """Миниатюры создаются только для картинок без вариантов."""
+        processed = Post.objects.create(
+            text="Новый", author=self.user,
+            image=self.make_photo((1000, 600), 1))
+        legacy = Post.objects.create(text="Старый", author=self.user)
+        Post.objects.filter(pk=legacy.pk).update(image="posts/old.jpg")
+
+        names = list(GenerateThumbnails().find_images())
+
+        self.assertTrue(processed.image_variants)
+        self.assertEqual(names, ["posts/old.jpg"])
+
+    def make_photo(self, size, orientation):
+        """JPEG с поворотом и координатами в EXIF, как снимок телефона."""
+        exif = Image.Exif()
+        exif[0x0112] = orientation
+        exif[0x010F] = "Phone"
+        buffer = io.BytesIO()
+        Image.new("RGB", size, "red").save(buffer, "JPEG", exif=exif)
+        return SimpleUploadedFile("photo.jpg", buffer.getvalue(),
+                                  content_type="image/jpeg")
+
+    def test_upload_is_normalized_with_variants(self):
+        """Загрузка поворачивается по EXIF, теряет EXIF и получает
+        варианты WebP, которые выводятся в srcset."""
+        self.authorized_client.post(reverse("posts:new_post"), data={
+            "text": "Снимок", "image": self.make_photo((1000, 600), 6)})
+        post = Post.objects.get(text="Снимок")
+        with Image.open(post.image.path) as master:
+            self.assertEqual(master.size, (600, 1000))
+            self.assertEqual(len(master.getexif()), 0)
+        variants = images.load_variants(post.image_variants)
+        self.assertEqual([width for _, width, _ in variants], [400, 600])
+        for name, width, height in variants:
+            with Image.open(post.image.storage.path(name)) as variant:
+                self.assertEqual(variant.format, "WEBP")
+                self.assertEqual(variant.size, (width, height))
+        response = self.guest_client.get(reverse("posts:index"))
+        self.assertContains(response, f"{variants[0][0]} 400w")
+        self.assertContains(response, 'loading="lazy"')
+
+    @override_settings(IMAGE_MAX_PIXELS=100)
+    def test_oversized_upload_is_rejected(self):
+        """Слишком большая картинка не проходит проверку формы."""
+        form = PostForm(data={"text": "Снимок"}, files={
+            "image": self.make_photo((20, 10), 1)})
+        self.assertFalse(form.is_valid())
+        self.assertIn("image", form.errors)
+
+    def test_avatar_uses_variant(self):
+        """Аватар берётся из варианта, а не из миниатюры sorl."""
+        profile = Profile.objects.create(
+            user=self.user, image=self.make_photo((1000, 1000), 1))
+        name, width, _ = images.load_variants(profile.image_variants)[1]
+        user = attach_avatars([User.objects.get(pk=self.user.pk)])[0]
+        self.assertEqual(width, 480)
+        self.assertEqual(user.avatar_url, profile.image.storage.url(name))
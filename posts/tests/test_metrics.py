@@ -0,0 +1,57 @@
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts.metrics import registry
+from posts.models import Post, User
+
+
+class MetricsTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create(username="Author")
+        Post.objects.create(author=self.user, text="Пост")
+        cache.clear()
+        registry.reset()
+        self.client = Client()
+
+    def test_metrics_are_grouped_by_url_name(self):
+        """Запросы учитываются по имени URL."""
+        self.client.get(reverse("posts:index"))
+        self.client.get(reverse("posts:index"))
+        self.client.get(reverse("posts:profile", kwargs={
+            "username": self.user.username}))
+        views = registry.snapshot()
+        self.assertEqual(views["posts:index"].requests, 2)
+        self.assertEqual(views["posts:profile"].requests, 1)
+
+    def test_sql_template_and_cache_are_counted(self):
+        """SQL, рендеринг шаблонов и обращения к кэшу учитываются."""
+        self.client.get(reverse("posts:index"))
+        first = registry.snapshot()["posts:index"]
+        self.client.get(reverse("posts:index"))
+        index = registry.snapshot()["posts:index"]
+        self.assertGreater(index.sql_queries, 0)
+        self.assertGreater(index.sql_seconds, 0)
+        self.assertGreater(index.template_seconds, 0)
+        self.assertEqual(first.cache_hits, 0)
+        self.assertEqual(index.cache_misses, first.cache_misses)
+        self.assertEqual(index.cache_hits, first.cache_misses)
+
+    def test_metrics_endpoint_uses_prometheus_format(self):
+        """Эндпоинт /metrics отдаёт текстовый формат Prometheus."""
+        self.client.get(reverse("posts:index"))
+        response = self.client.get(reverse("metrics"))
+        self.assertEqual(response["Content-Type"],
+                         "text/plain; version=0.0.4; charset=utf-8")
+        body = response.content.decode()
+        self.assertIn("# TYPE yatube_request_duration_seconds histogram",
+                      body)
+        self.assertIn('yatube_request_duration_seconds_count'
+                      '{view="posts:index"} 1', body)
+        self.assertIn('yatube_sql_queries_total{view="posts:index"}', body)
+
+    def test_metrics_endpoint_is_internal(self):
+        """Эндпоинт недоступен с адресов вне INTERNAL_IPS."""
+        response = self.client.get(reverse("metrics"),
+                                   REMOTE_ADDR="10.0.0.1")
+        self.assertEqual(response.status_code, 404)
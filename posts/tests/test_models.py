@@ -1,8 +1,11 @@
 # posts/tests/tests_models.py
+from io import StringIO
+
 from django.test import TestCase
 from django.contrib.auth import get_user_model
+from django.core.management import call_command
 
-from posts.models import Post, Group, Comment, Follow
+from posts.models import Post, Group, Comment, Follow, Likes, Profile
 
 User = get_user_model()
 
@@ -138,3 +141,67 @@ class PostModelTest(TestCase):
         comment = PostModelTest.comment
         expected_text = comment.text[:15]
         self.assertEqual(expected_text, str(comment))
+
+
+class PostCountersTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create(username="Ivan_Log")
+        self.post = Post.objects.create(author=self.user, text="Текст")
+
+    def test_likes_count_follows_likes(self):
+        """Счётчик лайков меняется при создании и удалении лайка."""
+        like = Likes.objects.create(user=self.user, post=self.post)
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.likes_count, 1)
+        like.delete()
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.likes_count, 0)
+
+    def test_comments_count_follows_cascade(self):
+        """Счётчик комментариев уменьшается при удалении автора."""
+        commentator = User.objects.create(username="Commentator")
+        Comment.objects.create(post=self.post, author=commentator, text="1")
+        Comment.objects.create(post=self.post, author=self.user, text="2")
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comments_count, 2)
+        commentator.delete()
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comments_count, 1)
+
+    def test_recount_counters_fixes_drift(self):
+        """Команда recount_counters исправляет рассинхронизацию."""
+        Likes.objects.create(user=self.user, post=self.post)
+        Post.objects.filter(pk=self.post.pk).update(likes_count=10,
+                                                    comments_count=3)
+        call_command("recount_counters", chunk_size=1, stdout=StringIO())
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.likes_count, 1)
+        self.assertEqual(self.post.comments_count, 0)
+
+
+class ProfileCountersTest(TestCase):
+    def setUp(self):
+        self.author = User.objects.create(username="Author")
+        self.follower = User.objects.create(username="Follower")
+
+    def test_follow_counters_follow_subscriptions(self):
+        """Счётчики подписок меняются при подписке, отписке и удалении."""
+        Follow.objects.create(user=self.follower, author=self.author)
+        self.assertEqual(
+            Profile.objects.get(user=self.author).followers_count, 1)
+        self.assertEqual(
+            Profile.objects.get(user=self.follower).followings_count, 1)
+        self.follower.delete()
+        self.assertEqual(
+            Profile.objects.get(user=self.author).followers_count, 0)
+
+    def test_recount_counters_fixes_profiles(self):
+        """Команда recount_counters создаёт профили и чинит счётчики."""
+        Follow.objects.create(user=self.follower, author=self.author)
+        Profile.objects.filter(user=self.follower).delete()
+        Profile.objects.filter(user=self.author).update(followers_count=7)
+        call_command("recount_counters", stdout=StringIO())
+        self.assertEqual(
+            Profile.objects.get(user=self.author).followers_count, 1)
+        self.assertEqual(
+            Profile.objects.get(user=self.follower).followings_count, 1)
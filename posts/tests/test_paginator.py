@@ -1,8 +1,10 @@
 # posts/tests/tests_paginator.py
 from django.test import Client, TestCase
+from django.core.cache import cache
 from django.urls import reverse
 
 from posts.models import Post, Group, User
+from posts.paginator import CachedPaginator
 
 
 class PaginatorViewsTest(TestCase):
@@ -28,7 +30,8 @@ class PaginatorViewsTest(TestCase):
         self.assertEqual(len(response.context.get("page").object_list), 10)
 
     def test_index_second_page_containse_three_records(self):
-        response = self.guest_client.get(reverse("posts:index") + '?page=2')
+        response = self.guest_client.get(
+            reverse("posts:index") + '?page=2', follow=True)
         self.assertEqual(len(response.context.get("page").object_list), 3)
 
     def test_profile_first_page_containse_ten_records(self):
@@ -38,7 +41,7 @@ class PaginatorViewsTest(TestCase):
 
     def test_profile_second_page_containse_three_records(self):
         response = self.guest_client.get(reverse("posts:profile", kwargs={
-            "username": self.user}) + '?page=2')
+            "username": self.user}) + '?page=2', follow=True)
         self.assertEqual(len(response.context.get("page").object_list), 3)
 
     def test_group_first_page_containse_ten_records(self):
@@ -48,5 +51,68 @@ class PaginatorViewsTest(TestCase):
 
     def test_group_second_page_containse_three_records(self):
         response = self.guest_client.get(reverse("posts:group", kwargs={
-            "slug": self.group.slug}) + '?page=2')
+            "slug": self.group.slug}) + '?page=2', follow=True)
         self.assertEqual(len(response.context.get("page").object_list), 3)
+
+    def test_index_query_count_does_not_depend_on_posts(self):
+        """Число запросов главной страницы не зависит от числа постов."""
+        cache.clear()
+        # Проверка ETag и выборка страницы.
+        with self.assertNumQueries(2):
+            self.guest_client.get(reverse("posts:index"))
+
+    def test_index_next_page_by_cursor(self):
+        """Курсоры ?after= и ?before= листают страницы без пропусков."""
+        first = self.guest_client.get(reverse("posts:index")).context["page"]
+        self.assertTrue(first.has_next())
+        self.assertFalse(first.has_previous())
+        second = self.guest_client.get(reverse("posts:index"), {
+            "after": first.next_cursor}).context["page"]
+        self.assertEqual(len(second), 3)
+        self.assertFalse(second.has_next())
+        back = self.guest_client.get(reverse("posts:index"), {
+            "before": second.previous_cursor}).context["page"]
+        self.assertEqual(list(back), list(first))
+
+    def test_legacy_page_redirects_to_cursor(self):
+        """Старая ссылка ?page=N переадресует на страницу с курсором."""
+        response = self.guest_client.get(reverse("posts:index") + "?page=2")
+        self.assertEqual(response.status_code, 302)
+        self.assertIn("after=", response["Location"])
+        response = self.guest_client.get(reverse("posts:index") + "?page=x")
+        self.assertRedirects(response, reverse("posts:index"))
+
+    def test_invalid_cursor_shows_first_page(self):
+        """Некорректный курсор показывает первую страницу."""
+        response = self.guest_client.get(reverse("posts:index"), {
+            "after": "broken"})
+        self.assertEqual(len(response.context["page"]), 10)
+
+
+class CachedPaginatorTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+
+    def test_elided_page_range(self):
+        """Номера страниц сворачиваются вокруг текущей страницы."""
+        paginator = CachedPaginator(range(1000), 10)
+        self.assertEqual(paginator.get_elided_page_range(50),
+                         [1, "…", 48, 49, 50, 51, 52, "…", 100])
+        self.assertEqual(paginator.get_elided_page_range(2),
+                         [1, 2, 3, 4, "…", 100])
+        self.assertEqual(CachedPaginator(range(50), 10)
+                         .get_elided_page_range(3), [1, 2, 3, 4, 5])
+
+    def test_groups_count_is_cached_and_invalidated(self):
+        """Число групп берётся из кэша и сбрасывается при создании
+        группы.
+        """
+        Group.objects.create(title="Группа", slug="group-1")
+        self.guest_client.get(reverse("posts:all_groups"))
+        with self.assertNumQueries(1):
+            response = self.guest_client.get(reverse("posts:all_groups"))
+        self.assertEqual(response.context["paginator"].count, 1)
+        Group.objects.create(title="Группа", slug="group-2")
+        response = self.guest_client.get(reverse("posts:all_groups"))
+        self.assertEqual(response.context["paginator"].count, 2)
@@ -0,0 +1,164 @@
+# posts/tests/test_purge.py
+from io import StringIO
+from unittest import mock
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from posts import purge
+from posts.search import search_posts
+from posts.models import (Comment, FeedEntry, Follow, Group, Likes, Post,
+                          Profile, PurgeJob, User)
+
+
+class PurgeTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create(username="Author")
+        self.reader = User.objects.create(username="Reader")
+        self.group = Group.objects.create(title="Группа", slug="group",
+                                          creator=self.author)
+        self.post = Post.objects.create(author=self.author, text="Пост автора",
+                                        group=self.group)
+        self.reader_post = Post.objects.create(author=self.reader,
+                                               text="Пост читателя",
+                                               group=self.group)
+        self.author_client = Client()
+        self.author_client.force_login(self.author)
+        self.guest_client = Client()
+
+    def test_user_delete_hides_user_and_queues_purge(self):
+        """Удалённый пользователь сразу пропадает, данные ждут очереди."""
+        Follow.objects.create(user=self.reader, author=self.author)
+        Comment.objects.create(post=self.post, author=self.reader,
+                               text="Комментарий")
+        self.author_client.get(reverse("posts:user_delete", kwargs={
+            "username": self.author.username}))
+
+        profile_url = reverse("posts:profile", kwargs={
+            "username": self.author.username})
+        self.assertEqual(self.guest_client.get(profile_url).status_code, 404)
+        response = self.guest_client.get(reverse("posts:index"))
+        self.assertEqual(list(response.context["page"]), [self.reader_post])
+        self.assertTrue(Post.all_objects.filter(pk=self.post.pk).exists())
+        self.assertTrue(PurgeJob.objects.filter(
+            kind=PurgeJob.USER, object_id=self.author.pk,
+            finished__isnull=True).exists())
+        response = self.author_client.get(reverse("posts:new_post"))
+        self.assertFalse(response.wsgi_request.user.is_authenticated)
+
+    def test_deleted_user_posts_leave_search(self):
+        """Публикации удалённого пользователя сразу пропадают из поиска."""
+        purge.delete_user(self.author)
+        results = search_posts("Пост")
+        self.assertEqual(results.count(), 1)
+        self.assertEqual(list(results[:10]), [self.reader_post])
+
+    def test_drain_purges_user_data(self):
+        """Очередь удаляет пользователя со всеми зависимыми строками."""
+        Follow.objects.create(user=self.reader, author=self.author)
+        Follow.objects.create(user=self.author, author=self.reader)
+        Likes.objects.create(user=self.author, post=self.reader_post)
+        Comment.objects.create(post=self.reader_post, author=self.author,
+                               text="Комментарий")
+        Comment.objects.create(post=self.post, author=self.reader,
+                               text="Ответ")
+        purge.delete_user(self.author)
+
+        out = StringIO()
+        call_command("purge_deleted", batch_size=1, stdout=out)
+
+        self.assertIn("Выполнено заданий: 1", out.getvalue())
+        self.assertFalse(User.objects.filter(pk=self.author.pk).exists())
+        self.assertFalse(Post.all_objects.filter(author=self.author).exists())
+        self.assertFalse(Comment.objects.exists())
+        self.assertFalse(Likes.objects.exists())
+        self.assertFalse(Follow.objects.exists())
+        self.assertFalse(FeedEntry.objects.exists())
+        self.reader_post.refresh_from_db()
+        self.assertEqual((self.reader_post.likes_count,
+                          self.reader_post.comments_count), (0, 0))
+        profile = Profile.objects.get(user=self.reader)
+        self.assertEqual((profile.followers_count, profile.followings_count),
+                         (0, 0))
+        self.group.refresh_from_db()
+        self.assertIsNone(self.group.creator)
+
+    def test_job_records_progress(self):
+        """Задание сохраняет этап и число удалённых строк."""
+        for number in range(3):
+            Comment.objects.create(post=self.reader_post, author=self.author,
+                                   text=str(number))
+        purge.delete_user(self.author)
+        job = PurgeJob.objects.get()
+
+        purge.run(job, batch_size=2)
+
+        job.refresh_from_db()
+        self.assertEqual(job.stage, "user")
+        self.assertIsNotNone(job.finished)
+        # Три комментария, публикация и пользователь с профилем.
+        self.assertGreaterEqual(job.purged, 5)
+        self.assertEqual(purge.drain(), 0)
+
+    def test_post_delete_hides_post_until_purged(self):
+        """Удалённая публикация скрыта, комментарии удаляет очередь."""
+        Comment.objects.create(post=self.post, author=self.reader,
+                               text="Комментарий")
+        self.author_client.get(reverse("posts:post_delete", kwargs={
+            "username": self.author.username, "post_id": self.post.pk}))
+
+        post_url = reverse("posts:post", kwargs={
+            "username": self.author.username, "post_id": self.post.pk})
+        self.assertEqual(self.guest_client.get(post_url).status_code, 404)
+        self.assertFalse(Post.objects.filter(pk=self.post.pk).exists())
+        self.assertTrue(Comment.objects.exists())
+
+        self.assertEqual(purge.drain(), 1)
+        self.assertFalse(Post.all_objects.filter(pk=self.post.pk).exists())
+        self.assertFalse(Comment.objects.exists())
+
+    def test_group_delete_detaches_posts_in_background(self):
+        """Удалённая группа скрыта сразу, публикации отвязывает очередь."""
+        self.author_client.get(reverse("posts:group_delete", kwargs={
+            "username": self.author.username, "slug": self.group.slug}))
+
+        group_url = reverse("posts:group", kwargs={"slug": self.group.slug})
+        self.assertEqual(self.guest_client.get(group_url).status_code, 404)
+        response = self.guest_client.get(reverse("posts:index"))
+        self.assertNotContains(response, group_url)
+        self.assertContains(response, "Пост автора")
+        response = self.guest_client.get(reverse("posts:all_groups"))
+        self.assertEqual(list(response.context["page"]), [])
+
+        purge.drain(batch_size=1)
+        self.assertFalse(Group.objects.filter(pk=self.group.pk).exists())
+        self.assertFalse(Post.objects.filter(group__isnull=False).exists())
+        self.assertEqual(Post.objects.count(), 2)
+
+    @override_settings(PURGE_MAX_ATTEMPTS=2)
+    def test_failing_job_does_not_block_queue(self):
+        """Упавшее задание не мешает остальным и повторяется ограниченно."""
+        purge.delete_user(self.author)
+        purge.delete_post(self.reader_post)
+        broken, post_job = PurgeJob.objects.order_by("pk")
+        real_stages = purge.stages
+
+        def stages(job):
+            if job.pk == broken.pk:
+                raise RuntimeError("сбой")
+            return real_stages(job)
+
+        with mock.patch("posts.purge.stages", side_effect=stages), \
+                self.assertLogs("posts.purge", "ERROR"):
+            self.assertEqual(purge.drain(), 1)
+            self.assertEqual(purge.drain(), 0)
+            self.assertEqual(purge.drain(), 0)
+
+        post_job.refresh_from_db()
+        broken.refresh_from_db()
+        self.assertIsNotNone(post_job.finished)
+        self.assertEqual((broken.attempts, broken.finished), (2, None))
+        self.assertEqual(list(purge.pending()), [])
@@ -0,0 +1,76 @@
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts.models import Comment, Follow, Group, Likes, Post, User
+
+# Таблицы, которые растут с числом пользователей и публикаций.
+LARGE_TABLES = ("posts_post", "posts_comment", "Follow", "posts_likes",
+                "posts_feedentry")
+
+
+class QueryPlanTest(TestCase):
+    """Запросы горячих страниц не читают большие таблицы целиком
+    и не сортируют результат во временном B-дереве."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create(username="Author")
+        cls.reader = User.objects.create(username="Reader")
+        cls.group = Group.objects.create(title="Группа", slug="group")
+        Post.objects.bulk_create(
+            Post(author=cls.author, group=cls.group, text=f"Пост {number}")
+            for number in range(15))
+        cls.post = Post.objects.create(author=cls.author, group=cls.group,
+                                       text="Последний")
+        Comment.objects.create(post=cls.post, author=cls.reader,
+                               text="Комментарий")
+        Likes.objects.create(post=cls.post, user=cls.reader)
+        Follow.objects.create(user=cls.reader, author=cls.author)
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(self.reader)
+
+    def problems(self, sql):
+        with connection.cursor() as cursor:
+            cursor.execute(f"EXPLAIN QUERY PLAN {sql}")
+            details = [row[-1] for row in cursor.fetchall()]
+        problems = [detail for detail in details if "TEMP B-TREE" in detail]
+        for detail in details:
+            words = detail.split()
+            if (words[0] == "SCAN" and "INDEX" not in detail
+                    and words[-1].strip('"') in LARGE_TABLES):
+                problems.append(detail)
+        return problems
+
+    def assertIndexedQueries(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        for query in queries:
+            if not query["sql"].startswith("SELECT"):
+                continue
+            with self.subTest(url=url, sql=query["sql"]):
+                self.assertEqual(self.problems(query["sql"]), [])
+
+    def test_hot_views_use_indexes(self):
+        """Списки, страница поста и подписки читаются по индексам."""
+        username = self.author.username
+        first_page = self.client.get(reverse("posts:index")).context["page"]
+        urls = [
+            reverse("posts:index"),
+            f"{reverse('posts:index')}?after={first_page.next_cursor}",
+            reverse("posts:group", args=[self.group.slug]),
+            reverse("posts:profile", args=[username]),
+            reverse("posts:post", args=[username, self.post.pk]),
+            reverse("posts:follow_index"),
+            reverse("posts:followers", args=[username]),
+            reverse("posts:following", args=[self.reader.username]),
+        ]
+        for url in urls:
+            cache.clear()
+            self.assertIndexedQueries(url)
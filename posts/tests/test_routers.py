@@ -0,0 +1,86 @@
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.db import router, transaction
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, override_settings
+
+from posts.models import Post, User
+from posts.routers import ReplicaMiddleware, reads_from_replica
+
+
+@override_settings(DATABASE_REPLICAS=["replica"])
+class ReplicaRouterTest(SimpleTestCase):
+    databases = {"default"}
+
+    def setUp(self):
+        cache.clear()
+        self.user = User(pk=1, username="Reader")
+        self.factory = RequestFactory()
+
+    def request(self, view, method="get", user=None):
+        """Проходит middleware и возвращает базу, выбранную для чтения."""
+        used = []
+
+        def get_response(request):
+            middleware.process_view(request, view, (), {})
+            return view(request, used)
+
+        middleware = ReplicaMiddleware(get_response)
+        request = getattr(self.factory, method)("/")
+        request.user = user or AnonymousUser()
+        middleware(request)
+        return used[0]
+
+    @staticmethod
+    @reads_from_replica
+    def read_view(request, used):
+        used.append(router.db_for_read(Post))
+        return HttpResponse()
+
+    @staticmethod
+    def write_view(request, used):
+        used.append(router.db_for_read(Post))
+        Post.objects.filter(pk=0).update(text="")
+        return HttpResponse()
+
+    @staticmethod
+    @reads_from_replica
+    def lookup_view(request, used):
+        used.append(router.db_for_read(Post))
+        Post.objects.using(router.db_for_write(Post)).filter(pk=0).exists()
+        return HttpResponse()
+
+    def test_only_marked_safe_requests_read_from_replica(self):
+        """Реплика используется только отмеченными GET-представлениями."""
+        self.assertEqual(self.request(self.read_view), "replica")
+        self.assertEqual(self.request(self.read_view, "post"), "default")
+        self.assertEqual(self.request(self.write_view), "default")
+        self.assertEqual(router.db_for_read(Post), "default")
+
+    def test_writer_sticks_to_primary(self):
+        """После записи пользователь читает из основной базы."""
+        other = User(pk=2, username="Other")
+        self.request(self.write_view, user=self.user)
+        self.assertEqual(self.request(self.read_view, user=self.user),
+                         "default")
+        self.assertEqual(self.request(self.read_view, user=other),
+                         "replica")
+        cache.clear()
+        self.assertEqual(self.request(self.read_view, user=self.user),
+                         "replica")
+
+    def test_lookup_on_primary_does_not_stick(self):
+        """Чтение из основной базы без записи не закрепляет пользователя."""
+        self.request(self.lookup_view, user=self.user)
+        self.assertEqual(self.request(self.read_view, user=self.user),
+                         "replica")
+
+    def test_transaction_reads_from_primary(self):
+        """Внутри транзакции чтение идёт из основной базы."""
+        @reads_from_replica
+        def view(request, used):
+            with transaction.atomic():
+                used.append(router.db_for_read(Post))
+            return HttpResponse()
+
+        self.assertEqual(self.request(view), "default")
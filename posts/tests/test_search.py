@@ -0,0 +1,83 @@
+# posts/tests/tests_search.py
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts.models import Post, Group, User
+
+
+class SearchViewTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create(username="Ivan_Log")
+        cls.other = User.objects.create(username="Petr")
+        cls.group = Group.objects.create(
+            title="Космонавтика",
+            slug="test-slug",
+        )
+        cls.text_post = Post.objects.create(author=cls.other,
+                                            text="Полёт на Луну")
+        cls.author_post = Post.objects.create(author=cls.user,
+                                              text="Обычный день")
+        cls.group_post = Post.objects.create(author=cls.other,
+                                             text="Старт ракеты",
+                                             group=cls.group)
+
+    def setUp(self):
+        self.guest_client = Client()
+
+    def search(self, query):
+        response = self.guest_client.get(reverse("posts:search_results"),
+                                         {"q": query})
+        return list(response.context["page"].object_list)
+
+    def test_search_matches_text_author_and_group(self):
+        """Поиск находит посты по тексту, автору и группе."""
+        self.assertEqual(self.search("Луну"), [self.text_post])
+        self.assertEqual(self.search("ivan"), [self.author_post])
+        self.assertEqual(self.search("космонавт"), [self.group_post])
+
+    def test_search_index_follows_changes(self):
+        """Индекс обновляется при изменении и удалении поста."""
+        post = Post.objects.get(pk=self.text_post.pk)
+        post.text = "Полёт на Марс"
+        post.save()
+        self.assertEqual(self.search("Луну"), [])
+        self.assertEqual(self.search("Марс"), [post])
+        post.delete()
+        self.assertEqual(self.search("Марс"), [])
+
+    def test_search_index_follows_group_rename(self):
+        """Индекс обновляется при переименовании группы."""
+        group = Group.objects.get(pk=self.group.pk)
+        group.title = "Астрономия"
+        group.save()
+        self.assertEqual(self.search("Астрономия"), [self.group_post])
+
+    def test_search_reads_from_routed_database(self):
+        """Индекс читается из базы, выбранной маршрутизатором."""
+        with mock.patch("posts.views.router.db_for_read",
+                        return_value="default") as db_for_read, \
+                mock.patch("posts.views.search_posts",
+                           return_value=Post.objects.none()) as search:
+            self.search("Луна")
+        db_for_read.assert_called_with(Post)
+        search.assert_called_once_with("Луна", using="default")
+
+    def test_empty_query_returns_nothing(self):
+        """Пустой запрос и спецсимволы не ломают поиск."""
+        self.assertEqual(self.search(""), [])
+        self.assertEqual(self.search('"*)('), [])
+
+    def test_rebuild_search_index(self):
+        """Команда rebuild_search_index индексирует созданные в обход
+        сигналов посты.
+        """
+        Post.objects.bulk_create([Post(author=self.user, text="Комета")])
+        self.assertEqual(self.search("Комета"), [])
+        call_command("rebuild_search_index", stdout=StringIO())
+        self.assertEqual(len(self.search("Комета")), 1)
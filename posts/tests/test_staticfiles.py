@@ -0,0 +1,89 @@
+import gzip
+import os
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.contrib.staticfiles import finders
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.management import call_command
+from django.http import Http404
+from django.template.loader import render_to_string
+from django.test import RequestFactory, SimpleTestCase, override_settings
+from django.urls import reverse
+
+from posts.staticfiles import serve
+
+CSS = "body { color: black; }\n" * 100
+BASE_TEMPLATE_STATIC = ("favicon.ico", "bootstrap/dist/css/bootstrap.min.css",
+                        "jquery/dist/jquery.min.js",
+                        "bootstrap/dist/js/bootstrap.min.js")
+
+
+class StaticPipelineTest(SimpleTestCase):
+    def setUp(self):
+        source = tempfile.mkdtemp(dir=settings.BASE_DIR)
+        root = tempfile.mkdtemp(dir=settings.BASE_DIR)
+        for directory in (source, root):
+            self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        with open(os.path.join(source, "site.css"), "w") as css:
+            css.write(CSS)
+        for name in BASE_TEMPLATE_STATIC:
+            path = os.path.join(source, name)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, "w") as static_file:
+                static_file.write(name)
+        settings_override = override_settings(
+            STATICFILES_DIRS=[source], STATIC_ROOT=root,
+            STATICFILES_FINDERS=[
+                "django.contrib.staticfiles.finders.FileSystemFinder"])
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        call_command("collectstatic", interactive=False, verbosity=0)
+        self.hashed = staticfiles_storage.stored_name("site.css")
+
+    def get(self, name, **headers):
+        return self.client.get(reverse("static", args=[name]), **headers)
+
+    def test_hashed_file_is_immutable_and_compressed(self):
+        """Хэшированный файл кэшируется навсегда и отдаётся сжатым."""
+        self.assertNotEqual(self.hashed, "site.css")
+        self.assertTrue(staticfiles_storage.url("site.css")
+                        .endswith(self.hashed))
+        response = self.get(self.hashed, HTTP_ACCEPT_ENCODING="gzip, br;q=0")
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        self.assertEqual(response["Content-Type"], "text/css")
+        self.assertIn("immutable", response["Cache-Control"])
+        self.assertIn("Accept-Encoding", response["Vary"])
+        body = b"".join(response.streaming_content)
+        self.assertEqual(gzip.decompress(body).decode(), CSS)
+
+    def test_plain_request_and_unhashed_name(self):
+        """Без Accept-Encoding файл отдаётся как есть, имя без хэша
+        перепроверяется."""
+        response = self.get(self.hashed)
+        self.assertNotIn("Content-Encoding", response)
+        self.assertEqual(b"".join(response.streaming_content).decode(), CSS)
+        response = self.get("site.css")
+        self.assertNotIn("immutable", response["Cache-Control"])
+        with self.assertRaises(Http404):
+            serve(RequestFactory().get("/"), "missing.css")
+
+    def test_templates_use_hashed_names(self):
+        """Без DEBUG шаблоны ссылаются на хэшированные имена."""
+        html = render_to_string("base.html")
+        for name in BASE_TEMPLATE_STATIC:
+            with self.subTest(name=name):
+                hashed = staticfiles_storage.stored_name(name)
+                self.assertNotEqual(hashed, name)
+                self.assertIn(f"/static/{hashed}", html)
+
+    @override_settings(DEBUG=True)
+    def test_debug_uses_names_known_to_finders(self):
+        """При DEBUG runserver ищет статику через finders, поэтому
+        шаблоны ссылаются на исходные имена."""
+        html = render_to_string("base.html")
+        for name in BASE_TEMPLATE_STATIC:
+            with self.subTest(name=name):
+                self.assertIn(f"/static/{name}", html)
+                self.assertIsNotNone(finders.find(name))
@@ -0,0 +1,94 @@
+import io
+import os
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.core.management import call_command
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TransactionTestCase, override_settings
+from PIL import Image
+
+from posts import images
+from posts.models import Post, Profile, StoredFile, User
+
+
+class ContentAddressedStorageTest(TransactionTestCase):
+    def setUp(self):
+        media_root = tempfile.mkdtemp(prefix="media", dir=settings.BASE_DIR)
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        settings_override = override_settings(MEDIA_ROOT=media_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.user = User.objects.create(username="Author")
+
+    def upload(self, color="red"):
+        buffer = io.BytesIO()
+        Image.new("RGB", (500, 300), color).save(buffer, "PNG")
+        return SimpleUploadedFile("meme.png", buffer.getvalue(),
+                                  content_type="image/png")
+
+    def files(self, post):
+        return images.image_names(post.image, post.image_variants)
+
+    def references(self, names):
+        return dict(StoredFile.objects.filter(name__in=names)
+                    .values_list("name", "references"))
+
+    def test_same_image_is_stored_once(self):
+        """Одинаковые картинки хранятся одним файлом с общим счётчиком."""
+        first = Post.objects.create(author=self.user, text="Первый",
+                                    image=self.upload())
+        second = Post.objects.create(author=self.user, text="Второй",
+                                     image=self.upload())
+        other = Post.objects.create(author=self.user, text="Другой",
+                                    image=self.upload("blue"))
+        self.assertEqual(self.files(first), self.files(second))
+        self.assertNotEqual(first.image.name, other.image.name)
+        self.assertEqual(set(self.references(self.files(first)).values()),
+                         {2})
+        directory = os.path.dirname(first.image.path)
+        self.assertEqual(os.listdir(directory),
+                         [os.path.basename(first.image.name)])
+
+    def test_unreferenced_files_are_removed(self):
+        """Файлы удаляются после удаления последней ссылки на них."""
+        first = Post.objects.create(author=self.user, text="Первый",
+                                    image=self.upload())
+        second = Post.objects.create(author=self.user, text="Второй",
+                                     image=self.upload())
+        names = self.files(first)
+        storage = first.image.storage
+        first.delete()
+        self.assertTrue(all(storage.exists(name) for name in names))
+        self.user.delete()
+        self.assertFalse(any(storage.exists(name) for name in names))
+        self.assertFalse(StoredFile.objects.exists())
+        self.assertFalse(Post.objects.filter(pk=second.pk).exists())
+
+    def test_recount_restores_references(self):
+        """Пересчёт восстанавливает ссылки по картинкам в базе."""
+        first = Post.objects.create(author=self.user, text="Первый",
+                                    image=self.upload())
+        Post.objects.create(author=self.user, text="Второй",
+                            image=self.upload())
+        StoredFile.objects.all().delete()
+        StoredFile.objects.create(name="posts/stale.jpg", references=3)
+
+        call_command("recount_stored_files", stdout=io.StringIO())
+
+        names = self.files(first)
+        self.assertEqual(self.references(names),
+                         {name: 2 for name in names})
+        self.assertEqual(StoredFile.objects.count(), len(names))
+
+    def test_replaced_avatar_is_released(self):
+        """Старый аватар удаляется при загрузке нового."""
+        profile = Profile.objects.create(user=self.user, image=self.upload())
+        old_names = images.image_names(profile.image,
+                                       profile.image_variants)
+        profile.image = self.upload("blue")
+        profile.save()
+        storage = profile.image.storage
+        self.assertFalse(any(storage.exists(name) for name in old_names))
+        self.assertTrue(storage.exists(profile.image.name))
@@ -0,0 +1,126 @@
+import os
+import shutil
+import tempfile
+from io import StringIO
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db.models import Value
+from django.db.models.functions import Concat
+from django.test import TestCase
+
+from posts.models import (Comment, Follow, Group, Likes, Post, Profile,
+                          StoredFile, User)
+
+
+class TransferTest(TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmp_dir, "dump.ndjson")
+        author = User.objects.create(username="Author")
+        reader = User.objects.create(username="Reader")
+        group = Group.objects.create(title="Группа", slug="group",
+                                     creator=author)
+        self.posts = [Post.objects.create(author=author, group=group,
+                                          text=f"Пост {i}")
+                      for i in range(5)]
+        Comment.objects.create(post=self.posts[0], author=reader,
+                               text="Комментарий")
+        Follow.objects.create(user=reader, author=author)
+        Likes.objects.create(user=reader, post=self.posts[1])
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+
+    def export(self):
+        call_command("export_yatube", self.path, chunk_size=2,
+                     stdout=StringIO())
+
+    def import_(self):
+        call_command("import_yatube", self.path, chunk_size=2,
+                     stdout=StringIO())
+
+    def snapshot(self):
+        return {
+            "posts": list(Post.objects.values_list(
+                "author__username", "group__slug", "text", "pub_date",
+                "likes_count", "comments_count")),
+            "comments": list(Comment.objects.values_list(
+                "post__text", "author__username", "text")),
+            "follows": list(Follow.objects.values_list(
+                "user__username", "author__username")),
+            "likes": list(Likes.objects.values_list(
+                "user__username", "post__text")),
+            "profiles": Profile.objects.count(),
+        }
+
+    def test_export_and_import_restore_data(self):
+        """Выгрузка и загрузка восстанавливают данные и связи."""
+        expected = self.snapshot()
+        self.export()
+        User.objects.all().delete()
+        Group.objects.all().delete()
+        self.import_()
+        self.assertEqual(self.snapshot(), expected)
+        self.assertFalse(os.path.exists(f"{self.path}.progress"))
+
+    def test_import_counts_image_references(self):
+        """Загруженные картинки получают ссылки в хранилище."""
+        Post.objects.filter(pk__in=[post.pk for post in self.posts[:2]]
+                            ).update(image="posts/shared.jpg")
+        self.export()
+        User.objects.all().delete()
+        Group.objects.all().delete()
+        self.import_()
+        self.assertEqual(
+            list(StoredFile.objects.values_list("name", "references")),
+            [("posts/shared.jpg", 2)])
+
+    def test_import_remaps_keys_past_existing_rows(self):
+        """Ключи загруженных объектов сдвигаются за существующие."""
+        self.export()
+        Post.objects.all().delete()
+        Comment.objects.all().delete()
+        User.objects.update(username=Concat(Value("old_"), "username"))
+        Group.objects.update(slug="old-group")
+        self.import_()
+        self.assertEqual(Post.objects.count(), 5)
+        self.assertEqual(
+            set(Post.objects.values_list("author__username", flat=True)),
+            {"Author"})
+        self.assertEqual(Follow.objects.filter(
+            user__username="Reader", author__username="Author").count(), 1)
+
+    def test_import_stops_on_existing_username(self):
+        """Пользователь с уже занятым именем не пропускается молча."""
+        self.export()
+        Post.objects.all().delete()
+        User.objects.exclude(username="Author").update(
+            username=Concat(Value("old_"), "username"))
+        Group.objects.update(slug="old-group")
+        posts_before = Post.objects.count()
+        with self.assertRaisesMessage(CommandError, "username='Author'"):
+            self.import_()
+        self.assertEqual(Post.objects.count(), posts_before)
+        self.assertFalse(User.objects.filter(username="Reader").exists())
+        self.assertTrue(os.path.exists(f"{self.path}.progress"))
+
+    def test_interrupted_import_resumes(self):
+        """Прерванная загрузка продолжается с сохранённой строки."""
+        expected = self.snapshot()
+        self.export()
+        with open(self.path, encoding="utf-8") as dump:
+            lines = dump.readlines()
+        User.objects.all().delete()
+        Group.objects.all().delete()
+        with open(self.path, "w", encoding="utf-8") as dump:
+            dump.writelines(lines[:8])
+            dump.write("{не json\n")
+        with self.assertRaises(ValueError):
+            self.import_()
+        self.assertTrue(os.path.exists(f"{self.path}.progress"))
+        self.assertTrue(Post.objects.exists())
+        with open(self.path, "w", encoding="utf-8") as dump:
+            dump.writelines(lines)
+        self.import_()
+        self.assertEqual(self.snapshot(), expected)
@@ -5,12 +5,23 @@ from django import forms
 from django.core.files.uploadedfile import SimpleUploadedFile
 from django.conf import settings
 from django.core.cache import cache
+from django.db import IntegrityError
+from django.template import Engine
+from django.template.defaulttags import URLNode
+from django.templatetags.static import static
 
 import tempfile
 import shutil
+from unittest import mock
 
 from yatube.settings import MEDIA_ROOT
-from posts.models import Post, Group, User, Comment, Follow
+from posts import feed
+from posts.avatars import DEFAULT_AVATAR
+from posts.card_urls import attach_card_urls
+from posts.likes import liked_post_ids, toggle_like
+from posts.viewer import ViewerState
+from posts.models import (Post, Group, User, Comment, Follow, FeedEntry,
+                          Likes, Profile)
 
 
 @override_settings(MEDIA_ROOT=MEDIA_ROOT)
@@ -209,20 +220,33 @@ class PostPagesTests(TestCase):
         self.assertTrue(edit_flag)
 
     def test_cache_correct_index_page(self):
-        """Проверка работы кэширования на главной странице"""
-        response_0 = self.authorized_client.get(reverse("posts:index"))
-
-        post = Post.objects.create(text="Test", author=self.user,
+        """Проверка работы кэширования карточек на главной странице"""
+        post = Post.objects.create(text="Старый текст", author=self.user,
                                    group=self.group1)
+        self.authorized_client.get(reverse("posts:index"))
+
+        Post.objects.filter(id=post.id).update(text="Текст без версии")
         response_1 = self.authorized_client.get(reverse("posts:index"))
-        Post.objects.filter(id=post.id).delete()
+        self.assertContains(response_1, "Старый текст")
 
+        post.refresh_from_db()
+        post.text = "Новый текст"
+        post.save()
         response_2 = self.authorized_client.get(reverse("posts:index"))
-        self.assertEqual(response_1.content, response_2.content)
+        self.assertContains(response_2, "Новый текст")
+        self.assertNotContains(response_2, "Старый текст")
 
-        cache.clear()
+        Post.objects.filter(id=post.id).delete()
         response_3 = self.authorized_client.get(reverse("posts:index"))
-        self.assertEqual(response_0.content, response_3.content)
+        self.assertNotContains(response_3, "Новый текст")
+
+    def test_cached_cards_depend_on_viewer(self):
+        """Автор и гость получают разные варианты одной карточки"""
+        post = Post.objects.create(text="Текст", author=self.user)
+        self.guest_client.get(reverse("posts:index"))
+        response = self.authorized_client.get(reverse("posts:index"))
+        self.assertContains(response, reverse("posts:post_edit", kwargs={
+            "username": self.user.username, "post_id": post.id}))
 
     def test_new_post_follow_index_show_correct_context(self):
         """Шаблон follow_index сформирован с правильным контекстом."""
@@ -265,3 +289,505 @@ class PostPagesTests(TestCase):
         follow_exist = Follow.objects.filter(user=self.user,
                                              author=self.user2).exists()
         self.assertEqual(False, follow_exist)
+
+
+@override_settings(FEED_MAX_LENGTH=3, FEED_FANOUT_THRESHOLD=1)
+class FollowFeedTests(TestCase):
+    def setUp(self):
+        self.author = User.objects.create(username="Author")
+        self.reader = User.objects.create(username="Reader")
+        self.client = Client()
+        self.client.force_login(self.reader)
+
+    def feed(self):
+        response = self.client.get(reverse("posts:follow_index"))
+        return list(response.context["page"].object_list)
+
+    def test_new_post_is_fanned_out_to_followers(self):
+        """Новый пост попадает в ленты подписчиков."""
+        Follow.objects.create(user=self.reader, author=self.author)
+        post = Post.objects.create(author=self.author, text="Новый")
+        self.assertTrue(FeedEntry.objects.filter(user=self.reader,
+                                                 post=post).exists())
+        self.assertEqual(self.feed(), [post])
+
+    def test_feed_is_bounded(self):
+        """Лента хранит не больше FEED_MAX_LENGTH записей."""
+        posts = [Post.objects.create(author=self.author, text=str(i))
+                 for i in range(5)]
+        Follow.objects.create(user=self.reader, author=self.author)
+        self.assertEqual(FeedEntry.objects.filter(user=self.reader).count(),
+                         3)
+        Post.objects.create(author=self.author, text="Новый")
+        self.assertEqual(FeedEntry.objects.filter(user=self.reader).count(),
+                         3)
+        self.assertNotIn(posts[2], self.feed())
+
+    def test_popular_author_posts_are_pulled(self):
+        """Посты популярных авторов подмешиваются в ленту при чтении."""
+        fan = User.objects.create(username="Fan")
+        Follow.objects.create(user=fan, author=self.author)
+        Follow.objects.create(user=self.reader, author=self.author)
+        post = Post.objects.create(author=self.author, text="Популярный")
+        self.assertFalse(FeedEntry.objects.filter(post=post).exists())
+        self.assertEqual(self.feed(), [post])
+
+    def test_author_below_threshold_is_backfilled(self):
+        """Посты, написанные без рассылки, остаются в ленте, когда автор
+        перестаёт быть популярным."""
+        fan = User.objects.create(username="Fan")
+        Follow.objects.create(user=fan, author=self.author)
+        Follow.objects.create(user=self.reader, author=self.author)
+        post = Post.objects.create(author=self.author, text="Популярный")
+        with mock.patch("posts.feed.transaction.on_commit") as on_commit:
+            Follow.objects.filter(user=fan).delete()
+        on_commit.assert_called_once()
+        feed.backfill_followers(self.author.pk)
+        self.assertEqual(self.feed(), [post])
+
+    def test_missing_profile_is_counted_not_created(self):
+        """Страница автора без профиля не пишет в базу и показывает
+        настоящие счётчики подписок."""
+        Follow.objects.create(user=self.reader, author=self.author)
+        Profile.objects.filter(user=self.author).delete()
+        response = self.client.get(reverse(
+            "posts:profile", kwargs={"username": self.author.username}))
+        self.assertEqual(response.context["followers_count"], 1)
+        self.assertFalse(Profile.objects.filter(user=self.author).exists())
+
+    def test_unfollow_and_post_delete_prune_feed(self):
+        """Отписка и удаление поста убирают записи из ленты."""
+        Follow.objects.create(user=self.reader, author=self.author)
+        post = Post.objects.create(author=self.author, text="Пост")
+        post.delete()
+        self.assertFalse(FeedEntry.objects.exists())
+        Post.objects.create(author=self.author, text="Пост")
+        Follow.objects.filter(user=self.reader).delete()
+        self.assertFalse(FeedEntry.objects.exists())
+        self.assertEqual(self.feed(), [])
+
+
+class LikeTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create(username="Author")
+        self.reader = User.objects.create(username="Reader")
+        self.post = Post.objects.create(author=self.author, text="Пост")
+        self.like_url = reverse("posts:likes", kwargs={
+            "username": self.author.username, "post_id": self.post.id})
+        self.client = Client()
+        self.client.force_login(self.reader)
+
+    def test_toggle_like_returns_new_count(self):
+        """Повторный вызов снимает лайк, счётчик возвращается."""
+        self.assertEqual(toggle_like(self.reader, self.post.id), (True, 1))
+        self.assertEqual(toggle_like(self.reader, self.post.id), (False, 0))
+        self.assertFalse(Likes.objects.exists())
+
+    def test_duplicate_like_is_rejected(self):
+        """База не допускает двух лайков одного поста от пользователя."""
+        Likes.objects.create(user=self.reader, post=self.post)
+        with self.assertRaises(IntegrityError):
+            Likes.objects.create(user=self.reader, post=self.post)
+
+    def test_like_view_answers_ajax_with_count(self):
+        """AJAX-запрос получает состояние лайка и новый счётчик."""
+        response = self.client.get(
+            self.like_url, HTTP_X_REQUESTED_WITH="XMLHttpRequest")
+        self.assertEqual(response.json(), {"post_is_liked": True,
+                                           "likes_count": 1})
+
+    def test_like_view_redirects_without_referer(self):
+        """Без HTTP_REFERER лайк возвращает на страницу поста."""
+        response = self.client.get(self.like_url)
+        self.assertRedirects(response, reverse("posts:post", kwargs={
+            "username": self.author.username, "post_id": self.post.id}))
+
+    def test_index_marks_liked_posts(self):
+        """Лайки зрителя на странице читаются одним запросом."""
+        other = Post.objects.create(author=self.author, text="Другой")
+        toggle_like(self.reader, self.post.id)
+        with self.assertNumQueries(1):
+            liked = liked_post_ids(self.reader, [self.post, other])
+        self.assertEqual(liked, {self.post.id})
+        response = self.client.get(reverse("posts:index"))
+        self.assertEqual(response.context["viewer"].liked_post_ids,
+                         {self.post.id})
+        self.assertContains(response, "badge-danger", count=1)
+
+
+class ViewerStateTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.reader = User.objects.create(username="Reader")
+        self.authors = [User.objects.create(username=f"Author{i}")
+                        for i in range(3)]
+        self.posts = [Post.objects.create(author=author, text=str(i))
+                      for i in range(3) for author in self.authors]
+        Post.objects.create(author=self.reader, text="Свой")
+        Follow.objects.create(user=self.reader, author=self.authors[0])
+        Likes.objects.create(user=self.reader, post=self.posts[1])
+        self.client = Client()
+        self.client.force_login(self.reader)
+
+    def test_state_is_loaded_in_two_queries(self):
+        """Подписки и лайки страницы читаются двумя запросами."""
+        posts = list(Post.objects.all())
+        with self.assertNumQueries(2):
+            viewer = ViewerState(self.reader, posts)
+        own = Post.objects.get(author=self.reader)
+        self.assertTrue(viewer.is_following(self.authors[0].pk))
+        self.assertFalse(viewer.is_following(self.authors[1].pk))
+        self.assertTrue(viewer.is_liked(self.posts[1]))
+        self.assertFalse(viewer.is_liked(self.posts[0]))
+        self.assertTrue(viewer.is_own(own))
+        self.assertFalse(viewer.is_own(self.posts[0]))
+
+    def test_guest_state_needs_no_queries(self):
+        """Для гостя состояние строится без запросов."""
+        guest = Client().get(reverse("posts:index")).context["user"]
+        with self.assertNumQueries(0):
+            viewer = ViewerState(guest, self.posts)
+        self.assertFalse(viewer.is_liked(self.posts[1]))
+
+    def test_index_shows_viewer_state(self):
+        """Лента показывает подписки, лайки и свои посты зрителя."""
+        response = self.client.get(reverse("posts:index"))
+        self.assertContains(response, "Вы подписаны", count=3)
+        self.assertContains(response, "badge-danger", count=1)
+        self.assertContains(response, "Редактировать", count=1)
+
+    def test_profile_following_is_boolean(self):
+        """Профиль получает подписку зрителя как флаг."""
+        response = self.client.get(reverse("posts:profile", kwargs={
+            "username": self.authors[0].username}))
+        self.assertIs(response.context["following"], True)
+
+
+class ConditionalGetTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create(username="Author")
+        self.group = Group.objects.create(title="Группа", slug="group")
+        self.other_group = Group.objects.create(title="Другая",
+                                                slug="other")
+        self.post = Post.objects.create(author=self.author, text="Пост",
+                                        group=self.group)
+        self.guest_client = Client()
+
+    def revalidate(self, url, client=None):
+        client = client or self.guest_client
+        etag = client.get(url)["ETag"]
+        return client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+    def test_unchanged_index_returns_304_before_page_query(self):
+        """Неизменившаяся главная отдаёт 304 без выборки страницы."""
+        url = reverse("posts:index")
+        response = self.guest_client.get(url)
+        self.assertIn("Last-Modified", response)
+        with self.assertNumQueries(1):
+            response = self.guest_client.get(
+                url, HTTP_IF_NONE_MATCH=response["ETag"])
+        self.assertEqual(response.status_code, 304)
+        response = self.guest_client.get(
+            url, HTTP_IF_MODIFIED_SINCE=response["Last-Modified"])
+        self.assertEqual(response.status_code, 304)
+
+    def test_changes_invalidate_validator(self):
+        """Новый пост, лайк и комментарий меняют ETag списков."""
+        urls = [reverse("posts:index"),
+                reverse("posts:group", args=[self.group.slug]),
+                reverse("posts:profile", args=[self.author.username])]
+        reader = User.objects.create(username="Reader")
+        changes = [
+            lambda: Likes.objects.create(user=reader, post=self.post),
+            lambda: Comment.objects.create(post=self.post, author=reader,
+                                           text="Комментарий"),
+            lambda: Post.objects.create(author=self.author, text="Новый",
+                                        group=self.group),
+        ]
+        for change in changes:
+            etags = [self.guest_client.get(url)["ETag"] for url in urls]
+            change()
+            for url, etag in zip(urls, etags):
+                with self.subTest(url=url):
+                    response = self.guest_client.get(
+                        url, HTTP_IF_NONE_MATCH=etag)
+                    self.assertEqual(response.status_code, 200)
+
+    def test_other_listings_are_not_invalidated(self):
+        """Пост в другой группе не сбрасывает валидатор группы."""
+        url = reverse("posts:group", args=[self.group.slug])
+        etag = self.guest_client.get(url)["ETag"]
+        Post.objects.create(author=self.author, text="Другой",
+                            group=self.other_group)
+        response = self.guest_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+    def test_moving_post_invalidates_previous_group(self):
+        """Перенос поста в другую группу меняет ETag прежней группы."""
+        url = reverse("posts:group", args=[self.group.slug])
+        etag = self.guest_client.get(url)["ETag"]
+        post = Post.objects.get(pk=self.post.pk)
+        post.group = self.other_group
+        post.save()
+        response = self.guest_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_validator_depends_on_viewer(self):
+        """Зритель входит в ETag, персональные страницы без Last-Modified."""
+        url = reverse("posts:index")
+        client = Client()
+        client.force_login(self.author)
+        response = client.get(url)
+        self.assertNotIn("Last-Modified", response)
+        self.assertNotEqual(response["ETag"],
+                            self.guest_client.get(url)["ETag"])
+        self.assertEqual(self.revalidate(url, client).status_code, 304)
+
+    def test_follow_invalidates_profile(self):
+        """Подписка меняет ETag профиля автора."""
+        url = reverse("posts:profile", args=[self.author.username])
+        etag = self.guest_client.get(url)["ETag"]
+        reader = User.objects.create(username="Reader")
+        Follow.objects.create(user=reader, author=self.author)
+        response = self.guest_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_post_page_depends_only_on_its_post(self):
+        """Комментарий меняет ETag своего поста, но не соседнего."""
+        other = Post.objects.create(author=self.author, text="Соседний")
+        urls = [reverse("posts:post", args=[self.author.username, post.pk])
+                for post in (self.post, other)]
+        etags = [self.guest_client.get(url)["ETag"] for url in urls]
+        Comment.objects.create(post=self.post, author=self.author,
+                               text="Комментарий")
+        statuses = [self.guest_client.get(url, HTTP_IF_NONE_MATCH=etag)
+                    .status_code for url, etag in zip(urls, etags)]
+        self.assertEqual(statuses, [200, 304])
+
+    def test_follow_feed_follows_authors(self):
+        """Лента подписок меняется с постами и подписками читателя."""
+        reader = User.objects.create(username="Reader")
+        stranger = User.objects.create(username="Stranger")
+        Follow.objects.create(user=reader, author=self.author)
+        client = Client()
+        client.force_login(reader)
+        url = reverse("posts:follow_index")
+        self.assertEqual(self.revalidate(url, client).status_code, 304)
+        etag = client.get(url)["ETag"]
+        Post.objects.create(author=stranger, text="Чужой")
+        response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        Post.objects.create(author=self.author, text="Новый")
+        response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        etag = response["ETag"]
+        self.post.text = "Исправленный"
+        self.post.save()
+        response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        etag = response["ETag"]
+        Follow.objects.create(user=reader, author=stranger)
+        response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_follow_feed_validation_is_constant(self):
+        """Проверка ленты не зависит от числа подписок."""
+        reader = User.objects.create(username="Reader")
+        for number in range(5):
+            author = User.objects.create(username=f"Author{number}")
+            Follow.objects.create(user=reader, author=author)
+        client = Client()
+        client.force_login(reader)
+        url = reverse("posts:follow_index")
+        etag = client.get(url)["ETag"]
+        # Сессия, пользователь и список популярных авторов.
+        with self.assertNumQueries(3):
+            response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+
+class NewPostsTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create(username="Author")
+        self.other = User.objects.create(username="Other")
+        self.group = Group.objects.create(title="Группа", slug="group")
+        self.post = Post.objects.create(author=self.author, text="Пост")
+        self.guest_client = Client()
+        self.url = reverse("posts:new_posts")
+
+    def poll(self, client=None, **params):
+        params.setdefault("since", self.post.pk)
+        return (client or self.guest_client).get(self.url, params).json()
+
+    def test_idle_poll_does_not_query_database(self):
+        """Без новых публикаций ответ берётся из кэша."""
+        self.poll()
+        with self.assertNumQueries(0):
+            self.assertEqual(self.poll(), {"last_id": self.post.pk,
+                                           "count": 0, "ids": []})
+
+    def test_new_posts_are_reported_by_scope(self):
+        """Новые публикации выдаются для ленты, группы и подписок."""
+        in_group = Post.objects.create(author=self.other, text="Группа",
+                                       group=self.group)
+        by_author = Post.objects.create(author=self.author, text="Автор")
+        self.assertEqual(self.poll()["ids"], [by_author.pk, in_group.pk])
+        self.assertEqual(self.poll(scope="group", group="group")["ids"],
+                         [in_group.pk])
+        client = Client()
+        client.force_login(self.other)
+        Follow.objects.create(user=self.other, author=self.author)
+        self.assertEqual(self.poll(client, scope="follow")["ids"],
+                         [by_author.pk])
+
+    def test_marks_are_restored_after_eviction(self):
+        """Отметки заново читаются из базы после очистки кэша."""
+        new_post = Post.objects.create(author=self.other, text="Новый")
+        cache.clear()
+        self.assertEqual(self.poll(scope="group", group="group")["count"], 0)
+        self.assertEqual(self.poll()["ids"], [new_post.pk])
+
+    def test_follow_scope_requires_login(self):
+        """Подписки доступны только авторизованному пользователю."""
+        response = self.guest_client.get(self.url, {"scope": "follow"})
+        self.assertEqual(response.status_code, 403)
+
+    def test_poll_returns_immediately(self):
+        """Опрос без новых публикаций отвечает сразу, без ожидания."""
+        with mock.patch("time.sleep", side_effect=AssertionError):
+            response = self.guest_client.get(self.url,
+                                             {"since": self.post.pk})
+        self.assertEqual(response.json()["count"], 0)
+
+    def test_page_polls_instead_of_streaming(self):
+        """Страница не открывает поток событий при загрузке."""
+        response = self.guest_client.get(reverse("posts:index"))
+        self.assertNotContains(response, "EventSource")
+        self.assertContains(response, 'data-interval="30"')
+
+    def test_follow_scope_reads_one_feed_mark(self):
+        """Опрос подписок не читает отметки каждого автора."""
+        client = Client()
+        client.force_login(self.other)
+        for number in range(5):
+            author = User.objects.create(username=f"Author{number}")
+            Follow.objects.create(user=self.other, author=author)
+        new_post = Post.objects.create(author=author, text="Новый")
+        with mock.patch.object(cache, "get_many",
+                               wraps=cache.get_many) as get_many:
+            result = self.poll(client, scope="follow")
+        self.assertEqual(result["ids"], [new_post.pk])
+        keys = [key for call in get_many.call_args_list
+                for key in call[0][0] if key.startswith("high_water:")]
+        self.assertEqual(keys, [f"high_water:feed:{self.other.pk}"])
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class AvatarTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        settings.MEDIA_ROOT = tempfile.mkdtemp(prefix="avatars",
+                                               dir=settings.BASE_DIR)
+        cls.small_gif = (
+            b'\x47\x49\x46\x38\x39\x61\x02\x00'
+            b'\x01\x00\x80\x00\x00\x00\x00\x00'
+            b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+            b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+            b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+            b'\x0A\x00\x3B'
+        )
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(settings.MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+        self.with_avatar = User.objects.create(username="WithAvatar")
+        Profile.objects.create(user=self.with_avatar, image=SimpleUploadedFile(
+            name="avatar.gif", content=self.small_gif,
+            content_type="image/gif"))
+        for i in range(5):
+            User.objects.create(username=f"NoAvatar{i}")
+
+    def test_all_authors_resolves_avatars_in_batch(self):
+        """Аватары всех авторов страницы берутся одним запросом."""
+        self.guest_client.get(reverse("posts:all_authors"))
+        with self.assertNumQueries(1):
+            response = self.guest_client.get(reverse("posts:all_authors"))
+        default_url = static(DEFAULT_AVATAR)
+        for author in response.context["page"]:
+            with self.subTest(author=author.username):
+                if author == self.with_avatar:
+                    self.assertNotEqual(author.avatar_url, default_url)
+                else:
+                    self.assertEqual(author.avatar_url, default_url)
+
+    def test_profile_shows_default_avatar(self):
+        """Автор без картинки получает аватар по умолчанию."""
+        response = self.guest_client.get(reverse("posts:profile", kwargs={
+            "username": "NoAvatar0"}))
+        self.assertEqual(response.context["author"].avatar_url,
+                         static(DEFAULT_AVATAR))
+
+
+class PostListRenderTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username="Пётр Иванов")
+        self.group = Group.objects.create(title="Группа", slug="group-1")
+        self.client.force_login(self.user)
+
+    def create_posts(self, count):
+        Post.objects.bulk_create(
+            Post(text=f"Текст {number}", author=self.user, group=self.group)
+            for number in range(count))
+
+    def render_counts(self):
+        """Число поисков шаблонов и вызовов {% url %} на холодной
+        главной странице."""
+        cache.clear()
+        with mock.patch.object(Engine, "find_template", autospec=True,
+                               side_effect=Engine.find_template) as lookups, \
+                mock.patch.object(URLNode, "render", autospec=True,
+                                  side_effect=URLNode.render) as url_tag:
+            response = self.client.get(reverse("posts:index"))
+        self.assertEqual(response.status_code, 200)
+        return lookups.call_count, url_tag.call_count
+
+    def test_template_work_does_not_grow_with_cards(self):
+        """Число поисков шаблонов и вызовов {% url %} не зависит
+        от числа карточек на странице."""
+        self.create_posts(2)
+        few = self.render_counts()
+        self.create_posts(8)
+        many = self.render_counts()
+        self.assertEqual(few, many)
+
+    def test_scroll_script_is_rendered_once(self):
+        """Скрипт восстановления прокрутки выводится один раз на страницу."""
+        self.create_posts(5)
+        response = self.client.get(reverse("posts:index"))
+        self.assertEqual(response.content.decode().count("scrollpos ="), 1)
+
+    def test_card_urls_match_reverse(self):
+        """Готовые ссылки карточки совпадают с результатом reverse()."""
+        post = Post.objects.create(text="Текст", author=self.user,
+                                   group=self.group)
+        attach_card_urls([post])
+        kwargs = {"username": self.user.username, "post_id": post.id}
+        self.assertEqual(post.urls, {
+            "profile": reverse("posts:profile",
+                               args=[self.user.username]),
+            "post": reverse("posts:post", kwargs=kwargs),
+            "edit": reverse("posts:post_edit", kwargs=kwargs),
+            "delete": reverse("posts:post_delete", kwargs=kwargs),
+            "like": reverse("posts:likes", kwargs=kwargs),
+            "group": reverse("posts:group", args=[self.group.slug]),
+        })
@@ -0,0 +1,68 @@
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import connections, transaction
+from sorl.thumbnail import get_thumbnail
+
+logger = logging.getLogger(__name__)
+
+# Размеры должны совпадать с вызовами {% thumbnail %} в шаблонах,
+# иначе заранее созданные миниатюры не будут найдены.
+POST_THUMBNAILS = (
+    ("1200x700", {"crop": "center", "upscale": True}),
+)
+AVATAR_THUMBNAILS = (
+    ("960x960", {"crop": "center", "upscale": True}),
+)
+THUMBNAILS_BY_DIRECTORY = {
+    "posts/": POST_THUMBNAILS,
+    "users/": AVATAR_THUMBNAILS,
+}
+
+_executor = None
+
+
+def get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=settings.THUMBNAIL_WORKERS,
+            thread_name_prefix="thumbnails")
+    return _executor
+
+
+def sizes_for(name):
+    for directory, sizes in THUMBNAILS_BY_DIRECTORY.items():
+        if name.startswith(directory):
+            return sizes
+    return ()
+
+
+def generate(name, sizes=None):
+    """Создаёт все миниатюры картинки, уже созданные пропускаются."""
+    if sizes is None:
+        sizes = sizes_for(name)
+    try:
+        for geometry, options in sizes:
+            get_thumbnail(name, geometry, **options)
+    except Exception:
+        logger.exception("Не удалось создать миниатюры для %s", name)
+        return False
+    return True
+
+
+def _generate_in_worker(name, sizes):
+    try:
+        generate(name, sizes)
+    finally:
+        connections.close_all()
+
+
+def schedule(image, sizes):
+    """Ставит создание миниатюр в очередь пула после коммита транзакции."""
+    if not image:
+        return
+    name = image.name
+    transaction.on_commit(
+        lambda: get_executor().submit(_generate_in_worker, name, sizes))
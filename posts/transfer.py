@@ -0,0 +1,173 @@
+import datetime
+import json
+from contextlib import contextmanager
+
+from django.core.management.color import no_style
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connection, transaction
+from django.db.models import Max, UniqueConstraint
+
+from .models import Comment, Follow, Group, Likes, Post, Profile, User
+
+# Порядок важен: модели идут после тех, на которые ссылаются.
+MODELS = (User, Profile, Group, Post, Comment, Follow, Likes)
+MODELS_BY_LABEL = {model._meta.label_lower: model for model in MODELS}
+
+
+@contextmanager
+def explicit_dates(model):
+    """Позволяет bulk_create сохранить заданные даты auto_now_add."""
+    fields = [field for field in model._meta.concrete_fields
+              if getattr(field, "auto_now_add", False)]
+    for field in fields:
+        field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field in fields:
+            field.auto_now_add = True
+
+
+class JSONEncoder(DjangoJSONEncoder):
+    # DjangoJSONEncoder отбрасывает микросекунды, а они нужны для
+    # точного порядка публикаций.
+    def default(self, o):
+        if isinstance(o, datetime.datetime):
+            return o.isoformat()
+        return super().default(o)
+
+
+def _fields(model):
+    return [field for field in model._meta.concrete_fields
+            if not field.primary_key]
+
+
+def export_lines(chunk_size):
+    """Строки NDJSON со всеми объектами MODELS, по одной на объект.
+
+    Объекты читаются iterator(chunk_size), поэтому память не зависит
+    от объёма данных.
+    """
+    for model in MODELS:
+        label = model._meta.label_lower
+        fields = _fields(model)
+        names = [field.attname for field in fields]
+        rows = (model._base_manager.order_by("pk")
+                .values_list("pk", *names).iterator(chunk_size=chunk_size))
+        for pk, *values in rows:
+            yield json.dumps(
+                {"model": label, "pk": pk, "fields": dict(zip(names, values))},
+                cls=JSONEncoder, ensure_ascii=False)
+
+
+def current_offsets():
+    """Сдвиги ключей, при которых импорт не пересекается с данными."""
+    return {label: (model._base_manager.aggregate(max_pk=Max("pk"))
+                    ["max_pk"] or 0)
+            for label, model in MODELS_BY_LABEL.items()}
+
+
+class ImportConflict(Exception):
+    pass
+
+
+def _unique_keys(model):
+    """Наборы полей, уникальных помимо первичного ключа."""
+    keys = [(field.attname,) for field in _fields(model) if field.unique]
+    keys += [tuple(model._meta.get_field(name).attname
+                   for name in constraint.fields)
+             for constraint in model._meta.constraints
+             if isinstance(constraint, UniqueConstraint)
+             and constraint.condition is None]
+    return keys
+
+
+class Importer:
+    """Загружает NDJSON пачками bulk_create, сдвигая ключи на offsets.
+
+    Первичные и внешние ключи каждой модели увеличиваются на максимальный
+    ключ, который был в базе до начала импорта, поэтому таблица
+    соответствия не нужна. Явные ключи и ignore_conflicts делают
+    повторную загрузку пачки безопасной, что позволяет продолжить
+    прерванный импорт.
+
+    Объект, который совпадает с уже существующим по уникальным полям
+    (имени пользователя, адресу группы, паре подписки), не
+    пропускается молча: загрузка останавливается с ImportConflict,
+    иначе ссылки на него из следующих строк указали бы в пустоту.
+    """
+
+    def __init__(self, offsets, chunk_size):
+        self.offsets = offsets
+        self.chunk_size = chunk_size
+        self._fields = {label: {field.attname: field
+                                for field in _fields(model)}
+                        for label, model in MODELS_BY_LABEL.items()}
+
+    def build(self, record):
+        label = record["model"]
+        model = MODELS_BY_LABEL[label]
+        fields = self._fields[label]
+        values = {}
+        for attname, value in record["fields"].items():
+            field = fields[attname]
+            if value is not None and field.is_relation:
+                related = field.related_model._meta.label_lower
+                value += self.offsets.get(related, 0)
+            elif value is not None:
+                value = field.to_python(value)
+            values[attname] = value
+        return model(pk=record["pk"] + self.offsets[label], **values)
+
+    def chunks(self, lines, start=0):
+        """Пачки (модель, объекты, номер последней строки пачки)."""
+        model = None
+        batch = []
+        number = start
+        for number, line in enumerate(lines, start=1):
+            if number <= start or not line.strip():
+                continue
+            obj = self.build(json.loads(line))
+            if batch and (type(obj) is not model
+                          or len(batch) == self.chunk_size):
+                yield model, batch, number - 1
+                batch = []
+            model = type(obj)
+            batch.append(obj)
+        if batch:
+            yield model, batch, number
+
+    def check_conflicts(self, model, batch):
+        for key in _unique_keys(model):
+            owners = {}
+            for obj in batch:
+                value = tuple(getattr(obj, attname) for attname in key)
+                if owners.setdefault(value, obj.pk) != obj.pk:
+                    self.conflict(model, key, value, owners[value])
+            existing = (model._base_manager
+                        .filter(**{f"{key[0]}__in": {value[0]
+                                                     for value in owners}})
+                        .values_list("pk", *key))
+            for pk, *value in existing.iterator():
+                owner = owners.get(tuple(value))
+                # Тот же ключ — строка уже загружена прерванным импортом.
+                if owner is not None and owner != pk:
+                    self.conflict(model, key, tuple(value), pk)
+
+    def conflict(self, model, key, value, pk):
+        fields = ", ".join(f"{attname}={item!r}"
+                           for attname, item in zip(key, value))
+        raise ImportConflict(f"{model.__name__} с {fields} уже есть "
+                             f"(id {pk}), загрузка остановлена")
+
+    def save(self, model, batch):
+        with transaction.atomic(), explicit_dates(model):
+            self.check_conflicts(model, batch)
+            model.objects.bulk_create(batch, ignore_conflicts=True)
+
+
+def reset_sequences():
+    statements = connection.ops.sequence_reset_sql(no_style(), MODELS)
+    with connection.cursor() as cursor:
+        for sql in statements:
+            cursor.execute(sql)
@@ -0,0 +1,93 @@
+from django.core.cache import cache
+from django.db.models import Max
+
+from .models import FeedEntry, Post
+
+KEY_PREFIX = "high_water"
+NEW_POSTS_LIMIT = 100
+# Области и поле публикации, по которому они выбираются.
+SCOPE_FIELDS = {"author": "author_id", "group": "group_id"}
+
+
+def _key(scope):
+    return f"{KEY_PREFIX}:{scope}"
+
+
+def post_scopes(post):
+    scopes = ["index", f"author:{post.author_id}"]
+    if post.group_id is not None:
+        scopes.append(f"group:{post.group_id}")
+    return scopes
+
+
+def record_post(post):
+    """Поднимает отметки областей до id новой публикации."""
+    keys = [_key(scope) for scope in post_scopes(post)]
+    cached = cache.get_many(keys)
+    cache.set_many({key: post.pk for key in keys
+                    if cached.get(key, 0) < post.pk}, None)
+
+
+def record_feed_entries(user_ids, post_id):
+    """Поднимает отметки лент подписчиков, в которые попала публикация."""
+    cache.set_many({_key(f"feed:{user_id}"): post_id
+                    for user_id in user_ids}, None)
+
+
+def _load_marks(scopes):
+    marks = {}
+    ids_by_kind = {}
+    for scope in scopes:
+        if scope == "index":
+            marks[scope] = (Post.objects.order_by("-pk")
+                            .values_list("pk", flat=True).first() or 0)
+        elif scope.startswith("feed:"):
+            user_id = int(scope.split(":")[1])
+            marks[scope] = (FeedEntry.objects.filter(user_id=user_id)
+                            .aggregate(last_id=Max("post_id"))["last_id"]
+                            or 0)
+        else:
+            kind, value = scope.split(":")
+            ids_by_kind.setdefault(kind, []).append(int(value))
+    for kind, ids in ids_by_kind.items():
+        field = SCOPE_FIELDS[kind]
+        newest = dict(Post.objects.filter(**{f"{field}__in": ids})
+                      .order_by().values(field).annotate(last_id=Max("pk"))
+                      .values_list(field, "last_id"))
+        for pk in ids:
+            marks[f"{kind}:{pk}"] = newest.get(pk, 0)
+    return marks
+
+
+class Watch:
+    """Новые публикации нескольких областей.
+
+    Пока отметки областей в кэше не выше since, проверка не обращается
+    к базе данных.
+    """
+
+    def __init__(self, scopes, posts):
+        self.scopes = list(scopes)
+        self.posts = posts
+
+    def high_water(self):
+        keys = {scope: _key(scope) for scope in self.scopes}
+        cached = cache.get_many(keys.values())
+        missing = [scope for scope, key in keys.items() if key not in cached]
+        marks = [cached[key] for key in cached]
+        if missing:
+            loaded = _load_marks(missing)
+            cache.set_many({_key(scope): mark
+                            for scope, mark in loaded.items()}, None)
+            marks.extend(loaded.values())
+        return max(marks, default=0)
+
+    def check(self, since):
+        """Словарь с id публикаций новее since или None."""
+        high_water = self.high_water()
+        if high_water <= since:
+            return None
+        ids = list(self.posts.filter(pk__gt=since).order_by("-pk")
+                   .values_list("pk", flat=True)[:NEW_POSTS_LIMIT])
+        return {"last_id": max(ids + [high_water]),
+                "count": len(ids), "ids": ids}
@@ -16,6 +16,7 @@ urlpatterns = [
     path("404/", views.page_not_found, name="404"),
     path("500/", views.server_error, name="500"),
     path("follow/", views.follow_index, name="follow_index"),
+    path("updates/", views.new_posts, name="new_posts"),
     path("<str:username>/follow/", views.profile_follow,
          name="profile_follow"),
     path("<str:username>/unfollow/", views.profile_unfollow,
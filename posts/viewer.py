@@ -0,0 +1,44 @@
+from .likes import liked_post_ids
+from .models import Follow
+
+
+class ViewerState:
+    """Отношение зрителя к публикациям и авторам страницы.
+
+    Подписки и лайки для всей страницы читаются не более чем двумя
+    запросами по индексам, «свой пост» определяется без запросов.
+    """
+
+    def __init__(self, user, posts=(), authors=()):
+        posts = list(posts)
+        self.user_id = user.pk if user and user.is_authenticated else None
+        self.followed_author_ids = set()
+        self.liked_post_ids = set()
+        if self.user_id is None:
+            return
+        author_ids = {post.author_id for post in posts}
+        author_ids.update(author.pk for author in authors)
+        author_ids.discard(self.user_id)
+        if author_ids:
+            self.followed_author_ids = set(
+                Follow.objects.filter(user_id=self.user_id,
+                                      author_id__in=author_ids)
+                .values_list("author_id", flat=True))
+        self.liked_post_ids = liked_post_ids(user, posts)
+
+    def is_following(self, author_id):
+        return author_id in self.followed_author_ids
+
+    def is_liked(self, post):
+        return post.pk in self.liked_post_ids
+
+    def is_own(self, post):
+        return self.user_id is not None and post.author_id == self.user_id
+
+    def post_context(self, post):
+        """Переменные шаблона includes/post_item.html для публикации."""
+        return {
+            "post_is_own": self.is_own(post),
+            "post_is_liked": self.is_liked(post),
+            "post_author_followed": self.is_following(post.author_id),
+        }
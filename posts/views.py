@@ -1,47 +1,93 @@
-from django.core.paginator import Paginator
-from django.http import Http404
+from django.http import (Http404, HttpResponseBadRequest,
+                         HttpResponseForbidden, JsonResponse)
 from django.shortcuts import render, get_object_or_404, redirect
+from django.contrib.auth import logout
 from django.contrib.auth.decorators import login_required
 from django.conf import settings
+from django.db import router
 from django.urls import reverse
-from django.db.models import Q
 
-from .models import Post, Group, User, Follow, Profile, Likes
+from .models import Post, Group, User, Follow, Profile
 from .forms import PostForm, CommentForm, ProfileForm, GroupForm
+from .avatars import attach_avatars
+from .card_urls import attach_card_urls
+from .conditional import conditional_listing
+from .feed import FEED_ORDERING, feed_posts
+from .likes import toggle_like
+from .paginator import (CachedPaginator, CursorPaginator,
+                        page_number_redirect)
+from .routers import reads_from_replica
+from .search import search_posts
+from . import feed, purge, updates
+from .viewer import ViewerState
+
+
+@reads_from_replica
+def search(request):
+    query = request.GET.get("q", "")
+    # Полнотекстовый индекс читается из той же базы, что и публикации.
+    paginator = CachedPaginator(
+        search_posts(query, using=router.db_for_read(Post)),
+        settings.DEFAULT_POSTS_PER_PAGE)
+    page_number = request.GET.get("page")
+    page = paginator.get_page(page_number)
+    attach_card_urls(page)
+    return render(request, "search_results.html", {
+        "page": page,
+        "paginator": paginator,
+        "query": query,
+        "viewer": ViewerState(request.user, page),
+        "post_view": False,
+    })
 
 
-def search(request):
-    query = request.GET.get("q")
-    object_list = Post.objects.filter(
-        Q(text__icontains=query) or Q(author__username__icontains=query)
-        or Q(group__title__icontains=query))
-    return render(request, "search_results.html",
-                  {"object_list": object_list, "query": query})
+def index_listing(request):
+    return ["index"], Post.objects.all()
 
 
+@reads_from_replica
+@conditional_listing(index_listing)
 def index(request):
-    post_list = Post.objects.select_related("group").all()
-    paginator = Paginator(post_list, settings.DEFAULT_POSTS_PER_PAGE)
-    page_number = request.GET.get("page")
-    page = paginator.get_page(page_number)
+    post_list = Post.objects.select_related("author", "group").all()
+    paginator = CursorPaginator(post_list, settings.DEFAULT_POSTS_PER_PAGE)
+    if "page" in request.GET:
+        return page_number_redirect(request, paginator)
+    page = paginator.get_page(request.GET.get("after"),
+                              request.GET.get("before"))
+    attach_card_urls(page)
     context = {
         "page": page,
         "paginator": paginator,
+        "viewer": ViewerState(request.user, page),
         "post_view": False,
     }
     return render(request, "index.html", context)
 
 
+def group_listing(request, slug):
+    group_id = (Group.objects.filter(slug=slug, deleted_at__isnull=True)
+                .values_list("pk", flat=True).first())
+    if group_id is None:
+        return None
+    return [f"group:{group_id}"], Post.objects.filter(group_id=group_id)
+
+
+@reads_from_replica
+@conditional_listing(group_listing)
 def group_posts(request, slug):
-    group = get_object_or_404(Group, slug=slug)
-    group_list = group.posts.all()
-    paginator = Paginator(group_list, settings.DEFAULT_POSTS_PER_PAGE)
-    page_number = request.GET.get("page")
-    page = paginator.get_page(page_number)
+    group = get_object_or_404(Group, slug=slug, deleted_at__isnull=True)
+    group_list = group.posts.select_related("author", "group")
+    paginator = CursorPaginator(group_list, settings.DEFAULT_POSTS_PER_PAGE)
+    if "page" in request.GET:
+        return page_number_redirect(request, paginator)
+    page = paginator.get_page(request.GET.get("after"),
+                              request.GET.get("before"))
+    attach_card_urls(page)
     context = {
         "page": page,
         "group": group,
         "paginator": paginator,
+        "viewer": ViewerState(request.user, page),
         "post_view": False,
     }
     return render(request, "group.html", context)
@@ -58,57 +104,90 @@ def new_post(request):
     return render(request, "new_post.html", {"form": form})
 
 
+def get_author_profile(author):
+    """Профиль автора; отсутствующий не создаётся, счётчики считаются.
+
+    Страницы читают данные и не должны писать в базу: профиль
+    сохранится при первом изменении подписок или настроек.
+    """
+    try:
+        return author.profile
+    except Profile.DoesNotExist:
+        return Profile(
+            user=author,
+            followers_count=Follow.objects.filter(author=author).count(),
+            followings_count=Follow.objects.filter(user=author).count())
+
+
+def profile_listing(request, username):
+    author_id = (User.objects.filter(username=username, is_active=True)
+                 .values_list("pk", flat=True).first())
+    if author_id is None:
+        return None
+    return [f"profile:{author_id}"], Post.objects.filter(author_id=author_id)
+
+
+@reads_from_replica
+@conditional_listing(profile_listing)
 def profile(request, username):
-    author = get_object_or_404(User, username=username)
-    latest = author.posts.all()
-    paginator = Paginator(latest, settings.DEFAULT_POSTS_PER_PAGE)
-    page_number = request.GET.get("page")
-    page = paginator.get_page(page_number)
-    is_image = False
-    if Profile.objects.filter(image=None):
-        is_image = True
-    followers_count = Follow.objects.filter(author=author).count()
-    followings_count = Follow.objects.filter(user=author).count()
-    following = Follow.objects.filter(user__username=request.user,
-                                      author=author)
+    author = get_object_or_404(User.objects.select_related("profile"),
+                               username=username, is_active=True)
+    latest = author.posts.select_related("author", "group")
+    paginator = CursorPaginator(latest, settings.DEFAULT_POSTS_PER_PAGE)
+    if "page" in request.GET:
+        return page_number_redirect(request, paginator)
+    page = paginator.get_page(request.GET.get("after"),
+                              request.GET.get("before"))
+    attach_card_urls(page)
+    attach_avatars([author])
+    author_profile = get_author_profile(author)
+    viewer = ViewerState(request.user, page, authors=[author])
     context = {
         "page": page,
         "paginator": paginator,
         "author": author,
-        "followers_count": followers_count,
-        "followings_count": followings_count,
-        "following": following,
-        "post_view": False,
-        "profile_is_not_image": is_image,}
+        "followers_count": author_profile.followers_count,
+        "followings_count": author_profile.followings_count,
+        "following": viewer.is_following(author.pk),
+        "viewer": viewer,
+        "post_view": False,}
     return render(request, "profile.html", context)
 
 
+def post_listing(request, username, post_id):
+    post = (Post.objects.filter(pk=post_id).order_by()
+            .values_list("author_id", "author__username").first())
+    if post is None or post[1] != username:
+        return None
+    author_id = post[0]
+    return ([f"post:{post_id}", f"author:{author_id}"],
+            Post.objects.filter(pk=post_id))
+
+
+@reads_from_replica
+@conditional_listing(post_listing)
 def post_view(request, username, post_id):
     post = get_object_or_404(
-        Post.objects.filter(author__username=username, id=post_id))
-    comments = post.comments.all()
+        Post.objects.select_related("author__profile", "group"),
+        author__username=username, id=post_id)
+    comments = post.comments.filter(author__is_active=True)
     form = CommentForm(request.POST or None)
 
-    followers_count = Follow.objects.filter(author=post.author).count()
-    followings_count = Follow.objects.filter(user=post.author).count()
-    following = Follow.objects.filter(user__username=request.user,
-                                      author=post.author)
-    likes = post.likes.all()
-    is_liked = False
-    if post.likes.filter(user=request.user.id).exists():
-        is_liked = True
+    attach_avatars([post.author])
+    author_profile = get_author_profile(post.author)
+    attach_card_urls([post])
+    viewer = ViewerState(request.user, [post])
     context = {
         "form": form,
         "post": post,
         "author": post.author,
         "comments": comments,
-        "followers_count": followers_count,
-        "followings_count": followings_count,
-        "following": following,
+        "followers_count": author_profile.followers_count,
+        "followings_count": author_profile.followings_count,
+        "following": viewer.is_following(post.author_id),
         "show_form": False,
         "post_view": True,
-        "likes": likes,
-        "post_is_liked": is_liked,}
+        **viewer.post_context(post)}
     return render(request, "post.html", context)
 
 
@@ -130,7 +209,7 @@ def post_edit(request, username, post_id):
 def post_delete(request, username, post_id):
     try:
         post = get_object_or_404(Post, id=post_id, author__username=username)
-        post.delete()
+        purge.delete_post(post)
         return redirect("posts:index")
     except Post.DoesNotExist:
         return render(
@@ -142,15 +221,11 @@ def post_delete(request, username, post_id):
 
 @login_required
 def add_comment(request, username, post_id):
-    post = Post.objects.get(id=post_id, author__username=username)
+    post = Post.objects.select_related("author__profile", "group").get(
+        id=post_id, author__username=username)
     author = post.author
     form = CommentForm(request.POST or None)
-    comments = post.comments.all()
-
-    followers_count = Follow.objects.filter(author=post.author).count()
-    followings_count = Follow.objects.filter(user=post.author).count()
-    following = Follow.objects.filter(user__username=request.user,
-                                      author=post.author)
+    comments = post.comments.filter(author__is_active=True)
     if form.is_valid():
         comment = form.save(commit=False)
         comment.author = request.user
@@ -158,33 +233,78 @@ def add_comment(request, username, post_id):
         comment.save()
         return redirect(reverse("posts:post", kwargs={
             "username": author.username, "post_id": post.id}))
+    attach_avatars([author])
+    author_profile = get_author_profile(author)
+    attach_card_urls([post])
+    viewer = ViewerState(request.user, [post])
     return render(request, "post.html", {
         "form": form,
         "post": post,
         "author": post.author,
         "comments": comments,
-        "followers_count": followers_count,
-        "followings_count": followings_count,
-        "following": following,
+        "followers_count": author_profile.followers_count,
+        "followings_count": author_profile.followings_count,
+        "following": viewer.is_following(author.pk),
         "show_form": True,
-        "post_view": True, })
+        "post_view": True,
+        **viewer.post_context(post)})
+
+
+def follow_listing(request):
+    # Материализованную ленту меняют только события с поколением
+    # feed:<id>, публикации популярных авторов проверяются по их профилям.
+    pull_author_ids = feed.pull_authors(request.user)
+    return ([f"feed:{request.user.pk}",
+             *[f"profile:{author_id}" for author_id in pull_author_ids]],
+            Post.objects.none())
 
 
 @login_required
+@conditional_listing(follow_listing)
 def follow_index(request):
-    post_list = Post.objects.filter(author__following__user=request.user)
-    paginator = Paginator(post_list, settings.DEFAULT_POSTS_PER_PAGE)
-    page_number = request.GET.get("page")
-    page = paginator.get_page(page_number)
+    post_list = feed_posts(request.user)
+    paginator = CursorPaginator(post_list, settings.DEFAULT_POSTS_PER_PAGE,
+                                ordering=FEED_ORDERING)
+    if "page" in request.GET:
+        return page_number_redirect(request, paginator)
+    page = paginator.get_page(request.GET.get("after"),
+                              request.GET.get("before"))
+    attach_card_urls(page)
     context = {
         "page": page,
-        "paginator": paginator}
+        "paginator": paginator,
+        "viewer": ViewerState(request.user, page)}
     return render(request, "follow.html", context)
 
 
+def new_posts_watch(request):
+    scope = request.GET.get("scope", "index")
+    if scope == "index":
+        return updates.Watch(["index"], Post.objects.all())
+    if scope == "group":
+        group = get_object_or_404(Group, slug=request.GET.get("group"),
+                                  deleted_at__isnull=True)
+        return updates.Watch([f"group:{group.pk}"], group.posts.all())
+    if scope == "follow" and request.user.is_authenticated:
+        return feed.watch(request.user)
+    return None
+
+
+def new_posts(request):
+    try:
+        since = int(request.GET.get("since", 0))
+    except ValueError:
+        return HttpResponseBadRequest()
+    watch = new_posts_watch(request)
+    if watch is None:
+        return HttpResponseForbidden()
+    result = watch.check(since) or {"last_id": since, "count": 0, "ids": []}
+    return JsonResponse(result)
+
+
 @login_required
 def profile_follow(request, username):
-    author = get_object_or_404(User, username=username)
+    author = get_object_or_404(User, username=username, is_active=True)
     if request.user != author:
         Follow.objects.get_or_create(user=request.user, author=author)
     return redirect("posts:profile", username)
@@ -225,7 +345,8 @@ def new_group(request):
 @login_required
 def group_edit(request, username, slug):
     creator = get_object_or_404(User, username=username)
-    group = get_object_or_404(Group, creator=creator, slug=slug)
+    group = get_object_or_404(Group, creator=creator, slug=slug,
+                              deleted_at__isnull=True)
     if request.user != creator:
         return redirect("posts:all_groups")
     form = GroupForm(request.POST or None, files=request.FILES or None,
@@ -241,17 +362,21 @@ def group_edit(request, username, slug):
 @login_required
 def group_delete(request, username, slug):
     creator = get_object_or_404(User, username=username)
-    group = get_object_or_404(Group, creator=creator, slug=slug)
+    group = get_object_or_404(Group, creator=creator, slug=slug,
+                              deleted_at__isnull=True)
     if request.user != creator:
         return redirect("posts:all_groups")
     else:
-        group.delete()
+        purge.delete_group(group)
         return redirect("posts:all_groups")
 
 
+@reads_from_replica
 def all_groups(request):
-    group_list = Group.objects.all()
-    paginator = Paginator(group_list, settings.DEFAULT_POSTS_PER_PAGE)
+    group_list = (Group.objects.filter(deleted_at__isnull=True)
+                  .select_related("creator").order_by("pk"))
+    paginator = CachedPaginator(group_list, settings.DEFAULT_POSTS_PER_PAGE,
+                                count_key="groups")
     page_number = request.GET.get("page")
     page = paginator.get_page(page_number)
     return render(request, "all_groups.html", {
@@ -262,7 +387,7 @@ def all_groups(request):
 
 @login_required
 def profile_settings(request):
-    profile = Profile.objects.get_or_create(user=request.user)[0]
+    profile = get_author_profile(request.user)
     form = ProfileForm(request.POST or None, files=request.FILES or None,
                        instance=profile)
     if not form.is_valid():
@@ -277,43 +402,46 @@ def user_delete(request, username):
     if request.user != user:
         return redirect("posts:profile", username=request.user.username,)
     else:
-        user.delete()
+        logout(request)
+        purge.delete_user(user)
         return redirect("posts:index")
 
 
 @login_required
 def likes(request, username, post_id):
-    user = get_object_or_404(User, username=username)
-    post = get_object_or_404(Post, id=post_id, author__username=username)
-    is_liked = False
-    if post.likes.filter(user=request.user.id).exists():
-        is_liked = True
-        Likes.objects.get(user=request.user, post=post).delete()
-    else:
-        Likes.objects.get_or_create(user=request.user, post=post)
-    if user:
-        prewious_url = request.META.get("HTTP_REFERER")
-        return redirect(prewious_url, {"post_is_liked": is_liked})
-    else:
-        return redirect("post_view.html", username=request.user.username,
-                        id=post_id)
-    
-
+    post = get_object_or_404(Post.objects.only("pk"), id=post_id,
+                             author__username=username)
+    is_liked, likes_count = toggle_like(request.user, post.pk)
+    if request.is_ajax():
+        return JsonResponse({"post_is_liked": is_liked,
+                             "likes_count": likes_count})
+    previous_url = request.META.get("HTTP_REFERER")
+    if previous_url:
+        return redirect(previous_url)
+    return redirect("posts:post", username=username, post_id=post.pk)
+
+
+@reads_from_replica
 def all_authors(request):
-    author_list = User.objects.all().order_by('-date_joined')
-    paginator = Paginator(author_list, 20)
+    author_list = (User.objects.filter(is_active=True)
+                   .select_related("profile").order_by('-date_joined'))
+    paginator = CachedPaginator(author_list, 20, count_key="authors")
     page_number = request.GET.get('page')
     page = paginator.get_page(page_number)
+    attach_avatars(page)
     return render(request, "all_authors.html", {
         "page": page,
         "paginator": paginator,
         "author_list": author_list,})
 
 
+@reads_from_replica
 def author_groups(request, username):
-    creator = get_object_or_404(User, username=username)
-    groups = Group.objects.filter(creator__username=username)
-    paginator = Paginator(groups, settings.DEFAULT_POSTS_PER_PAGE)
+    creator = get_object_or_404(User, username=username, is_active=True)
+    groups = Group.objects.filter(creator=creator,
+                                  deleted_at__isnull=True).order_by("pk")
+    paginator = CachedPaginator(groups, settings.DEFAULT_POSTS_PER_PAGE,
+                                count_key=f"author_groups:{creator.pk}")
     page_number = request.GET.get("page")
     page = paginator.get_page(page_number)
     return render(request, "author_groups.html",
@@ -321,12 +449,16 @@ def author_groups(request, username):
                    "page": page, "paginator": paginator})
 
 
+@reads_from_replica
 def following(request, username):
-    author = get_object_or_404(User, username=username)
-    following = author.follower.all()
-    paginator = Paginator(following, 20)
+    author = get_object_or_404(User, username=username, is_active=True)
+    following = (author.follower.filter(author__is_active=True)
+                 .select_related("author__profile").order_by("-pk"))
+    paginator = CachedPaginator(following, 20,
+                                count_key=f"following:{author.pk}")
     page_number = request.GET.get('page')
     page = paginator.get_page(page_number)
+    attach_avatars(follow.author for follow in page)
     return render(request, "following.html", {
         "author": author,
         "page": page,
@@ -334,12 +466,16 @@ def following(request, username):
     })
 
 
+@reads_from_replica
 def followers(request, username):
-    author = get_object_or_404(User, username=username)
-    followers = author.following.all()
-    paginator = Paginator(followers, 20)
+    author = get_object_or_404(User, username=username, is_active=True)
+    followers = (author.following.filter(user__is_active=True)
+                 .select_related("user__profile").order_by("-pk"))
+    paginator = CachedPaginator(followers, 20,
+                                count_key=f"followers:{author.pk}")
     page_number = request.GET.get('page')
     page = paginator.get_page(page_number)
+    attach_avatars(follow.user for follow in page)
     return render(request, "followers.html", {
         "author": author,
         "page": page, 
@@ -1,4 +1,8 @@
+import atexit
 import os
+import shutil
+import sys
+import tempfile
 
 from dotenv import load_dotenv
 
@@ -8,14 +12,49 @@ BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 load_dotenv()
 SECRET_KEY = os.getenv('SECRET_KEY')
 
-DEBUG = True
+DEBUG = os.getenv('DEBUG', 'True') == 'True'
 ALLOWED_HOSTS = ["localhost", "127.0.0.1", "[::1]", "testserver", ]
 
+TESTING = 'test' in sys.argv[1:2]
+
+# Общий для процессов кэш и журнал инвалидации его копий в памяти.
+CACHE_DIR = os.getenv('CACHE_DIR', os.path.join(tempfile.gettempdir(),
+                                                'yatube-cache'))
+if TESTING:
+    # У каждого запуска тестов свой журнал: clear() в тестах
+    # не должен сбрасывать кэш запущенного сервера.
+    CACHE_DIR = tempfile.mkdtemp(prefix='yatube-test-cache-')
+    atexit.register(shutil.rmtree, CACHE_DIR, ignore_errors=True)
 CACHES = {
     'default': {
+        'BACKEND': 'posts.cache.InstrumentedTwoTierCache',
+        'LOCATION': os.path.join(CACHE_DIR, 'invalidations.sqlite3'),
+        'OPTIONS': {
+            'SHARED': 'shared',
+            'L1_MAX_ENTRIES': 1000,
+            'L1_TIMEOUT': 30,
+            'SYNC_INTERVAL': 0.5,
+        },
+    },
+    # Общий для процессов одной машины. Для нескольких машин задаётся
+    # memcached или redis, например
+    # SHARED_CACHE_BACKEND=django.core.cache.backends.memcached.MemcachedCache
+    # и SHARED_CACHE_LOCATION=127.0.0.1:11211.
+    'shared': {
+        'BACKEND': os.getenv('SHARED_CACHE_BACKEND',
+                             'posts.cache.SQLiteCache'),
+        'LOCATION': os.getenv('SHARED_CACHE_LOCATION',
+                              os.path.join(CACHE_DIR, 'shared.sqlite3')),
+        'OPTIONS': {
+            'MAX_ENTRIES': 100000,
+        },
+    },
+}
+if TESTING:
+    CACHES['shared'] = {
         'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'yatube-shared',
     }
-}
 
 INSTALLED_APPS = [
     'users',
@@ -31,11 +70,13 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'posts.metrics.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'posts.routers.ReplicaMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
     'debug_toolbar.middleware.DebugToolbarMiddleware',
@@ -48,7 +89,10 @@ INTERNAL_IPS = [
 ROOT_URLCONF = 'yatube.urls'
 TEMPLATE_DIR = os.path.join(BASE_DIR, 'templates')
 STATIC_URL = "/static/"
-STATIC_ROOT = os.path.join(BASE_DIR, "static")
+STATIC_ROOT = os.getenv('STATIC_ROOT', os.path.join(BASE_DIR, "staticfiles"))
+STATICFILES_DIRS = [os.path.join(BASE_DIR, "static")]
+# Имена с хэшем содержимого и сжатые копии .gz/.br после collectstatic.
+STATICFILES_STORAGE = "posts.staticfiles.CompressedManifestStaticFilesStorage"
 
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
@@ -63,10 +107,16 @@ EMAIL_FILE_PATH = os.path.join(BASE_DIR, "sent_emails")
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'BACKEND': 'posts.metrics.DjangoTemplates',
         'DIRS': [TEMPLATE_DIR],
-        'APP_DIRS': True,
         'OPTIONS': {
+            # Шаблоны компилируются один раз на процесс.
+            'loaders': [
+                ('django.template.loaders.cached.Loader', [
+                    'django.template.loaders.filesystem.Loader',
+                    'django.template.loaders.app_directories.Loader',
+                ]),
+            ],
             'context_processors': [
                 'django.template.context_processors.debug',
                 'django.template.context_processors.request',
@@ -77,6 +127,9 @@ TEMPLATES = [
     },
 ]
 
+# Шаблоны приложений загружает app_directories.Loader внутри cached.Loader.
+SILENCED_SYSTEM_CHECKS = ['debug_toolbar.W006']
+
 WSGI_APPLICATION = 'yatube.wsgi.application'
 
 
@@ -90,6 +143,20 @@ DATABASES = {
     }
 }
 
+# Реплики только для чтения: пути к файлам SQLite через запятую.
+# В тестах реплики подменяются основной базой.
+DATABASE_REPLICAS = []
+for number, name in enumerate(
+        filter(None, os.getenv('DATABASE_REPLICAS', '').split(',')), 1):
+    DATABASES[f'replica{number}'] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': name,
+        'TEST': {'MIRROR': 'default'},
+    }
+    DATABASE_REPLICAS.append(f'replica{number}')
+
+DATABASE_ROUTERS = ['posts.routers.ReplicaRouter']
+
 
 # Password validation
 # https://docs.djangoproject.com/en/2.2/ref/settings/#auth-password-validators
@@ -124,6 +191,36 @@ USE_L10N = True
 USE_TZ = True
 
 DEFAULT_POSTS_PER_PAGE = 10
+# Сколько секунд хранится в кэше число объектов для постраничного вывода.
+PAGINATOR_COUNT_TIMEOUT = 300
+# Сколько секунд хранится в кэше HTML карточки публикации.
+POST_CARD_CACHE_TIMEOUT = 60 * 60
+# Число потоков, создающих миниатюры загруженных картинок.
+THUMBNAIL_WORKERS = 2
+# Сколько секунд хранится в кэше адрес миниатюры аватара.
+AVATAR_CACHE_TIMEOUT = 60 * 60 * 24
+# Загрузки больше IMAGE_MAX_PIXELS точек отклоняются, остальные
+# уменьшаются до IMAGE_MASTER_MAX_SIDE точек по большей стороне.
+IMAGE_MAX_PIXELS = 50_000_000
+IMAGE_MASTER_MAX_SIDE = 2560
+
+# Сколько последних публикаций хранится в ленте подписок пользователя.
+FEED_MAX_LENGTH = 1000
+# Публикации авторов с большим числом подписчиков не рассылаются по лентам,
+# а подмешиваются в ленту при чтении.
+FEED_FANOUT_THRESHOLD = 10000
+
+# Сколько строк удаляет одна транзакция фонового удаления (posts.purge).
+PURGE_BATCH_SIZE = 500
+# Задание, упавшее столько раз, больше не запускается и не держит очередь.
+PURGE_MAX_ATTEMPTS = 5
+
+# Раз в сколько секунд открытая вкладка спрашивает о новых публикациях.
+# Запрос отвечает сразу и не занимает поток сервера ожиданием.
+NEW_POSTS_CLIENT_POLL_INTERVAL = 30
+
+# Сколько секунд после записи пользователь читает из основной базы.
+REPLICA_STICKY_SECONDS = 5
 
 # Static files (CSS, JavaScript, Images)
 # https://docs.djangoproject.com/en/2.2/howto/static-files/
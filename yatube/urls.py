@@ -19,11 +19,17 @@ from django.conf.urls import handler404, handler500
 from django.conf import settings
 from django.conf.urls.static import static
 
+from posts.metrics import metrics
+from posts.staticfiles import serve as serve_static
+
 handler404 = "posts.views.page_not_found"
 handler500 = "posts.views.server_error"
 
 urlpatterns = [
     path("admin/", admin.site.urls),
+    path("metrics", metrics, name="metrics"),
+    path(f"{settings.STATIC_URL.lstrip('/')}<path:path>", serve_static,
+         name="static"),
     path("about/", include("about.urls", namespace="about")),
     path("auth/", include("users.urls")),
     path("auth/", include("django.contrib.auth.urls")),
@@ -33,8 +39,6 @@ urlpatterns = [
 if settings.DEBUG:
     urlpatterns += static(settings.MEDIA_URL,
                           document_root=settings.MEDIA_ROOT)
-    urlpatterns += static(settings.STATIC_URL,
-                          document_root=settings.STATIC_ROOT)
 
     import debug_toolbar
 